@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Task, User
+from .models import Job, Task, User
 
 admin.site.register(Task)
-admin.site.register(User)
\ No newline at end of file
+admin.site.register(User)
+admin.site.register(Job)
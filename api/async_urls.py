@@ -0,0 +1,9 @@
+from django.urls import path
+from api import async_views
+
+urlpatterns = [
+    path("/user", async_views.user_details, name="async_user_details"),
+    path("/task/<int:id>", async_views.task_details, name="async_task_details"),
+    path("/task/<int:id>/<str:param>", async_views.task_details, name="async_task_details"),
+    path("/tasks", async_views.tasks_list, name="async_tasks_list"),
+]
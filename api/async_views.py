@@ -0,0 +1,75 @@
+from enum import Enum
+from django.shortcuts import aget_object_or_404
+from .models import User, Task
+from .services import user_service, task_service
+from .utils.asyncview import api_view
+
+# Native async variants of the user and task endpoints, served under /api/async
+
+@api_view(["GET", "PUT", "DELETE"])
+async def user_details(request):
+    """
+    Handle user details retrieval, update, and deletion.
+    """
+
+    # Ensure user is authenticated
+    user = await aget_object_or_404(User, id=request.user.id)
+
+    match request.method:
+        case "GET":
+            # Return the user details
+            return await user_service.aget_user(request, user)
+        case "PUT":
+            # Update the user details
+            return await user_service.aupdate_user(user, request.data)
+        case "DELETE":
+            # Delete the user
+            return await user_service.adelete_user(user)
+
+@api_view(["GET", "POST"])
+async def tasks_list(request):
+    """
+    Handle task creation and listing.
+    """
+    if request.method == "POST":
+        # Create a new task
+        return await task_service.acreate_task(request)
+    else:
+        # List all tasks
+        return await task_service.aget_tasks(request)
+
+@api_view(["GET", "PUT", "DELETE"])
+async def task_details(request, id, param=None):
+    """
+    Handle task retrieval, update, and deletion.
+    """
+    if request.method == "GET":
+        # Return the task details, only the serialized columns are read
+        return await task_service.aget_task(request, id)
+
+    if request.method == "PUT":
+
+        class Param(Enum):
+            COMPLETE = "complete"
+            PENDING = "pending"
+
+        _param = Param(param) if param in Param._value2member_map_ else None
+
+        match _param:
+            case Param.COMPLETE:
+                # Update the task status to completed
+                return await task_service.aupdate_task_status(request, id, Task.Status.COMPLETED)
+            case Param.PENDING:
+                # Update the task status to pending
+                return await task_service.aupdate_task_status(request, id, Task.Status.PENDING)
+
+    # Ensure task belongs to the authenticated user
+    task = await aget_object_or_404(Task, id=id, owner=request.user)
+
+    match request.method:
+        case "DELETE":
+            # Delete the task
+            return await task_service.adelete_task(task)
+        case "PUT":
+            # Update the task
+            return await task_service.aupdate_task(task, request.data)
@@ -0,0 +1,7 @@
+from api.utils import accounts, counters
+from api.utils.jobs import register
+
+# Background jobs, run by python manage.py run_jobs, or in process with the local backend
+
+register("purge_user")(accounts.purge)
+register("reconcile_task_counters")(counters.reconcile)
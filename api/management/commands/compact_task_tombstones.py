@@ -0,0 +1,17 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils.timezone import now
+from api.utils import tombstones
+
+class Command(BaseCommand):
+    help = "Remove tombstones of deleted tasks older than the retention period, to be run on a schedule (e.g. daily cron)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=settings.TASKS_TOMBSTONE_RETENTION_DAYS, help="Retention period in days.")
+        parser.add_argument("--batch-size", type=int, default=10000, help="Tombstones removed per transaction.")
+
+    def handle(self, *args, **options):
+        before = now() - timedelta(days=options["days"])
+        removed = tombstones.compact(before, options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Removed {removed} tombstones deleted before {before.isoformat()}"))
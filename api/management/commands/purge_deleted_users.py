@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from api.utils import accounts
+
+class Command(BaseCommand):
+    help = "Delete the tasks and rows of deactivated accounts in batches, e.g. of accounts whose purge job failed."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=settings.USER_DELETION["BATCH_SIZE"], help="Tasks deleted per transaction.")
+
+    def handle(self, *args, **options):
+        users = tasks = 0
+        for user_id in list(accounts.deleted_users()):
+            tasks += accounts.purge(user_id, options["batch_size"])
+            users += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Purged {users} users and {tasks} tasks"))
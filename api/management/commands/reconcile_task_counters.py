@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from api.models import User
+from api.utils import counters, jobs
+
+class Command(BaseCommand):
+    help = "Recount the tasks of every user, or of the given users, and fix drifted task counters."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", type=int, action="append", dest="users", help="ID of a user to reconcile, can be repeated.")
+        parser.add_argument("--enqueue", action="store_true", help="Queue a background job per user instead of reconciling them now.")
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by("id").values_list("id", flat=True)
+        if options["users"]:
+            users = users.filter(id__in=options["users"])
+
+        if options["enqueue"]:
+            queued = 0
+            for user_id in users.iterator():
+                jobs.enqueue("reconcile_task_counters", user_id)
+                queued += 1
+            self.stdout.write(self.style.SUCCESS(f"Queued the reconciliation of {queued} users"))
+            return
+
+        checked = fixed = 0
+        # Each user is recounted in its own short transaction
+        for user_id in users.iterator():
+            checked += 1
+            if counters.reconcile(user_id):
+                fixed += 1
+                self.stdout.write(f"Fixed task counters of user {user_id}")
+
+        self.stdout.write(self.style.SUCCESS(f"Reconciled {checked} users, {fixed} had drifted"))
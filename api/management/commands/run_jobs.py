@@ -0,0 +1,34 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from api.utils import jobs
+
+class Command(BaseCommand):
+    help = "Run the queued background jobs in a pool of worker threads, until interrupted."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=settings.JOBS["WORKERS"], help="Worker threads, each with its own database connection.")
+        parser.add_argument("--batch-size", type=int, default=10, help="Jobs claimed by a worker at a time.")
+        parser.add_argument("--once", action="store_true", help="Stop when no job is due instead of polling for new ones.")
+
+    def handle(self, *args, **options):
+        stop = Event()
+
+        def worker():
+            try:
+                return jobs.work(options["batch_size"], options["once"], stop)
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(options["workers"], thread_name_prefix="run_jobs") as executor:
+            futures = [executor.submit(worker) for _ in range(options["workers"])]
+            try:
+                processed = sum(future.result() for future in futures)
+            except KeyboardInterrupt:
+                # Workers finish the jobs they claimed
+                stop.set()
+                processed = sum(future.result() for future in futures)
+
+        self.stdout.write(self.style.SUCCESS(f"Ran {processed} jobs"))
@@ -0,0 +1,88 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from whitenoise.middleware import WhiteNoiseMiddleware
+from api.utils import metrics
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    '''
+    WhiteNoise middleware that also runs in an async middleware chain.
+
+    WhiteNoise is sync only, which makes Django run every request of an ASGI server,
+    async views included, in a worker thread. Static files are served from a thread,
+    every other request goes on to the next middleware without leaving the event loop.
+    '''
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
+
+
+class InstrumentationMiddleware:
+    '''
+    Record the SQL queries, database time, serialization time and total time of requests.
+
+    Timings are recorded per route for GET /metrics, and sent back in a Server-Timing header
+    to staff users, or to every client when INSTRUMENTATION["SERVER_TIMING"] is true.
+    Requests slower than INSTRUMENTATION["SLOW_REQUEST_MS"] are logged with their SQL.
+    The middleware is removed from the chain unless INSTRUMENTATION["ENABLED"] is true.
+    '''
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.INSTRUMENTATION["ENABLED"]:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.slow_request = settings.INSTRUMENTATION["SLOW_REQUEST_MS"]
+        self.server_timing = settings.INSTRUMENTATION["SERVER_TIMING"]
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        stats, token = metrics.begin(capture_sql=self.slow_request is not None)
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.end(token)
+        return self.finish(request, response, stats)
+
+    async def __acall__(self, request):
+        stats, token = metrics.begin(capture_sql=self.slow_request is not None)
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.end(token)
+        return self.finish(request, response, stats)
+
+    def finish(self, request, response, stats):
+        total = stats.elapsed()
+        match = request.resolver_match
+        # Routes, not paths, so task IDs do not make a label each
+        route = match.route if match else "unmatched"
+        metrics.registry.record(route, request.method, stats, total)
+        # Timings tell clients about the queries and cache state of other users' requests
+        if self.server_timing or getattr(getattr(request, "user", None), "is_staff", False):
+            response["Server-Timing"] = stats.server_timing(total)
+        if self.slow_request is not None and total * 1000 >= self.slow_request:
+            metrics.log_slow_request(request, route, stats, total)
+        return response
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.2 on 2026-10-18 06:50
+
+from django.contrib.postgres.operations import AddIndexConcurrently, RemoveIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # Indexes are built without locking writes on the task table
+    atomic = False
+
+    dependencies = [
+        ('api', '0002_task_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='priority_rank',
+            field=models.GeneratedField(db_persist=True, expression=models.Case(models.When(priority='MEDIUM', then=models.Value(1)), models.When(priority='HIGH', then=models.Value(2)), default=models.Value(0)), output_field=models.PositiveSmallIntegerField()),
+        ),
+        AddIndexConcurrently(
+            model_name='task',
+            index=models.Index(fields=['owner', 'priority_rank', 'id'], name='task_owner_priority_rank_idx'),
+        ),
+        RemoveIndexConcurrently(
+            model_name='task',
+            name='task_owner_priority_idx',
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.2 on 2026-10-18 07:19
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_conditional_requests'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('COMPLETED', 'Completed')], max_length=10)),
+                ('category', models.CharField(choices=[('WORK', 'Work'), ('PERSONAL', 'Personal'), ('UNCATEGORIZED', 'Uncategorized')], max_length=20)),
+                ('priority', models.CharField(choices=[('LOW', 'Low'), ('MEDIUM', 'Medium'), ('HIGH', 'High')], max_length=10)),
+                ('count', models.IntegerField(default=0)),
+                ('owner', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='task_counters', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('owner', 'status', 'category', 'priority'), name='task_counter_key')],
+            },
+        ),
+        # Count the existing tasks
+        migrations.RunSQL(
+            "INSERT INTO api_taskcounter (owner_id, status, category, priority, count) "
+            "SELECT owner_id, status, category, priority, COUNT(*) FROM api_task "
+            "GROUP BY owner_id, status, category, priority",
+            migrations.RunSQL.noop,
+        ),
+    ]
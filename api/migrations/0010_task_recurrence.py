@@ -0,0 +1,41 @@
+# Generated by Django 5.1.2 on 2026-10-18 08:12
+
+import django.db.models.deletion
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # The task indexes are built without locking writes on the task table
+    atomic = False
+
+    dependencies = [
+        ('api', '0009_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='occurrence',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='recurrence',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='series',
+            field=models.ForeignKey(blank=True, db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='api.task'),
+        ),
+        AddIndexConcurrently(
+            model_name='task',
+            index=models.Index(condition=models.Q(('recurrence__isnull', False)), fields=['owner', 'deadline'], name='task_owner_series_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='task',
+            index=models.Index(condition=models.Q(('series__isnull', False)), fields=['series', 'occurrence'], name='task_series_occurrence_idx'),
+        ),
+    ]
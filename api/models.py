@@ -1,9 +1,32 @@
+from hashlib import sha256
+from threading import Lock
+from django.conf import settings
+from django.core.cache import caches
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.db import models
 from django.contrib.auth.models import AbstractUser
-from rest_framework.authentication import TokenAuthentication
+from django.utils.timezone import now
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication, get_authorization_header
+from api.utils.cache import LRUCache
 
 class User(AbstractUser):
     email = models.EmailField(unique=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Version of the user's task collection, bumped by every task write
+    tasks_version = models.PositiveBigIntegerField(default=0)
+    tasks_modified = models.DateTimeField(null=True, blank=True)
+    # Sync tokens older than this version lost their tombstones to compaction
+    tasks_compacted = models.PositiveBigIntegerField(default=0)
+    # Deactivated accounts waiting for their purge
+    deleted_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            models.Index(fields=["deleted_at"], name="user_deleted_at_idx", condition=models.Q(deleted_at__isnull=False)),
+        ]
 
     def __str__(self):
         return self.username
@@ -11,6 +34,145 @@ class User(AbstractUser):
 class BearerTokenAuthentication(TokenAuthentication):
     keyword = 'Bearer'
 
+class CachedBearerTokenAuthentication(BearerTokenAuthentication):
+    '''
+    Bearer token authentication that skips the Token JOIN User query on hot tokens.
+
+    Authenticated (user, token) pairs are kept in the SHARED_CACHE entry of CACHES when
+    one is configured, else in an in-process LRU+TTL cache. Entries are removed when the
+    user is saved or deleted and when the token is deleted. A shared cache is the only
+    layer, so a removal is seen by every process at once, without one the TTL bounds how
+    long other processes can keep a removed entry.
+    '''
+    _local = None
+    _lock = Lock()
+    _shared_hits = 0
+    _db_lookups = 0
+
+    def authenticate_credentials(self, key):
+        cls = type(self)
+        shared = cls.shared_cache()
+        if shared is None:
+            entry = cls.local_cache().get(key)
+            if entry is None:
+                cls._count("_db_lookups")
+                entry = super().authenticate_credentials(key)
+                cls.local_cache().set(key, entry)
+            return entry
+
+        entry = shared.get(cls._shared_key(key))
+        if entry is not None:
+            cls._count("_shared_hits")
+        else:
+            cls._count("_db_lookups")
+            entry = super().authenticate_credentials(key)
+            shared.set(cls._shared_key(key), entry, settings.TOKEN_AUTH_CACHE["TTL"])
+        return entry
+
+    async def aauthenticate(self, request):
+        # Async variant of authenticate(), for async views
+        auth = get_authorization_header(request).split()
+
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+
+        if len(auth) == 1:
+            raise exceptions.AuthenticationFailed(_("Invalid token header. No credentials provided."))
+        elif len(auth) > 2:
+            raise exceptions.AuthenticationFailed(_("Invalid token header. Token string should not contain spaces."))
+
+        try:
+            key = auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed(_("Invalid token header. Token string should not contain invalid characters."))
+
+        return await self.aauthenticate_credentials(key)
+
+    async def aauthenticate_credentials(self, key):
+        cls = type(self)
+        shared = cls.shared_cache()
+        if shared is None:
+            entry = cls.local_cache().get(key)
+            if entry is None:
+                cls._count("_db_lookups")
+                entry = await self._aload(key)
+                cls.local_cache().set(key, entry)
+            return entry
+
+        entry = await shared.aget(cls._shared_key(key))
+        if entry is not None:
+            cls._count("_shared_hits")
+        else:
+            cls._count("_db_lookups")
+            entry = await self._aload(key)
+            await shared.aset(cls._shared_key(key), entry, settings.TOKEN_AUTH_CACHE["TTL"])
+        return entry
+
+    @classmethod
+    def local_cache(cls):
+        if cls._local is None:
+            with cls._lock:
+                if cls._local is None:
+                    cls._local = LRUCache(settings.TOKEN_AUTH_CACHE["MAX_SIZE"], settings.TOKEN_AUTH_CACHE["TTL"])
+        return cls._local
+
+    @classmethod
+    def shared_cache(cls):
+        alias = settings.TOKEN_AUTH_CACHE.get("SHARED_CACHE")
+        return caches[alias] if alias else None
+
+    @classmethod
+    def invalidate_token(cls, key):
+        cls.local_cache().delete(key)
+        shared = cls.shared_cache()
+        if shared:
+            shared.delete(cls._shared_key(key))
+
+    @classmethod
+    def invalidate_user(cls, user_id):
+        keys = cls.local_cache().delete_matching(lambda entry: entry[0].pk == user_id)
+        shared = cls.shared_cache()
+        if shared:
+            keys = set(keys) | set(cls().get_model().objects.filter(user_id=user_id).values_list("key", flat=True))
+            shared.delete_many([cls._shared_key(key) for key in keys])
+
+    @classmethod
+    def stats(cls):
+        local = cls.local_cache().stats()
+        return {
+            "hits": local["hits"],
+            "shared_hits": cls._shared_hits,
+            "misses": cls._db_lookups,
+            "size": local["size"],
+        }
+
+    @classmethod
+    def clear(cls):
+        cls.local_cache().clear()
+        with cls._lock:
+            cls._shared_hits = 0
+            cls._db_lookups = 0
+
+    async def _aload(self, key):
+        # Async variant of TokenAuthentication.authenticate_credentials()
+        model = self.get_model()
+        try:
+            token = await model.objects.select_related("user").aget(key=key)
+        except model.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_("Invalid token."))
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_("User inactive or deleted."))
+        return (token.user, token)
+
+    @classmethod
+    def _count(cls, counter):
+        with cls._lock:
+            setattr(cls, counter, getattr(cls, counter) + 1)
+
+    @staticmethod
+    def _shared_key(key):
+        return "auth:token:" + sha256(key.encode()).hexdigest()
+
 class Task(models.Model):
 
     class Priority(models.TextChoices):
@@ -34,8 +196,140 @@ class Task(models.Model):
     priority = models.CharField(max_length=10, choices=Priority, default=Priority.LOW)
     status = models.CharField(max_length=10, choices=Status, default=Status.PENDING)
     category = models.CharField(max_length=20, choices=Category, default=Category.UNCATEGORIZED)
-    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name="tasks")
+    # Semantic order of priority (LOW < MEDIUM < HIGH), stored and kept up to date by the database
+    priority_rank = models.GeneratedField(
+        expression=models.Case(
+            models.When(priority=Priority.MEDIUM, then=models.Value(1)),
+            models.When(priority=Priority.HIGH, then=models.Value(2)),
+            default=models.Value(0),
+        ),
+        output_field=models.PositiveSmallIntegerField(),
+        db_persist=True,
+    )
+    # Weighted full-text document of the title and description, stored and kept up to date by the database
+    search_vector = models.GeneratedField(
+        expression=(
+            SearchVector("title", weight="A", config="english")
+            + SearchVector("description", weight="B", config="english")
+        ),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+    # Indexed through the composite indexes below, which all start with owner
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name="tasks", db_index=False)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Version of the owner's task collection at the last write of the task
+    version = models.PositiveBigIntegerField(default=0)
+    # Recurrence rule of a series, whose occurrences repeat from the deadline on without being stored
+    recurrence = models.CharField(max_length=255, null=True, blank=True)
+    # Series of a stored occurrence, and the occurrence it replaces. Not constrained, so that
+    # deleting a series keeps its stored occurrences and task deletes stay single statements
+    series = models.ForeignKey(
+        "self", on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True, related_name="+", db_index=False,
+    )
+    occurrence = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        # Every list query filters on owner and orders by (sort key, id)
+        indexes = [
+            models.Index(fields=["owner", "id"], name="task_owner_id_idx"),
+            models.Index(fields=["owner", "title", "id"], name="task_owner_title_idx"),
+            models.Index(fields=["owner", "deadline", "id"], name="task_owner_deadline_idx"),
+            models.Index(fields=["owner", "priority_rank", "id"], name="task_owner_priority_rank_idx"),
+            models.Index(fields=["owner", "status", "deadline", "id"], name="task_owner_status_deadline_idx"),
+            models.Index(
+                fields=["owner", "deadline", "id"],
+                name="task_pending_deadline_idx",
+                condition=models.Q(status="PENDING"),
+            ),
+            GinIndex(fields=["search_vector"], name="task_search_vector_idx"),
+            # Changes since a sync token
+            models.Index(fields=["owner", "version"], name="task_owner_version_idx"),
+            # Series expanded in a deadline window, and their stored occurrences
+            models.Index(fields=["owner", "deadline"], name="task_owner_series_idx", condition=models.Q(recurrence__isnull=False)),
+            models.Index(fields=["series", "occurrence"], name="task_series_occurrence_idx", condition=models.Q(series__isnull=False)),
+        ]
 
     def __str__(self):
         return self.title
 
+
+class TaskCounter(models.Model):
+    '''
+    Number of tasks of a user per status, category and priority.
+
+    Rows are kept up to date by every task write of the task service, the
+    reconcile_task_counters command fixes any drift.
+    '''
+    # Indexed through the unique constraint below, which starts with owner
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name="task_counters", db_index=False)
+    status = models.CharField(max_length=10, choices=Task.Status)
+    category = models.CharField(max_length=20, choices=Task.Category)
+    priority = models.CharField(max_length=10, choices=Task.Priority)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["owner", "status", "category", "priority"], name="task_counter_key"),
+        ]
+
+    def __str__(self):
+        return f"{self.status} {self.category} {self.priority}: {self.count}"
+
+
+class TaskTombstone(models.Model):
+    '''
+    Deleted task, kept so that clients syncing their tasks learn of the deletion.
+
+    Tombstones older than TASKS_TOMBSTONE_RETENTION are removed by the
+    compact_task_tombstones command.
+    '''
+    # Indexed through the version index below, which starts with owner
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name="task_tombstones", db_index=False)
+    task_id = models.BigIntegerField()
+    # Version of the owner's task collection that deleted the task
+    version = models.PositiveBigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["owner", "version"], name="tombstone_owner_version_idx"),
+            models.Index(fields=["deleted_at"], name="tombstone_deleted_at_idx"),
+        ]
+
+    def __str__(self):
+        return f"Task {self.task_id} deleted at version {self.version}"
+
+
+class Job(models.Model):
+    '''
+    Deferred call of a registered job function, run by the run_jobs workers.
+
+    Jobs are deleted once they succeed, failed attempts are retried with an
+    exponential delay until JOBS["MAX_ATTEMPTS"], then kept as FAILED.
+    '''
+
+    class Status(models.TextChoices):
+        QUEUED = "QUEUED"
+        RUNNING = "RUNNING"
+        FAILED = "FAILED"
+
+    name = models.CharField(max_length=100)
+    args = models.JSONField(default=list)
+    status = models.CharField(max_length=10, choices=Status, default=Status.QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    run_at = models.DateTimeField(default=now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Workers claim the oldest due jobs
+            models.Index(fields=["run_at", "id"], name="job_queued_idx", condition=models.Q(status="QUEUED")),
+            # Jobs of lost workers are found by their lock time
+            models.Index(fields=["locked_at"], name="job_running_idx", condition=models.Q(status="RUNNING")),
+        ]
+
+    def __str__(self):
+        return f"{self.name}{tuple(self.args)} {self.status}"
@@ -0,0 +1,40 @@
+from rest_framework import renderers
+from rest_framework.utils import encoders
+from api.utils import metrics
+
+# orjson is an optional accelerator, without it FastJSONRenderer renders like JSONRenderer
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+class JSONRenderer(renderers.JSONRenderer):
+    '''
+    JSON renderer whose encoding time counts as serialization time of the request
+    '''
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with metrics.serializing():
+            return super().render(data, accepted_media_type, renderer_context)
+
+class FastJSONRenderer(JSONRenderer):
+    '''
+    JSON renderer encoding with orjson when it is installed, its output is identical to JSONRenderer
+    '''
+    # Datetimes are handed to the encoder of DRF, which keeps milliseconds and writes UTC as Z.
+    # TextChoices, UUIDs and dict, list or str subclasses are encoded natively. The API renders
+    # no float, whose exponents orjson writes without padding, nor NaN, which it writes as null.
+    _options = 0 if orjson is None else orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+    _default = encoders.JSONEncoder().default
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Indented, ASCII or non-compact output is left to the stdlib encoder
+        if orjson is None or data is None or self.ensure_ascii or not self.compact or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            with metrics.serializing():
+                content = orjson.dumps(data, default=self._default, option=self._options)
+        except orjson.JSONEncodeError:
+            # e.g. integers beyond 64 bits, which the stdlib encoder renders or rejects itself
+            return super().render(data, accepted_media_type, renderer_context)
+        # Like JSONRenderer, line and paragraph separators are escaped for JavaScript
+        return content.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
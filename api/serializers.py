@@ -1,9 +1,11 @@
-from rest_framework.serializers import ModelSerializer, ValidationError
-from django.utils.timezone import now
-from django.contrib.auth.hashers import make_password
+from rest_framework import ISO_8601
+from rest_framework.serializers import DateTimeField, ModelSerializer, ValidationError
+from rest_framework.settings import api_settings
+from django.conf import settings
+from django.utils.timezone import get_current_timezone, now
 
 from .models import Task, User
-from api.utils import validate
+from api.utils import hashing, metrics, validate
 
 class UserSerializer(ModelSerializer):
     '''
@@ -15,9 +17,18 @@ class UserSerializer(ModelSerializer):
         extra_kwargs = {"password": {"write_only": True}}
 
     def create(self, validated_data):
-        validated_data["password"] = make_password(validated_data["password"])
+        # Raises hashing.Saturated when the hashing pool is full
+        validated_data["password"] = hashing.make_password(validated_data["password"])
         return super().create(validated_data)
 
+    def update(self, instance, validated_data):
+        # Only the given fields are saved, a full save would revert the task counters of the row
+        # written by concurrent task writes since the user was loaded
+        for field, value in validated_data.items():
+            setattr(instance, field, value)
+        instance.save(update_fields=[*validated_data, "updated_at"])
+        return instance
+
 
 class TaskSerializer(ModelSerializer):
     '''
@@ -25,27 +36,23 @@ class TaskSerializer(ModelSerializer):
     '''
     class Meta:
         model = Task
-        fields = ["id", "title", "description", "category", "priority", "deadline", "status", "completion_date", "owner"]
-        read_only_fields = ["completion_date", "owner"]
+        fields = ["id", "title", "description", "category", "priority", "deadline", "status", "completion_date", "owner", "recurrence", "series", "occurrence"]
+        read_only_fields = ["completion_date", "owner", "series", "occurrence"]
 
-    # Validate task fields, title is already validated by model
+    # Validate task fields, title, status, priority and category are already validated by their model field choices
     def validate(self, next):
         deadline = next.get("deadline")
-        status = next.get("status")
-        priority = next.get("priority")
-        category = next.get("category")
+        recurrence = next.get("recurrence")
 
         if deadline and validate.task_deadline(deadline):
             raise ValidationError("Deadline must be in the future.")
 
-        if status and not validate.task_status(status):
-            raise ValidationError("Invalid status")
-
-        if priority and not validate.task_priority(priority):
-            raise ValidationError("Invalid priority")
+        if recurrence and not validate.task_recurrence(recurrence):
+            raise ValidationError("Invalid recurrence")
 
-        if category and not validate.task_category(category):
-            raise ValidationError("Invalid category")
+        # Occurrences repeat from the deadline of the series
+        if recurrence and not (deadline or getattr(self.instance, "deadline", None)):
+            raise ValidationError("Recurring tasks need a deadline.")
 
         return next
     
@@ -56,6 +63,10 @@ class TaskSerializer(ModelSerializer):
         return super().create(validated_data)
 
     def update(self, instance, validated_data):
+        return super().update(instance, self.with_completion_date(validated_data))
+
+    @staticmethod
+    def with_completion_date(validated_data):
         # Update completion_date on status change
 
         if validated_data.get("status") == Task.Status.COMPLETED:
@@ -64,4 +75,72 @@ class TaskSerializer(ModelSerializer):
         if validated_data.get("status") == Task.Status.PENDING:
             validated_data["completion_date"] = None
 
-        return super().update(instance, validated_data)
+        return validated_data
+
+
+class TaskReadSerializer:
+    '''
+    Read-only fast path for Task rows fetched with values(), its output is identical to TaskSerializer
+    '''
+    columns = ["id", "title", "description", "category", "priority", "deadline", "status", "completion_date", "owner_id", "recurrence", "series_id", "occurrence"]
+
+    # Formats datetimes when the settings need more than ISO 8601 in the current timezone
+    _datetime = DateTimeField()
+
+    @classmethod
+    def values(cls, queryset, *extra):
+        return queryset.values(*cls.columns, *[column for column in extra if column and column not in cls.columns])
+
+    @classmethod
+    def to_representation(cls, row):
+        with metrics.serializing():
+            return cls.representer()(row)
+
+    @classmethod
+    def many(cls, rows):
+        # Rows are fetched before serializing, so query time is not counted twice
+        rows = list(rows)
+        with metrics.serializing():
+            represent = cls.representer()
+            return [represent(row) for row in rows]
+
+    @classmethod
+    def representer(cls):
+        # The current timezone is a context-local lookup, resolved once per call
+        format_datetime = cls._datetime_formatter()
+
+        def represent(row):
+            deadline = row["deadline"]
+            completion_date = row["completion_date"]
+            occurrence = row["occurrence"]
+            return {
+                "id": row["id"],
+                "title": row["title"],
+                "description": row["description"],
+                "category": row["category"],
+                "priority": row["priority"],
+                "deadline": None if deadline is None else format_datetime(deadline),
+                "status": row["status"],
+                "completion_date": None if completion_date is None else format_datetime(completion_date),
+                "owner": row["owner_id"],
+                "recurrence": row["recurrence"],
+                "series": row["series_id"],
+                "occurrence": None if occurrence is None else format_datetime(occurrence),
+            }
+
+        return represent
+
+    @classmethod
+    def _datetime_formatter(cls):
+        output_format = api_settings.DATETIME_FORMAT
+        if not settings.USE_TZ or output_format is None or output_format.lower() != ISO_8601:
+            return cls._datetime.to_representation
+
+        current_timezone = get_current_timezone()
+
+        def format_datetime(value):
+            # Same as DateTimeField.to_representation for aware datetimes
+            value = value.astimezone(current_timezone).isoformat()
+            return value[:-6] + "Z" if value.endswith("+00:00") else value
+
+        return format_datetime
@@ -1,6 +1,20 @@
-from api.models import Task
-from api.serializers import TaskSerializer
-from api.utils import respond, validate
+import csv
+import heapq
+import json
+from datetime import datetime, timedelta, timezone
+from itertools import dropwhile, islice
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models.functions import Collate
+from django.shortcuts import aget_object_or_404
+from django.utils.timezone import now
+from rest_framework.generics import get_object_or_404
+from rest_framework.serializers import ValidationError
+from rest_framework.utils.encoders import JSONEncoder
+from api.models import Task, TaskTombstone, User
+from api.serializers import TaskReadSerializer, TaskSerializer
+from api.utils import conditional, counters, pages, paginate, recurrence, respond, search, tombstones, validate, versions
 
 # Task Management Service Layer
 
@@ -16,39 +30,68 @@ def create_task(request):
     """
     serializer = TaskSerializer(data=request.data, context={"request": request})
     if serializer.is_valid():
-        serializer.save()
+        with transaction.atomic():
+            version = versions.bump(request.user.id)
+            serializer.save(version=version)
+            counters.apply(request.user.id, added=[counters.key(serializer.instance)])
         return respond.created_data(serializer.data)
     return respond.validation_error(serializer.errors)
 
-def get_task(task):
+def get_task(request, id):
     """
     Retrieve a specific task by ID.
     
     Args:
-        task (Task): Task instance to retrieve.
+        request (Request): Incoming HTTP request, possibly conditional.
+        id (int): ID of the task to retrieve.
         
     Returns:
-        Response: Retrieved task data.
+        Response: Retrieved task data, or 304 if the client's copy is current.
     """
-    serializer = TaskSerializer(task)
-    return respond.retreived_data(serializer.data)
+    task = get_object_or_404(TaskReadSerializer.values(Task.objects.all(), "updated_at"), id=id, owner=request.user)
 
-def update_task_status(task, new_status):
+    etag = conditional.etag("task", task["id"], task["updated_at"].timestamp())
+    not_modified = conditional.not_modified(request, etag, task["updated_at"])
+    if not_modified:
+        return not_modified
+
+    response = respond.retreived_data(TaskReadSerializer.to_representation(task))
+    return conditional.validated(response, etag, task["updated_at"])
+
+def update_task_status(request, id, new_status):
     """
-    Update the status of an existing task.
+    Move a task of the authenticated user to a new status in a single conditional update.
     
     Args:
-        task (Task): Task instance to update.
+        request (Request): Incoming HTTP request.
+        id (int): ID of the task to update.
         new_status (str): New status to apply to the task.
         
     Returns:
-        Response: Updated task response or validation error if status is unchanged.
+        Response: Confirmation of update or validation error if status is unchanged.
     """
-    if task.status == new_status:
-        return respond.validation_error(f"Task is already {new_status}")
+    modified = now()
+    completion_date = modified if new_status == Task.Status.COMPLETED else None
+    with transaction.atomic(), connection.cursor() as cursor:
+        version = versions.bump(request.user.id)
+        # Only one of concurrent transitions matches the current status
+        cursor.execute(
+            f"UPDATE {connection.ops.quote_name(Task._meta.db_table)} SET status = %s, completion_date = %s, updated_at = %s, version = %s "
+            "WHERE id = %s AND owner_id = %s AND status <> %s RETURNING category, priority",
+            [new_status, completion_date, modified, version, id, request.user.id, new_status],
+        )
+        updated = cursor.fetchone()
+        if updated:
+            # A task has one of two statuses, so it had the other one
+            previous_status = Task.Status.PENDING if new_status == Task.Status.COMPLETED else Task.Status.COMPLETED
+            counters.apply(request.user.id, added=[(new_status, *updated)], removed=[(previous_status, *updated)])
+            return respond.updated_data()
+        # Nothing changed, the version stays as it was
+        transaction.set_rollback(True)
     
-    updated_data = {"status": new_status}
-    return _update_task(task, updated_data)
+    # The task is missing or already has the status
+    get_object_or_404(Task.objects.only("id"), id=id, owner=request.user)
+    return respond.validation_error(f"Task is already {new_status}")
 
 def update_task(task, task_data):
     """
@@ -59,11 +102,8 @@ def update_task(task, task_data):
         task_data (dict): Data to update in the task.
         
     Returns:
-        Response: Updated task response or validation error.
+        Response: Updated task response, validation error, or 404 if a concurrent request deleted it.
     """
-    if task.status == Task.Status.COMPLETED:
-        return respond.validation_error("Cannot update completed task")
-    
     return _update_task(task, task_data)
 
 def delete_task(task):
@@ -74,35 +114,309 @@ def delete_task(task):
         task (Task): Task instance to delete.
         
     Returns:
-        Response: Confirmation of deletion.
+        Response: Confirmation of deletion, or 404 if a concurrent request deleted it first.
     """
-    task.delete()
+    with transaction.atomic(), connection.cursor() as cursor:
+        version = versions.bump(task.owner_id)
+        # The row as it is deleted, a concurrent write or delete may have committed since it was loaded
+        cursor.execute(
+            f"DELETE FROM {connection.ops.quote_name(Task._meta.db_table)} WHERE id = %s AND owner_id = %s RETURNING status, category, priority",
+            [task.id, task.owner_id],
+        )
+        deleted = cursor.fetchone()
+        if deleted is None:
+            # Already deleted, the version stays as it was
+            transaction.set_rollback(True)
+            return respond.not_found()
+        tombstones.record(task.owner_id, [task.id], version)
+        counters.apply(task.owner_id, removed=[deleted])
     return respond.deleted_data()
 
 def get_tasks(request):
     """
-    Retrieve a list of tasks filtered and sorted by query parameters.
+    Retrieve a page of tasks filtered and sorted by query parameters.
     
     Args:
-        request (Request): Incoming HTTP request containing query parameters for filtering and sorting tasks.
+        request (Request): Incoming HTTP request containing query parameters for filtering, sorting and paginating tasks.
         
     Returns:
-        Response: List of retrieved tasks or validation error.
+        Response: Page of retrieved tasks with the cursor of the next page, validation error,
+        or 304 if the client's copy is current.
     """
-    filters, filters_error = validate.tasks_query_filters(request.query_params)
-    sort, sort_error = validate.tasks_query_sort(request.query_params)
+    params, error = validate.tasks_query(request.query_params)
+    if error:
+        return respond.validation_error(error)
+
+    # The page only changes with the collection version and the normalized query, except
+    # overdue pages, which also change as deadlines pass and are neither validated nor cached
+    overdue = bool(request.query_params.get("overdue"))
+    version, modified = versions.current(request.user.id)
+    query = conditional.digest(params)
+    etag = conditional.etag("tasks", version, query)
+    not_modified = None if overdue else conditional.not_modified(request, etag, modified)
+    if not_modified:
+        return not_modified
+
+    page = None if overdue else pages.get(request.user.id, version, query)
+    if page is None:
+        filters, text, sort, limit, position = params
+        window = recurrence.window(filters)
+        if window:
+            # Recurring tasks are listed as their occurrences in the deadline window
+            tasks, next_cursor = _list_window(request.user, filters, text, sort, limit, position, window)
+        else:
+            field = validate.task_sort_field(sort)
+            tasks = _list_tasks(request.user, filters, text, field)
+            tasks, next_cursor = paginate.keyset(tasks, sort, position, limit, field)
+        page = {"results": TaskReadSerializer.many(tasks), "next": next_cursor}
+        if not overdue:
+            pages.set(request.user.id, version, query, page)
+    
+    if overdue:
+        return respond.retreived_data(page)
+    return conditional.validated(respond.retreived_data(page), etag, modified)
+
+def create_occurrence(request, id):
+    """
+    Store an occurrence of a recurring task, to complete or edit it.
+    
+    Args:
+        request (Request): Incoming HTTP request containing the occurrence and the fields that differ from the series.
+        id (int): ID of the recurring task.
+        
+    Returns:
+        Response: Created task data or validation error response.
+    """
+    series = get_object_or_404(Task, id=id, owner=request.user, recurrence__isnull=False)
+    occurrence = validate.query_datetime(str(request.data.get("occurrence", "")))
+    rule = recurrence.parse(series.recurrence)
+    if occurrence is None or series.deadline is None or not rule.includes(series.deadline, occurrence):
+        return respond.validation_error("Invalid occurrence value")
+
+    serializer = TaskSerializer(data={key: value for key, value in request.data.items() if key != "occurrence"}, partial=True)
+    if not serializer.is_valid():
+        return respond.validation_error(serializer.errors)
+    if serializer.validated_data.get("recurrence"):
+        return respond.validation_error("Occurrences cannot recur")
+
+    with transaction.atomic():
+        # The version bump locks the owner, so an occurrence is only stored once
+        version = versions.bump(request.user.id)
+        if Task.objects.filter(series=series, occurrence=occurrence).exists():
+            transaction.set_rollback(True)
+            return respond.validation_error("Occurrence is already stored")
+        task = Task.objects.create(**{
+            "title": series.title,
+            "description": series.description,
+            "category": series.category,
+            "priority": series.priority,
+            "deadline": occurrence,
+            **TaskSerializer.with_completion_date(dict(serializer.validated_data)),
+            "owner": request.user,
+            "series": series,
+            "occurrence": occurrence,
+            "version": version,
+        })
+        counters.apply(request.user.id, added=[counters.key(task)])
+    return respond.created_data(TaskSerializer(task).data)
+
+def get_task_stats(request):
+    """
+    Count the tasks of the authenticated user from the denormalized counters.
     
+    Args:
+        request (Request): Incoming HTTP request.
+        
+    Returns:
+        Response: Total, pending, completed and overdue counts, overall, by category and by priority.
+    """
+    return respond.retreived_data(counters.stats(request.user.id))
 
-    if filters_error or sort_error:
-        return respond.validation_error(filters_error or sort_error)
+def sync_tasks(request):
+    """
+    Retrieve the tasks written and the IDs of the tasks deleted since a sync token.
     
-    tasks = Task.objects.filter(owner=request.user, **filters)
+    Args:
+        request (Request): Incoming HTTP request, with the "since" token of the last sync if any.
+        
+    Returns:
+        Response: Changed tasks, deleted IDs and the token of the next sync, validation error,
+        or 410 if the tombstones since the token were compacted and a full sync is needed.
+    """
+    since, error = validate.sync_token(request.query_params)
+    if error:
+        return respond.validation_error(error)
+
+    # Up to date clients are answered from the cached version
+    version, _ = versions.current(request.user.id)
+    if since == version:
+        return respond.retreived_data({"tasks": [], "deleted": [], "token": str(version)})
+
+    # The token is read before the changes, a write committed in between is sent again next time
+    version, compacted = User.objects.filter(id=request.user.id).values_list("tasks_version", "tasks_compacted").get()
+    if since is None:
+        tasks, deleted = Task.objects.filter(owner=request.user), []
+    elif since > version:
+        return respond.validation_error("Invalid since value")
+    elif since < compacted:
+        return respond.gone("Sync token expired, sync again without since")
+    else:
+        tasks = Task.objects.filter(owner=request.user, version__gt=since)
+        deleted = list(TaskTombstone.objects.filter(owner=request.user, version__gt=since).values_list("task_id", flat=True))
+
+    return respond.retreived_data({
+        "tasks": TaskReadSerializer.many(TaskReadSerializer.values(tasks.order_by("id"))),
+        "deleted": deleted,
+        "token": str(version),
+    })
+
+def export_tasks(request, export_format):
+    """
+    Stream every task matching the query filters as NDJSON or CSV.
     
-    if sort:
-        tasks = tasks.order_by(sort)
+    Args:
+        request (Request): Incoming HTTP request containing query parameters for filtering tasks.
+        export_format (str): "ndjson" or "csv".
+        
+    Returns:
+        StreamingHttpResponse: Tasks read from a server-side cursor in chunks, or validation error.
+    """
+    filters, filters_error = validate.tasks_query_filters(request.query_params)
+    if filters_error:
+        return respond.validation_error(filters_error)
+
+    tasks = TaskReadSerializer.values(Task.objects.filter(owner=request.user, **filters).order_by("id"))
+    represent = TaskReadSerializer.representer()
+    rows = (represent(task) for task in tasks.iterator(chunk_size=settings.TASKS_EXPORT_CHUNK_SIZE))
+
+    if export_format == "csv":
+        return respond.streamed_data(_csv_lines(rows), "text/csv", "tasks.csv")
+    return respond.streamed_data(_ndjson_lines(rows), "application/x-ndjson", "tasks.ndjson")
+
+def apply_tasks_batch(request):
+    """
+    Apply a batch of create, update, complete, pending and delete operations in one transaction.
     
-    serializer = TaskSerializer(tasks, many=True)
-    return respond.retreived_data(serializer.data)
+    Args:
+        request (Request): Incoming HTTP request containing the list of operations.
+        
+    Returns:
+        Response: Result of each operation, or the error of each failed operation if any failed, in which case nothing is applied.
+    """
+    operations, operations_error = validate.tasks_batch(request.data)
+    if operations_error:
+        return respond.validation_error(operations_error)
+
+    with transaction.atomic():
+        version = versions.bump(request.user.id)
+        # Lock every referenced task for the rest of the transaction
+        ids = {operation.get("id") for operation in operations if isinstance(operation, dict) and _is_id(operation.get("id"))}
+        tasks = Task.objects.select_for_update().filter(owner=request.user, id__in=ids).in_bulk()
+        previous = {id: counters.key(task) for id, task in tasks.items()}
+
+        results, creates, failed = _plan_tasks_batch(request.user, operations, tasks, version)
+        if failed:
+            transaction.set_rollback(True)
+            return respond.validation_error(results)
+
+        # A task updated then deleted in the same batch is only deleted
+        updates = {result["id"]: tasks[result["id"]] for result in results if result["op"] in _BATCH_UPDATES and result["id"] in tasks}
+        deletes = [result["id"] for result in results if result["op"] == "delete"]
+
+        Task.objects.bulk_create(creates, batch_size=_BATCH_SIZE)
+        _bulk_update_tasks(list(updates.values()))
+        if deletes:
+            Task.objects.filter(owner=request.user, id__in=deletes).delete()
+            tombstones.record(request.user.id, deletes, version)
+        # Deleted tasks are no longer in tasks, the others are counted in their new state
+        counters.apply(
+            request.user.id,
+            added=[counters.key(task) for task in [*creates, *tasks.values()]],
+            removed=previous.values(),
+        )
+
+    for result, task in zip((result for result in results if result["op"] == "create"), creates):
+        result["id"] = task.id
+
+    return respond.retreived_data({"results": results})
+
+# Async Task Management Service Layer
+#
+# Reads run on the async ORM. Writes run the sync functions above in a single thread hop,
+# since the version bump has to commit in the same transaction as the task write and
+# the async ORM has no transactions.
+
+async def acreate_task(request):
+    """
+    Async variant of create_task.
+    """
+    return await sync_to_async(create_task)(request)
+
+async def aget_task(request, id):
+    """
+    Async variant of get_task.
+    """
+    task = await aget_object_or_404(TaskReadSerializer.values(Task.objects.all(), "updated_at"), id=id, owner=request.user)
+
+    etag = conditional.etag("task", task["id"], task["updated_at"].timestamp())
+    not_modified = conditional.not_modified(request, etag, task["updated_at"])
+    if not_modified:
+        return not_modified
+
+    response = respond.retreived_data(TaskReadSerializer.to_representation(task))
+    return conditional.validated(response, etag, task["updated_at"])
+
+async def aupdate_task_status(request, id, new_status):
+    """
+    Async variant of update_task_status.
+    """
+    return await sync_to_async(update_task_status)(request, id, new_status)
+
+async def aupdate_task(task, task_data):
+    """
+    Async variant of update_task.
+    """
+    return await sync_to_async(update_task)(task, task_data)
+
+async def adelete_task(task):
+    """
+    Async variant of delete_task.
+    """
+    return await sync_to_async(delete_task)(task)
+
+async def aget_tasks(request):
+    """
+    Async variant of get_tasks.
+    """
+    params, error = validate.tasks_query(request.query_params)
+    if error:
+        return respond.validation_error(error)
+
+    overdue = bool(request.query_params.get("overdue"))
+    version, modified = await versions.acurrent(request.user.id)
+    query = conditional.digest(params)
+    etag = conditional.etag("tasks", version, query)
+    not_modified = None if overdue else conditional.not_modified(request, etag, modified)
+    if not_modified:
+        return not_modified
+
+    page = None if overdue else await pages.aget(request.user.id, version, query)
+    if page is None:
+        filters, text, sort, limit, position = params
+        window = recurrence.window(filters)
+        if window:
+            tasks, next_cursor = await sync_to_async(_list_window)(request.user, filters, text, sort, limit, position, window)
+        else:
+            field = validate.task_sort_field(sort)
+            tasks = _list_tasks(request.user, filters, text, field)
+            tasks, next_cursor = await paginate.akeyset(tasks, sort, position, limit, field)
+        page = {"results": TaskReadSerializer.many(tasks), "next": next_cursor}
+        if not overdue:
+            await pages.aset(request.user.id, version, query, page)
+
+    if overdue:
+        return respond.retreived_data(page)
+    return conditional.validated(respond.retreived_data(page), etag, modified)
 
 # Private Helper Function
 
@@ -117,8 +431,237 @@ def _update_task(task, updated_data):
     Returns:
         Response: Updated task response or validation error.
     """
-    serializer = TaskSerializer(task, data=updated_data, partial=True)
-    if serializer.is_valid():
-        serializer.save()
-        return respond.updated_data()
-    return respond.validation_error(serializer.errors)
+    with transaction.atomic():
+        version = versions.bump(task.owner_id)
+        # Read again under the lock of the owner, a concurrent write may have committed since it was loaded
+        task = Task.objects.select_for_update().filter(id=task.id, owner_id=task.owner_id).first()
+        error = None
+        if task is None:
+            error = respond.not_found()
+        elif task.status == Task.Status.COMPLETED:
+            error = respond.validation_error("Cannot update completed task")
+        else:
+            serializer = TaskSerializer(task, data=updated_data, partial=True)
+            if not serializer.is_valid():
+                error = respond.validation_error(serializer.errors)
+        if error:
+            # Nothing changed, the version stays as it was
+            transaction.set_rollback(True)
+            return error
+
+        previous = counters.key(task)
+        serializer.save(version=version)
+        counters.apply(task.owner_id, added=[counters.key(task)], removed=[previous])
+    return respond.updated_data()
+
+_BATCH_SIZE = 1000
+_BATCH_UPDATES = {"update", "complete", "pending"}
+_BATCH_FIELDS = ["title", "description", "category", "priority", "deadline", "status", "completion_date", "recurrence", "updated_at", "version"]
+_BATCH_STATUSES = {"complete": Task.Status.COMPLETED, "pending": Task.Status.PENDING}
+
+def _list_tasks(user, filters, text, field):
+    """
+    Internal helper to build the rows query of a tasks list page.
+    
+    Args:
+        user (User): Owner of the tasks.
+        filters (dict): Validated filters.
+        text (str): Validated search text, or None.
+        field (str): Sort column to read along with the serialized columns.
+        
+    Returns:
+        QuerySet: Unordered rows of the matching tasks.
+    """
+    tasks = Task.objects.filter(owner=user, **filters)
+    if text:
+        tasks = search.apply(tasks, text)
+    return TaskReadSerializer.values(tasks, field)
+
+# Sorts before every occurrence, stored tasks have no occurrence of their own in the list order
+_FIRST = datetime.min.replace(tzinfo=timezone.utc)
+
+def _list_window(user, filters, text, sort, limit, position, window):
+    """
+    Internal helper to fetch a page of tasks within a deadline window, the stored tasks
+    merged with the occurrences of the recurring tasks, which are generated in list order
+    and only as far as the page needs.
+    
+    Args:
+        user (User): Owner of the tasks.
+        filters (dict): Validated filters, with a deadline window.
+        text (str): Validated search text, or None.
+        sort (str): Validated sort value, or None to sort by id.
+        limit (int): Maximum number of rows in the page.
+        position (tuple): Decoded cursor of the previous page, or None.
+        window (tuple): Inclusive start and exclusive end of the window.
+        
+    Returns:
+        tuple: Rows of the page and the cursor of the next page, or None on the last page.
+    """
+    field = validate.task_sort_field(sort)
+    name, descending = paginate.sort_key(sort)
+    # Rows are merged in Python, which compares titles by code point, as the "C" collation does
+    collated = {"title_c": Collate("title", "C")} if field == "title" else {}
+    column = "title_c" if collated else field or name
+    after, before = window
+
+    tasks = _list_tasks(user, {**filters, "recurrence__isnull": True}, text, field).annotate(**collated)
+    tasks, next_cursor = paginate.keyset(tasks, sort, position, limit, column if field else None)
+
+    # Occurrences are ordered by (sort value, series ID, occurrence) among the tasks
+    def key(row):
+        id = row["id"] or row["series_id"]
+        return (id if column == "id" else row[column]), id, _FIRST if row["id"] else row["occurrence"]
+
+    occurrences = iter(())
+    if filters.get("status", Task.Status.PENDING) == Task.Status.PENDING:
+        series_filters = {lookup: value for lookup, value in filters.items() if not lookup.startswith("deadline__")}
+        series = list(_list_tasks(
+            user, {**series_filters, "status": Task.Status.PENDING, "recurrence__isnull": False, "deadline__lt": before}, text, field,
+        ).annotate(**collated))
+        if series:
+            stored = set(
+                Task.objects.filter(owner=user, series_id__in=[row["id"] for row in series], occurrence__gte=after, occurrence__lt=before)
+                .values_list("series_id", "occurrence")
+            )
+            mark = position and (position[0], position[1], position[2] if len(position) > 2 else _FIRST)
+
+            def expand(row):
+                start, end = after, before
+                # Occurrences before the cursor are not generated, but for those of its sort value
+                if mark and column == "deadline":
+                    start, end = (start, min(end, mark[0] + timedelta(microseconds=1))) if descending else (max(start, mark[0]), end)
+                elif mark:
+                    series_key = (row["id"] if column == "id" else row[column], row["id"])
+                    if (series_key > mark[:2]) if descending else (series_key < mark[:2]):
+                        return iter(())
+                    if series_key == mark[:2]:
+                        start, end = (start, min(end, mark[2])) if descending else (max(start, mark[2]), end)
+                return recurrence.expand(row, start, end, stored, descending)
+
+            occurrences = heapq.merge(*(expand(row) for row in series), key=key, reverse=descending)
+            if mark:
+                occurrences = dropwhile(lambda row: key(row) >= mark if descending else key(row) <= mark, occurrences)
+
+    rows = list(islice(heapq.merge(tasks, islice(occurrences, limit + 1), key=key, reverse=descending), limit + 1))
+    if len(rows) <= limit and next_cursor is None:
+        return rows, None
+    rows = rows[:limit]
+    value, id, occurrence = key(rows[-1])
+    return rows, paginate.encode_cursor(sort, value, id, None if rows[-1]["id"] else occurrence)
+
+def _plan_tasks_batch(user, operations, tasks, version):
+    """
+    Internal helper to validate batch operations and apply them to in-memory tasks.
+    
+    Args:
+        user (User): Owner of the tasks.
+        operations (list): Operations to validate, in order.
+        tasks (dict): Locked tasks by ID, updated in place and emptied of deleted tasks.
+        version (int): Collection version of the batch, stamped on every written task.
+        
+    Returns:
+        tuple: Result of each operation, tasks to create and whether any operation failed.
+    """
+    # One serializer per kind of operation, DRF fields are built once
+    creator = TaskSerializer()
+    updater = TaskSerializer(partial=True)
+    results, creates, failed = [], [], False
+
+    for operation in operations:
+        op = operation.get("op") if isinstance(operation, dict) else None
+        result = {"op": op}
+        results.append(result)
+
+        try:
+            if op == "create":
+                data = creator.run_validation(operation.get("data", {}))
+                creates.append(Task(owner=user, version=version, **data))
+                continue
+
+            # Checked as a string first, lists and dicts cannot be looked up in a set
+            if not isinstance(op, str) or (op not in _BATCH_UPDATES and op != "delete"):
+                raise ValidationError("Invalid operation")
+
+            result["id"] = operation.get("id")
+            if not _is_id(result["id"]):
+                raise ValidationError("Invalid id")
+            task = tasks.get(result["id"])
+            if task is None:
+                raise ValidationError("Not found")
+
+            if op == "delete":
+                del tasks[task.id]
+            elif op == "update":
+                if task.status == Task.Status.COMPLETED:
+                    raise ValidationError("Cannot update completed task")
+                # Validated against the task, as by PUT /task/:id, e.g. its deadline for a recurrence
+                updater.instance = task
+                data = updater.run_validation(operation.get("data", {}))
+                _assign(task, TaskSerializer.with_completion_date(data), version)
+            else:
+                if task.status == _BATCH_STATUSES[op]:
+                    raise ValidationError(f"Task is already {_BATCH_STATUSES[op]}")
+                _assign(task, TaskSerializer.with_completion_date({"status": _BATCH_STATUSES[op]}), version)
+        except ValidationError as error:
+            result["error"] = error.detail
+            failed = True
+
+    return results, creates, failed
+
+def _is_id(value):
+    # JSON true and false are Python ints as well
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def _bulk_update_tasks(tasks):
+    """
+    Internal helper to save tasks with one UPDATE ... FROM (VALUES ...) statement per batch,
+    which avoids the CASE expression per row and field built by QuerySet.bulk_update.
+    
+    Args:
+        tasks (list): Task instances to save.
+    """
+    fields = [Task._meta.get_field(name) for name in _BATCH_FIELDS]
+    table = connection.ops.quote_name(Task._meta.db_table)
+    columns = ", ".join(connection.ops.quote_name(field.column) for field in fields)
+    assignments = ", ".join(
+        f"{connection.ops.quote_name(field.column)} = v.{connection.ops.quote_name(field.column)}::{field.db_type(connection)}"
+        for field in fields
+    )
+
+    with connection.cursor() as cursor:
+        for start in range(0, len(tasks), _BATCH_SIZE):
+            batch = tasks[start:start + _BATCH_SIZE]
+            row = "(" + ", ".join(["%s"] * (len(fields) + 1)) + ")"
+            params = [
+                value
+                for task in batch
+                for value in [task.id, *(field.get_db_prep_save(getattr(task, field.attname), connection) for field in fields)]
+            ]
+            cursor.execute(
+                f"UPDATE {table} SET {assignments} FROM (VALUES {', '.join([row] * len(batch))}) AS v(id, {columns}) "
+                f"WHERE {table}.id = v.id",
+                params,
+            )
+
+def _assign(task, data, version):
+    for field, value in data.items():
+        setattr(task, field, value)
+    task.updated_at = now()
+    task.version = version
+
+def _ndjson_lines(rows):
+    # Same encoding as the JSON responses of the API
+    for row in rows:
+        yield json.dumps(row, cls=JSONEncoder, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+class _Echo:
+    # File-like object handing each CSV line back to the caller
+    def write(self, value):
+        return value
+
+def _csv_lines(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(TaskSerializer.Meta.fields)
+    for row in rows:
+        yield writer.writerow([row[field] for field in TaskSerializer.Meta.fields])
@@ -1,7 +1,11 @@
-from django.contrib.auth import authenticate
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection
+from django.utils.timezone import now
 from rest_framework.authtoken.models import Token
+from api.models import User
 from api.serializers import UserSerializer
-from api.utils import respond, validate
+from api.utils import accounts, conditional, hashing, jobs, respond, validate
 
 # User Management Service Layer
 
@@ -17,22 +21,31 @@ def create_user(user_data):
     """
     serializer = UserSerializer(data=user_data)
     if serializer.is_valid():
-        serializer.save()
+        try:
+            serializer.save()
+        except hashing.Saturated:
+            return respond.service_unavailable("Too many concurrent registrations, try again later")
         return respond.created_data(serializer.data)
     return respond.validation_error(serializer.errors)
 
-def get_user(user):
+def get_user(request, user):
     """
     Retrieve user details.
     
     Args:
+        request (Request): Incoming HTTP request, possibly conditional.
         user (User): User instance to retrieve.
         
     Returns:
-        Response: Retrieved user data.
+        Response: Retrieved user data, or 304 if the client's copy is current.
     """
+    etag = conditional.etag("user", user.id, user.updated_at.timestamp())
+    not_modified = conditional.not_modified(request, etag, user.updated_at)
+    if not_modified:
+        return not_modified
+
     serializer = UserSerializer(user)
-    return respond.retreived_data(serializer.data)
+    return conditional.validated(respond.retreived_data(serializer.data), etag, user.updated_at)
 
 def update_user(user, user_data):
     """
@@ -53,7 +66,7 @@ def update_user(user, user_data):
 
 def delete_user(user):
     """
-    Delete a user.
+    Delete a user, with its tasks deleted in batches now or later by a background job.
     
     Args:
         user (User): User instance to delete.
@@ -61,7 +74,11 @@ def delete_user(user):
     Returns:
         Response: Confirmation of deletion.
     """
-    user.delete()
+    accounts.deactivate(user.id)
+    if settings.USER_DELETION["MODE"] == "immediate":
+        accounts.purge(user.id)
+    else:
+        jobs.enqueue("purge_user", user.id)
     return respond.deleted_data()
 
 def authenticate_user(user_credentials):
@@ -79,13 +96,68 @@ def authenticate_user(user_credentials):
     if not is_valid:
         return respond.validation_error(validation_error)
     
-    # Authenticate user
-    user = authenticate(username=user_credentials['username'], password=user_credentials['password'])
-    if not user:
+    # Authenticate user, the token is read in the same query and the password is checked
+    # in the bounded hashing pool
+    user = User.objects.select_related("auth_token").filter(username=user_credentials['username']).first()
+    try:
+        valid, rehashed = hashing.check_password(user_credentials['password'], user.password if user else None)
+    except hashing.Saturated:
+        return respond.service_unavailable("Too many concurrent logins, try again later")
+    if not valid or not user.is_active:
         return respond.not_found("Incorrect credentials")
 
-    # Generate or retrieve existing token
-    token, _ = Token.objects.get_or_create(user=user)
+    # Store the hash again when the hasher or its iterations changed
+    if rehashed:
+        user.password = rehashed
+        user.save(update_fields=["password"])
+
+    # Retrieve existing token or generate one
+    try:
+        key = user.auth_token.key
+    except Token.DoesNotExist:
+        key = _create_token(user.id)
     
     serializer = UserSerializer(user)
-    return respond.retreived_data({"token": token.key, "user": serializer.data})
+    return respond.retreived_data({"token": key, "user": serializer.data})
+
+# Async User Management Service Layer
+
+async def aget_user(request, user):
+    """
+    Async variant of get_user.
+    """
+    return get_user(request, user)
+
+async def aupdate_user(user, user_data):
+    """
+    Async variant of update_user.
+    """
+    return await sync_to_async(update_user)(user, user_data)
+
+async def adelete_user(user):
+    """
+    Async variant of delete_user.
+    """
+    return await sync_to_async(delete_user)(user)
+
+# Private Helper Function
+
+def _create_token(user_id):
+    """
+    Insert the token of a user, unless a concurrent login already did.
+    
+    Args:
+        user_id (int): ID of the user.
+        
+    Returns:
+        str: Key of the user's token.
+    """
+    # The no-op update on conflict makes RETURNING give the existing key
+    table = Token._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} (key, user_id, created) VALUES (%s, %s, %s) "
+            f"ON CONFLICT (user_id) DO UPDATE SET key = {table}.key RETURNING key",
+            [Token.generate_key(), user_id, now()],
+        )
+        return cursor.fetchone()[0]
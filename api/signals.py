@@ -0,0 +1,30 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+from api.models import CachedBearerTokenAuthentication, User
+from api.utils import metrics
+
+# Token authentication cache invalidation
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, **kwargs):
+    # Password, activation or profile changes must not be served from the cache
+    if not created:
+        CachedBearerTokenAuthentication.invalidate_user(instance.pk)
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    CachedBearerTokenAuthentication.invalidate_user(instance.pk)
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    # Rotating a token deletes the old key
+    CachedBearerTokenAuthentication.invalidate_token(instance.key)
+
+# Request instrumentation
+
+@receiver(connection_created)
+def connection_opened(sender, connection, **kwargs):
+    # Queries count towards the current request, if any, on every connection
+    metrics.instrument(connection)
@@ -0,0 +1,95 @@
+import json
+from rest_framework import status
+from ..models import Task, User
+from .test_task_endpoints import TaskTestCase
+
+class AsyncViewTests(TaskTestCase):
+    '''
+    Test the async variants of the user and task endpoints against the sync ones
+    '''
+
+    def setUp(self):
+        super().setUp()
+        self.url['async'] = '/api/async{}'
+
+    def both(self, method, url, data=None):
+        sync = getattr(self.client, method)('/api' + url, data)
+        asynchronous = getattr(self.client, method)(self.url['async'].format(url), data)
+        return sync, asynchronous
+
+    # Valid data
+
+    def test_tasks_list(self):
+        self.new_tasks()
+        for params in [{'limit': 5}, {'limit': 5, 'sort': '-deadline'}, {'priority': 'HIGH', 'sort': 'title'}]:
+            sync, asynchronous = self.both('get', '/tasks', params)
+            self.assertEqual(asynchronous.status_code, status.HTTP_200_OK)
+            self.assertEqual(json.loads(asynchronous.content), json.loads(sync.content))
+
+    def test_task_details(self):
+        task = Task.objects.create(title='task', owner=self.user)
+        sync, asynchronous = self.both('get', '/task/{}'.format(task.id))
+        self.assertEqual(json.loads(asynchronous.content), json.loads(sync.content))
+        self.assertEqual(asynchronous['ETag'], sync['ETag'])
+        res = self.client.get(self.url['async'].format('/task/{}'.format(task.id)), HTTP_IF_NONE_MATCH=sync['ETag'])
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_task_writes(self):
+        res = self.client.post(self.url['async'].format('/tasks'), {'title': 'task'}, format='json')
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        url = self.url['async'].format('/task/{}'.format(res.json()['id']))
+
+        res = self.client.put(url, {'title': 'renamed'})
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        res = self.client.put(url + '/complete')
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        res = self.client.put(url + '/complete')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        res = self.client.put(url, {'title': 'again'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        res = self.client.delete(url)
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Task.objects.exists())
+
+    def test_user_details(self):
+        sync, asynchronous = self.both('get', '/user')
+        self.assertEqual(json.loads(asynchronous.content), json.loads(sync.content))
+        res = self.client.put(self.url['async'].format('/user'), {'username': 'jane-doe'})
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(User.objects.get(id=self.user.id).username, 'jane-doe')
+
+    async def test_async_client(self):
+        task = await Task.objects.acreate(title='task', owner=self.user)
+        headers = {'Authorization': 'Bearer ' + self.token.key}
+        res = await self.async_client.get(self.url['async'].format('/tasks'), headers=headers)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['id'] for row in res.json()['results']], [task.id])
+
+    # Invalid data
+
+    def test_errors_match_sync_views(self):
+        other = User.objects.create_user(username='jane-doe', email='jane-doe@example.com', password='newpass123')
+        task = Task.objects.create(title='task', owner=other)
+        for method, url, data in [
+            ('get', '/task/{}'.format(task.id), None),
+            ('put', '/task/{}/complete'.format(task.id), None),
+            ('get', '/tasks', {'sort': 'owner'}),
+            ('get', '/tasks', {'cursor': 'invalid'}),
+            ('post', '/tasks', {'title': ''}),
+            ('patch', '/tasks', None),
+        ]:
+            sync, asynchronous = self.both(method, url, data)
+            self.assertEqual(asynchronous.status_code, sync.status_code)
+            self.assertEqual(json.loads(asynchronous.content), json.loads(sync.content))
+
+    def test_unauthenticated(self):
+        self.client.credentials()
+        sync, asynchronous = self.both('get', '/tasks')
+        self.assertEqual(asynchronous.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(json.loads(asynchronous.content), json.loads(sync.content))
+        self.assertEqual(asynchronous['WWW-Authenticate'], sync['WWW-Authenticate'])
+
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer invalid')
+        sync, asynchronous = self.both('get', '/tasks')
+        self.assertEqual(asynchronous.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(json.loads(asynchronous.content), json.loads(sync.content))
@@ -0,0 +1,97 @@
+from django.test import override_settings
+from rest_framework.test import APITestCase
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from ..models import CachedBearerTokenAuthentication, User
+
+class AuthenticationCacheTests(APITestCase):
+    '''
+    Test the cached bearer token authentication
+    '''
+
+    def setUp(self):
+        CachedBearerTokenAuthentication.clear()
+        self.url = '/api/user'
+        self.user = User.objects.create_user(username='john-doe', email='john-doe@example.com', password='newpass123')
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token.key)
+
+    def cached(self):
+        return CachedBearerTokenAuthentication.local_cache().get(self.token.key) is not None
+
+    # Cache hits
+
+    def test_hot_token_skips_database(self):
+        self.client.get(self.url)
+        # Only the user lookup of the view remains
+        with self.assertNumQueries(1):
+            res = self.client.get(self.url)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_stats(self):
+        self.client.get(self.url)
+        self.client.get(self.url)
+        stats = CachedBearerTokenAuthentication.stats()
+        self.assertEqual(stats['misses'], 1)
+        self.assertGreaterEqual(stats['hits'], 1)
+
+    @override_settings(TOKEN_AUTH_CACHE={'MAX_SIZE': 100, 'TTL': 60, 'SHARED_CACHE': 'default'})
+    def test_shared_cache(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(1):
+            self.client.get(self.url)
+        self.assertEqual(CachedBearerTokenAuthentication.stats()['shared_hits'], 1)
+        # The shared cache is the only layer
+        self.assertFalse(self.cached())
+
+    @override_settings(TOKEN_AUTH_CACHE={'MAX_SIZE': 100, 'TTL': 60, 'SHARED_CACHE': 'default'})
+    def test_token_deleted_in_another_process(self):
+        entry = CachedBearerTokenAuthentication().authenticate_credentials(self.token.key)
+        # Another process deletes the token, this one still holds it in memory
+        Token.objects.filter(key=self.token.key).delete()
+        CachedBearerTokenAuthentication.local_cache().set(self.token.key, entry)
+        res = self.client.get(self.url)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(TOKEN_AUTH_CACHE={'MAX_SIZE': 100, 'TTL': 60, 'SHARED_CACHE': 'default'})
+    def test_user_deleted_in_another_process(self):
+        entry = CachedBearerTokenAuthentication().authenticate_credentials(self.token.key)
+        User.objects.filter(pk=self.user.pk).delete()
+        CachedBearerTokenAuthentication.local_cache().set(self.token.key, entry)
+        res = self.client.get('/api/async/tasks')
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    # Invalidation
+
+    def test_invalid_token(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer invalid')
+        res = self.client.get(self.url)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deleted_user(self):
+        self.client.get(self.url)
+        res = self.client.delete(self.url)
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        res = self.client.get(self.url)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change(self):
+        self.client.get(self.url)
+        self.user.set_password('changedpass123')
+        self.user.save()
+        self.assertFalse(self.cached())
+
+    def test_deactivated_user(self):
+        self.client.get(self.url)
+        self.user.is_active = False
+        self.user.save()
+        res = self.client.get(self.url)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(TOKEN_AUTH_CACHE={'MAX_SIZE': 100, 'TTL': 60, 'SHARED_CACHE': 'default'})
+    def test_rotated_token(self):
+        self.client.get(self.url)
+        self.token.delete()
+        Token.objects.create(user=self.user)
+        res = self.client.get(self.url)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,203 @@
+import os
+import tempfile
+from datetime import timedelta
+from unittest import mock
+from django.conf import settings
+from django.core.cache import caches
+from django.test import override_settings
+from django.utils.timezone import now
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from ..models import Task, User
+from ..utils import pages, versions
+from .test_task_endpoints import TaskTestCase
+
+# A file based cache is read by every process, like Redis in production
+SHARED_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': os.path.join(tempfile.gettempdir(), 'api-tests-cache')},
+}
+
+# Two in-memory caches, one per simulated process
+PROCESS_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'default'},
+    'process-a': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'process-a'},
+    'process-b': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'process-b'},
+}
+
+class ConditionalRequestTests(TaskTestCase):
+    '''
+    Test ETag / Last-Modified support of the tasks and user endpoints
+    '''
+
+    def setUp(self):
+        super().setUp()
+        self.url['user'] = '/api/user'
+        self.task = Task.objects.create(title='task', owner=self.user)
+
+    def assertNotModified(self, url, params=None, **headers):
+        res = self.client.get(url, params or {}, **headers)
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res.content, b'')
+
+    # Tasks list
+
+    def test_tasks_not_modified(self):
+        res = self.client.get(self.url['tasks'])
+        self.assertIn('ETag', res)
+        self.assertNotModified(self.url['tasks'], HTTP_IF_NONE_MATCH=res['ETag'])
+
+    @override_settings(CACHES=SHARED_CACHES)
+    def test_tasks_cached_version_needs_no_query(self):
+        caches[settings.TASKS_CACHE].clear()
+        res = self.client.get(self.url['tasks'])
+        with self.assertNumQueries(0):
+            self.assertNotModified(self.url['tasks'], HTTP_IF_NONE_MATCH=res['ETag'])
+
+    def test_tasks_version_of_per_process_cache_is_read(self):
+        res = self.client.get(self.url['tasks'])
+        with self.assertNumQueries(1):
+            self.assertNotModified(self.url['tasks'], HTTP_IF_NONE_MATCH=res['ETag'])
+
+    @override_settings(CACHES=PROCESS_CACHES)
+    def test_tasks_modified_in_another_process(self):
+        with override_settings(TASKS_CACHE='process-b'):
+            etag = self.client.get(self.url['tasks'])['ETag']
+        with override_settings(TASKS_CACHE='process-a'):
+            self.client.put(self.url['task'].format(id=self.task.id), {'title': 'renamed'})
+        with override_settings(TASKS_CACHE='process-b'):
+            res = self.client.get(self.url['tasks'], HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'][0]['title'], 'renamed')
+
+    def test_tasks_modified_by_writes(self):
+        writes = [
+            lambda: self.client.post(self.url['tasks'], {'title': 'new'}),
+            lambda: self.client.put(self.url['task'].format(id=self.task.id), {'title': 'renamed'}),
+            lambda: self.client.put(self.url['task'].format(id=self.task.id) + '/complete'),
+            lambda: self.client.post('/api/tasks/batch', [{'op': 'create', 'data': {'title': 'batch'}}], format='json'),
+            lambda: self.client.delete(self.url['task'].format(id=self.task.id)),
+        ]
+        etag = self.client.get(self.url['tasks'])['ETag']
+        for write in writes:
+            write()
+            res = self.client.get(self.url['tasks'], HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertIsNotNone(res['Last-Modified'])
+            etag = res['ETag']
+
+    def test_tasks_etag_depends_on_query(self):
+        etag = self.client.get(self.url['tasks'])['ETag']
+        res = self.client.get(self.url['tasks'], {'sort': 'title'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+
+    def test_overdue_tasks_are_not_validated(self):
+        deadline = now() + timedelta(hours=1)
+        versions.bump(self.user.id)
+        Task.objects.filter(id=self.task.id).update(deadline=deadline)
+        last_modified = self.client.get(self.url['tasks'])['Last-Modified']
+        for url in [self.url['tasks'], '/api/async/tasks']:
+            with self.subTest(url=url):
+                res = self.client.get(url, {'overdue': 'true'})
+                self.assertEqual(res.data['results'], [])
+                self.assertNotIn('ETag', res)
+                self.assertNotIn('Last-Modified', res)
+                # The task becomes overdue without any write
+                with mock.patch('api.utils.validate.now', return_value=deadline + timedelta(minutes=1)):
+                    res = self.client.get(url, {'overdue': 'true'}, HTTP_IF_MODIFIED_SINCE=last_modified)
+                self.assertEqual(res.status_code, status.HTTP_200_OK)
+                self.assertEqual([task['id'] for task in res.data['results']], [self.task.id])
+
+    # Task details
+
+    def test_task_not_modified(self):
+        url = self.url['task'].format(id=self.task.id)
+        res = self.client.get(url)
+        self.assertNotModified(url, HTTP_IF_NONE_MATCH=res['ETag'])
+        self.assertNotModified(url, HTTP_IF_MODIFIED_SINCE=res['Last-Modified'])
+
+    def test_task_modified(self):
+        url = self.url['task'].format(id=self.task.id)
+        etag = self.client.get(url)['ETag']
+        self.client.put(url, {'title': 'renamed'})
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['title'], 'renamed')
+
+    # User details
+
+    def test_user_not_modified(self):
+        res = self.client.get(self.url['user'])
+        self.assertNotModified(self.url['user'], HTTP_IF_NONE_MATCH=res['ETag'])
+
+    def test_user_modified(self):
+        etag = self.client.get(self.url['user'])['ETag']
+        self.client.put(self.url['user'], {'username': 'jane-doe'})
+        res = self.client.get(self.url['user'], HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['username'], 'jane-doe')
+
+
+class PageCacheTests(TaskTestCase):
+    '''
+    Test the per-user cache of the tasks list pages
+    '''
+
+    def setUp(self):
+        super().setUp()
+        caches[settings.TASKS_CACHE].clear()
+        pages.counter.clear()
+        self.task = Task.objects.create(title='task', owner=self.user)
+
+    @override_settings(CACHES=SHARED_CACHES)
+    def test_repeated_page_is_cached(self):
+        caches[settings.TASKS_CACHE].clear()
+        first = self.client.get(self.url['tasks'], {'limit': 10})
+        # The token and the collection version are cached as well
+        with self.assertNumQueries(0):
+            second = self.client.get(self.url['tasks'], {'limit': 10})
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(pages.stats(), {'hits': 1, 'misses': 1, 'hit_ratio': 0.5})
+
+    def test_pages_depend_on_query(self):
+        self.client.get(self.url['tasks'])
+        res = self.client.get(self.url['tasks'], {'sort': 'title'})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(pages.stats()['hits'], 0)
+
+    def test_writes_invalidate_pages(self):
+        self.client.get(self.url['tasks'])
+        self.client.put(self.url['task'].format(id=self.task.id), {'title': 'renamed'})
+        res = self.client.get(self.url['tasks'])
+        self.assertEqual(res.data['results'][0]['title'], 'renamed')
+        self.client.post(self.url['tasks'], {'title': 'new'})
+        res = self.client.get(self.url['tasks'])
+        self.assertEqual(len(res.data['results']), 2)
+        self.assertEqual(pages.stats()['hits'], 0)
+
+    @override_settings(CACHES=PROCESS_CACHES)
+    def test_pages_of_another_process_write(self):
+        # Both processes cache the page, then one of them writes
+        for process in ['process-a', 'process-b']:
+            with override_settings(TASKS_CACHE=process):
+                self.client.get(self.url['tasks'])
+        with override_settings(TASKS_CACHE='process-a'):
+            self.client.put(self.url['task'].format(id=self.task.id), {'title': 'renamed'})
+        with override_settings(TASKS_CACHE='process-b'):
+            res = self.client.get(self.url['tasks'])
+            self.assertEqual(res.data['results'][0]['title'], 'renamed')
+            # The new version's page is cached in turn
+            self.client.get(self.url['tasks'])
+        self.assertEqual(pages.stats(), {'hits': 1, 'misses': 3, 'hit_ratio': 0.25})
+
+    def test_pages_are_per_user(self):
+        self.client.get(self.url['tasks'])
+        other = User.objects.create_user(username='jane-doe', email='jane-doe@example.com', password='newpass123')
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + Token.objects.create(user=other).key)
+        res = self.client.get(self.url['tasks'])
+        self.assertEqual(res.data['results'], [])
+
+    def test_deleted_user_forgets_version(self):
+        self.client.get(self.url['tasks'])
+        self.client.delete('/api/user')
+        self.assertIsNone(caches[settings.TASKS_CACHE].get('tasks:version:{}'.format(self.user.id)))
@@ -0,0 +1,107 @@
+import re
+from django.test import override_settings
+from rest_framework import status
+from ..models import CachedBearerTokenAuthentication, Task
+from ..utils import metrics, pages
+from .test_task_endpoints import TaskTestCase
+
+@override_settings(INSTRUMENTATION={'ENABLED': True, 'SERVER_TIMING': True, 'SLOW_REQUEST_MS': None})
+class InstrumentationTests(TaskTestCase):
+    '''
+    Test the per-request query counts and timings of the instrumentation middleware
+    '''
+
+    def setUp(self):
+        super().setUp()
+        metrics.registry.clear()
+        CachedBearerTokenAuthentication.clear()
+        pages.counter.clear()
+        self.url['metrics'] = '/api/metrics'
+
+    def server_timing(self, res):
+        # Queries, database, serialization and total milliseconds
+        match = re.fullmatch(r'db;dur=([\d.]+);desc="(\d+) queries", serialize;dur=([\d.]+), total;dur=([\d.]+)', res['Server-Timing'])
+        self.assertIsNotNone(match, res['Server-Timing'])
+        db, queries, serialize, total = match.groups()
+        return int(queries), float(db), float(serialize), float(total)
+
+    def test_server_timing(self):
+        Task.objects.create(title='task', owner=self.user)
+        with self.assertNumQueries(3):
+            res = self.client.get(self.url['tasks'])
+        queries, db, serialize, total = self.server_timing(res)
+        self.assertEqual(queries, 3)
+        self.assertGreater(serialize, 0)
+        self.assertLessEqual(db + serialize, total)
+
+    def test_async_views(self):
+        Task.objects.create(title='task', owner=self.user)
+        res = self.client.get('/api/async/tasks')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.server_timing(res)[0], 3)
+
+    def test_metrics_per_route(self):
+        task = Task.objects.create(title='task', owner=self.user)
+        for _ in range(2):
+            self.client.get(self.url['task'].format(id=task.id))
+        self.client.get(self.url['tasks'])
+
+        snapshot = metrics.registry.snapshot()
+        self.assertEqual(snapshot[('api/task/<int:id>', 'GET')]['count'], 2)
+        # The token is cached by then, leaving the version and page queries
+        self.assertEqual(snapshot[('api/tasks', 'GET')]['queries_sum'], 2)
+
+    def test_prometheus_export(self):
+        self.client.get(self.url['tasks'])
+        self.user.is_staff = True
+        self.user.save()
+        res = self.client.get(self.url['metrics'])
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res['Content-Type'].startswith('text/plain; version=0.0.4'))
+        text = res.content.decode()
+        self.assertIn('# TYPE api_request_duration_seconds histogram', text)
+        self.assertIn('api_request_duration_seconds_count{route="api/tasks",method="GET"} 1', text)
+        self.assertIn('api_request_queries_bucket{route="api/tasks",method="GET",le="+Inf"} 1', text)
+        self.assertIn('api_request_db_seconds_total{route="api/tasks",method="GET"}', text)
+
+    def test_cache_metrics(self):
+        self.user.is_staff = True
+        self.user.save()
+        for _ in range(3):
+            self.client.get(self.url['tasks'])
+        text = self.client.get(self.url['metrics']).content.decode()
+        # The token is looked up once, the page is cached by the first request
+        self.assertIn('api_cache_hits_total{cache="token_auth"} 3', text)
+        self.assertIn('api_cache_misses_total{cache="token_auth"} 1', text)
+        self.assertIn('# TYPE api_cache_hit_ratio gauge', text)
+        self.assertIn('api_cache_hit_ratio{cache="tasks_pages"} 0.6666666666666666', text)
+
+    @override_settings(INSTRUMENTATION={'ENABLED': True, 'SERVER_TIMING': False, 'SLOW_REQUEST_MS': None})
+    def test_server_timing_of_staff_only(self):
+        res = self.client.get(self.url['tasks'])
+        self.assertNotIn('Server-Timing', res)
+        self.assertEqual(metrics.registry.snapshot()[('api/tasks', 'GET')]['count'], 1)
+
+        self.user.is_staff = True
+        self.user.save()
+        res = self.client.get(self.url['tasks'])
+        self.assertEqual(self.server_timing(res)[0], 2)
+
+    def test_metrics_need_admin(self):
+        res = self.client.get(self.url['metrics'])
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    @override_settings(INSTRUMENTATION={'ENABLED': True, 'SERVER_TIMING': False, 'SLOW_REQUEST_MS': 0})
+    def test_slow_request_log(self):
+        Task.objects.create(title='task', owner=self.user)
+        with self.assertLogs('api.slow_requests', 'WARNING') as logs:
+            self.client.get(self.url['tasks'], {'priority': 'HIGH'})
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn('GET /api/tasks?priority=HIGH (api/tasks)', logs.output[0])
+        self.assertIn('FROM "api_task"', logs.output[0])
+
+    @override_settings(INSTRUMENTATION={'ENABLED': False, 'SERVER_TIMING': True, 'SLOW_REQUEST_MS': None})
+    def test_disabled(self):
+        res = self.client.get(self.url['tasks'])
+        self.assertNotIn('Server-Timing', res)
+        self.assertEqual(metrics.registry.snapshot(), {})
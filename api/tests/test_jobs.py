@@ -0,0 +1,108 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.db import connections, transaction
+from django.test import override_settings
+from django.utils.timezone import now
+from rest_framework.test import APITestCase, APITransactionTestCase
+from ..models import Job
+from ..utils import jobs
+
+calls = []
+
+@jobs.register('test.record')
+def record(*args):
+    calls.append(args)
+
+@jobs.register('test.fail')
+def fail():
+    raise ValueError('job failed')
+
+class JobTests(APITestCase):
+    '''
+    Test the queueing, retries and recovery of background jobs
+    '''
+
+    def setUp(self):
+        calls.clear()
+
+    def test_run(self):
+        job = jobs.enqueue('test.record', 1, 'two')
+        self.assertEqual(job.status, Job.Status.QUEUED)
+        self.assertEqual(calls, [])
+        self.assertEqual(jobs.work(once=True), 1)
+        self.assertEqual(calls, [(1, 'two')])
+        # Succeeded jobs are deleted
+        self.assertFalse(Job.objects.exists())
+
+    def test_unknown_job(self):
+        with self.assertRaises(LookupError):
+            jobs.enqueue('test.missing')
+
+    @override_settings(JOBS={'BACKEND': 'database', 'MAX_ATTEMPTS': 2, 'RETRY_DELAY': 10, 'POLL_INTERVAL': 0, 'TIMEOUT': 600})
+    def test_retries(self):
+        job = jobs.enqueue('test.fail')
+        self.assertEqual(jobs.work(once=True), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.QUEUED)
+        self.assertEqual(job.attempts, 1)
+        self.assertIn('ValueError: job failed', job.error)
+        self.assertGreater(job.run_at, now() + timedelta(seconds=9))
+
+        # Not due before its retry delay
+        self.assertEqual(jobs.work(once=True), 0)
+        Job.objects.filter(id=job.id).update(run_at=now())
+        with self.assertLogs('api.jobs', 'ERROR'):
+            self.assertEqual(jobs.work(once=True), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.FAILED)
+        self.assertEqual(job.attempts, 2)
+        self.assertIsNone(job.locked_at)
+
+    @override_settings(JOBS={'BACKEND': 'database', 'MAX_ATTEMPTS': 2, 'RETRY_DELAY': 10, 'POLL_INTERVAL': 0, 'TIMEOUT': 600})
+    def test_recover(self):
+        lost = now() - timedelta(seconds=601)
+        requeued = Job.objects.create(name='test.record', args=[1], status=Job.Status.RUNNING, attempts=1, locked_at=lost)
+        failed = Job.objects.create(name='test.record', args=[2], status=Job.Status.RUNNING, attempts=2, locked_at=lost)
+        running = Job.objects.create(name='test.record', args=[3], status=Job.Status.RUNNING, attempts=1, locked_at=now())
+
+        self.assertEqual(jobs.work(once=True), 1)
+        self.assertEqual(calls, [(1,)])
+        self.assertFalse(Job.objects.filter(id=requeued.id).exists())
+        self.assertEqual(Job.objects.get(id=failed.id).status, Job.Status.FAILED)
+        self.assertEqual(Job.objects.get(id=running.id).status, Job.Status.RUNNING)
+
+    @override_settings(JOBS={'BACKEND': 'local', 'WORKERS': 2, 'MAX_ATTEMPTS': 2, 'RETRY_DELAY': 0, 'POLL_INTERVAL': 0, 'TIMEOUT': 600})
+    def test_local_backend(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertIsNone(jobs.enqueue('test.record', 1))
+            # Nothing runs before the commit
+            self.assertEqual(calls, [])
+        jobs.reset()
+        self.assertEqual(calls, [(1,)])
+        self.assertFalse(Job.objects.exists())
+
+class ConcurrentJobTests(APITransactionTestCase):
+    '''
+    Test that concurrent workers never claim the same job
+    '''
+
+    def claim(self, limit):
+        try:
+            return [job.id for job in jobs.claim(limit)]
+        finally:
+            connections.close_all()
+
+    def test_skip_locked(self):
+        first, second = jobs.enqueue('test.record', 1), jobs.enqueue('test.record', 2)
+        with transaction.atomic():
+            # Another worker holds the first job
+            Job.objects.select_for_update().get(id=first.id)
+            with ThreadPoolExecutor(1) as executor:
+                self.assertEqual(executor.submit(self.claim, 10).result(), [second.id])
+
+    def test_concurrent_workers(self):
+        Job.objects.bulk_create([Job(name='test.record', args=[n]) for n in range(100)])
+        with ThreadPoolExecutor(4) as executor:
+            claimed = sum(executor.map(lambda _: self.claim(10), range(10)), [])
+        self.assertEqual(len(claimed), 100)
+        self.assertEqual(len(set(claimed)), 100)
@@ -0,0 +1,118 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+from rest_framework.test import APIClient, APITestCase
+from rest_framework.authtoken.models import Token
+from ..models import CachedBearerTokenAuthentication, Task, User
+
+class QueryBudgetTests(APITestCase):
+    '''
+    Test the exact number of SQL queries of every endpoint, at several data sizes
+
+    Budgets are counted with cold caches: the token and the task collection version
+    are read from the database once per request. A query per row, e.g. a related
+    object read by a serializer, breaks the budget at the larger sizes.
+    '''
+
+    SIZES = [1, 10, 100]
+
+    # Request name, budget
+    BUDGETS = {
+        'GET /': 0,
+        'POST /user/register': 3,
+        'POST /user/login': 1,
+        'GET /user': 2,
+        'PUT /user': 4,
+        'DELETE /user': 15,
+        'GET /tasks': 3,
+        'GET /tasks filtered and sorted': 3,
+        'GET /tasks next page': 3,
+        'GET /tasks search': 3,
+        'GET /tasks window': 5,
+        'POST /tasks': 4,
+        'POST /tasks/batch create': 4,
+        'POST /tasks/batch update': 5,
+        'POST /tasks/batch delete': 6,
+        'GET /tasks/stats': 3,
+        'GET /tasks/sync': 4,
+        'GET /tasks/sync since': 5,
+        'GET /tasks/export/ndjson': 2,
+        'GET /tasks/export/csv': 2,
+        'GET /task/<id>': 2,
+        'PUT /task/<id>': 5,
+        'PUT /task/<id>/complete': 4,
+        'PUT /task/<id>/pending': 4,
+        'DELETE /task/<id>': 6,
+        'POST /task/<id>/occurrences': 6,
+        'GET /metrics': 1,
+    }
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='john-doe', email='john-doe@example.com', password='newpass123', is_staff=True)
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token.key)
+
+    def requests(self, size):
+        # Requests of every endpoint, the writes touch size tasks when they can
+        tasks = Task.objects.bulk_create([Task(title='task-{}'.format(i), owner=self.user) for i in range(2 * size + 2)])
+        ids = [task.id for task in tasks]
+        Task.objects.filter(id=ids[-2]).update(status=Task.Status.COMPLETED)
+        series = Task.objects.create(title='daily', deadline=now() - timedelta(days=1), recurrence='FREQ=DAILY', owner=self.user)
+        window = {'due_after': now().isoformat(), 'due_before': (now() + timedelta(days=size)).isoformat()}
+        # One write, so that syncs since version 0 read the changes
+        self.client.post('/api/tasks', {'title': 'first'})
+        first_page = self.client.get('/api/tasks', {'limit': size})
+        anonymous = APIClient()
+        return {
+            'GET /': lambda: anonymous.get('/api/'),
+            'POST /user/register': lambda: anonymous.post('/api/user/register', {'username': 'jane-doe', 'email': 'jane-doe@example.com', 'password': 'newpass123'}),
+            'POST /user/login': lambda: anonymous.post('/api/user/login', {'username': 'john-doe', 'password': 'newpass123'}),
+            'GET /user': lambda: self.client.get('/api/user'),
+            'PUT /user': lambda: self.client.put('/api/user', {'username': 'john-doe-2'}),
+            'DELETE /user': lambda: self.client.delete('/api/user'),
+            'GET /tasks': lambda: self.client.get('/api/tasks', {'limit': size}),
+            'GET /tasks filtered and sorted': lambda: self.client.get('/api/tasks', {'status': 'PENDING', 'priority': 'LOW', 'sort': '-title', 'limit': size}),
+            'GET /tasks next page': lambda: self.client.get('/api/tasks', {'limit': size, 'cursor': first_page.data['next']}),
+            'GET /tasks search': lambda: self.client.get('/api/tasks', {'q': 'task', 'limit': size}),
+            'GET /tasks window': lambda: self.client.get('/api/tasks', {**window, 'limit': size}),
+            'POST /tasks': lambda: self.client.post('/api/tasks', {'title': 'new'}),
+            'POST /tasks/batch create': lambda: self.client.post('/api/tasks/batch', [{'op': 'create', 'data': {'title': 'new'}}] * size, format='json'),
+            'POST /tasks/batch update': lambda: self.client.post('/api/tasks/batch', [{'op': 'complete', 'id': id} for id in ids[:size]], format='json'),
+            'POST /tasks/batch delete': lambda: self.client.post('/api/tasks/batch', [{'op': 'delete', 'id': id} for id in ids[size:2 * size]], format='json'),
+            'GET /tasks/stats': lambda: self.client.get('/api/tasks/stats'),
+            'GET /tasks/sync': lambda: self.client.get('/api/tasks/sync'),
+            'GET /tasks/sync since': lambda: self.client.get('/api/tasks/sync', {'since': 0}),
+            'GET /tasks/export/ndjson': lambda: b''.join(self.client.get('/api/tasks/export/ndjson').streaming_content),
+            'GET /tasks/export/csv': lambda: b''.join(self.client.get('/api/tasks/export/csv').streaming_content),
+            'GET /task/<id>': lambda: self.client.get('/api/task/{}'.format(ids[-1])),
+            'PUT /task/<id>': lambda: self.client.put('/api/task/{}'.format(ids[-1]), {'title': 'renamed'}),
+            'PUT /task/<id>/complete': lambda: self.client.put('/api/task/{}/complete'.format(ids[-1])),
+            'PUT /task/<id>/pending': lambda: self.client.put('/api/task/{}/pending'.format(ids[-2])),
+            'DELETE /task/<id>': lambda: self.client.delete('/api/task/{}'.format(ids[-1])),
+            'POST /task/<id>/occurrences': lambda: self.client.post('/api/task/{}/occurrences'.format(series.id), {'occurrence': series.deadline + timedelta(days=1), 'status': 'COMPLETED'}),
+            'GET /metrics': lambda: self.client.get('/api/metrics'),
+        }
+
+    def test_every_endpoint_has_a_budget(self):
+        self.assertEqual(set(self.requests(1)), set(self.BUDGETS))
+
+    def test_budgets(self):
+        for size in self.SIZES:
+            requests = self.requests(size)
+            for name, budget in self.BUDGETS.items():
+                with self.subTest(size=size, request=name):
+                    # Each request runs in a savepoint rolled back afterwards, with cold caches
+                    sid = connection.savepoint()
+                    CachedBearerTokenAuthentication.clear()
+                    caches[settings.TASKS_CACHE].clear()
+                    with CaptureQueriesContext(connection) as context:
+                        res = requests[name]()
+                    connection.savepoint_rollback(sid)
+                    if hasattr(res, 'status_code'):
+                        self.assertLess(res.status_code, 400, name)
+                    queries = [query['sql'] for query in context.captured_queries if 'SAVEPOINT' not in query['sql']]
+                    self.assertEqual(len(queries), budget, '\n'.join(queries))
+            Task.objects.all().delete()
@@ -0,0 +1,61 @@
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from unittest import mock, skipIf
+from uuid import UUID
+from django.test import TestCase
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ErrorDetail
+from rest_framework.utils.serializer_helpers import ReturnDict
+from .. import renderers
+from ..models import Task, User
+from ..serializers import TaskReadSerializer, TaskSerializer
+
+class FastJSONRendererTests(TestCase):
+    '''
+    Test that the fast JSON renderer renders exactly like the stdlib one
+    '''
+
+    def assertSameOutput(self, data, accepted_media_type=None, renderer_context=None):
+        expected = renderers.JSONRenderer().render(data, accepted_media_type, renderer_context)
+        actual = renderers.FastJSONRenderer().render(data, accepted_media_type, renderer_context)
+        self.assertEqual(actual, expected)
+
+    def test_tasks(self):
+        user = User.objects.create_user(username='john-doe', email='john-doe@example.com', password='newpass123')
+        Task.objects.create(title='plain', owner=user)
+        Task.objects.create(
+            title='full "quoted" — ünïcode \u2028 \u2029', description='line\nbreak\ttab\x01',
+            category=Task.Category.WORK, priority=Task.Priority.HIGH, status=Task.Status.COMPLETED,
+            deadline=datetime(2030, 1, 2, 3, 4, 5, 678901, tzinfo=timezone.utc), owner=user,
+        )
+        tasks = Task.objects.order_by('id')
+        self.assertSameOutput({'results': TaskReadSerializer.many(TaskReadSerializer.values(tasks)), 'next': None})
+        self.assertSameOutput(TaskSerializer(tasks, many=True).data)
+
+    def test_values(self):
+        moment = datetime(2030, 1, 2, 3, 4, 5, 678901, tzinfo=timezone.utc)
+        self.assertSameOutput({
+            'datetimes': [moment, moment.replace(microsecond=0), moment.replace(tzinfo=None), moment.astimezone(timezone(timedelta(hours=-5)))],
+            'date': date(2030, 1, 2),
+            'duration': timedelta(days=1, seconds=5),
+            'choices': [Task.Status.PENDING, Task.Priority.HIGH],
+            'uuid': UUID('12345678-1234-5678-1234-567812345678'),
+            'decimal': Decimal('2'),
+            'lazy': gettext_lazy('Not found'),
+            'error': ErrorDetail('Invalid', code='invalid'),
+            'tuple': (1, True, None),
+            'int keys': {1: 'one'},
+            'big': 2 ** 70,
+            'nested': ReturnDict({'empty': [], 'dict': {}}, serializer=None),
+        })
+
+    def test_indent_and_empty(self):
+        self.assertSameOutput({'a': [1, 2]}, 'application/json; indent=4')
+        self.assertSameOutput({'a': [1, 2]}, renderer_context={'indent': 2})
+        self.assertEqual(renderers.FastJSONRenderer().render(None), b'')
+
+    @skipIf(renderers.orjson is None, 'orjson is not installed')
+    def test_fallback(self):
+        data = {'deadline': datetime(2030, 1, 2, tzinfo=timezone.utc), 'title': 'ünïcode'}
+        with mock.patch.object(renderers, 'orjson', None):
+            self.assertEqual(renderers.FastJSONRenderer().render(data), renderers.JSONRenderer().render(data))
@@ -0,0 +1,46 @@
+from datetime import datetime, timedelta, timezone
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.utils import timezone as django_timezone
+from rest_framework.renderers import JSONRenderer
+from ..models import Task, User
+from ..serializers import TaskReadSerializer, TaskSerializer
+
+class TaskReadSerializerTests(TestCase):
+    '''
+    Test that the fast task serializer renders exactly like TaskSerializer
+    '''
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='john-doe', email='john-doe@example.com', password='newpass123')
+        moment = datetime(2030, 1, 2, 3, 4, 5, 678901, tzinfo=timezone.utc)
+        Task.objects.bulk_create([
+            Task(title='plain', owner=self.user),
+            Task(
+                title='full "quoted" — ünïcode',
+                description='line\nbreak',
+                category=Task.Category.WORK,
+                priority=Task.Priority.HIGH,
+                deadline=moment,
+                status=Task.Status.COMPLETED,
+                completion_date=moment.replace(microsecond=0) - timedelta(days=1),
+                owner=self.user,
+            ),
+        ])
+
+    def assertSameOutput(self):
+        tasks = Task.objects.order_by('id')
+        expected = JSONRenderer().render(TaskSerializer(tasks, many=True).data)
+        actual = JSONRenderer().render(TaskReadSerializer.many(TaskReadSerializer.values(tasks)))
+        self.assertEqual(actual, expected)
+
+    def test_same_output(self):
+        self.assertSameOutput()
+
+    def test_same_output_in_another_timezone(self):
+        with django_timezone.override('America/New_York'):
+            self.assertSameOutput()
+
+    def test_same_output_with_datetime_format(self):
+        with override_settings(REST_FRAMEWORK={**settings.REST_FRAMEWORK, 'DATETIME_FORMAT': '%d/%m/%Y %H:%M'}):
+            self.assertSameOutput()
@@ -0,0 +1,578 @@
+import csv
+import json
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from threading import Barrier
+from django.db import connection, connections
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+from rest_framework.test import APIClient, APITestCase, APITransactionTestCase
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from ..models import Task, TaskTombstone, User
+from ..services import task_service
+from ..utils import counters, paginate
+
+class TaskTestCase(APITestCase):
+    def setUp(self):
+        self.url = {
+            'tasks': '/api/tasks',
+            'task': '/api/task/{id}',
+        }
+        self.user = User.objects.create_user(username='john-doe', email='john-doe@example.com', password='newpass123')
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token.key)
+
+    def new_tasks(self):
+        # Repeated titles, priorities and deadlines, some deadlines missing
+        base = now() + timedelta(days=1)
+        priorities = [Task.Priority.LOW, Task.Priority.MEDIUM, Task.Priority.HIGH]
+        return Task.objects.bulk_create([
+            Task(
+                title='task-{}'.format(i % 4),
+                priority=priorities[i % 3],
+                deadline=None if i % 5 == 0 else base + timedelta(hours=i % 3),
+                owner=self.user,
+            )
+            for i in range(17)
+        ])
+
+
+class PaginationTests(TaskTestCase):
+    '''
+    Test the keyset pagination of the tasks list endpoint
+    '''
+
+    def fetch_all(self, sort=None, limit=3):
+        ids, cursor = [], None
+        while True:
+            params = {'limit': limit}
+            if sort:
+                params['sort'] = sort
+            if cursor:
+                params['cursor'] = cursor
+            res = self.client.get(self.url['tasks'], params)
+            self.assertEqual(res.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(res.data['results']), limit)
+            ids += [task['id'] for task in res.data['results']]
+            cursor = res.data['next']
+            if not cursor:
+                return ids
+
+    def expected(self, tasks, sort):
+        # NULL sorts after every value, descending order is the exact reverse
+        field = sort.lstrip('-') if sort else 'id'
+        ranks = {Task.Priority.LOW: 0, Task.Priority.MEDIUM: 1, Task.Priority.HIGH: 2}
+        value = lambda task: ranks[task.priority] if field == 'priority' else getattr(task, field)
+        ordered = sorted(tasks, key=lambda task: (value(task) is None, value(task) or 0, task.id))
+        if sort and sort.startswith('-'):
+            ordered.reverse()
+        return [task.id for task in ordered]
+
+    # Valid data
+
+    def test_first_page(self):
+        self.new_tasks()
+        res = self.client.get(self.url['tasks'], {'limit': 5})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data['results']), 5)
+        self.assertIsNotNone(res.data['next'])
+
+    def test_single_page(self):
+        self.new_tasks()
+        res = self.client.get(self.url['tasks'])
+        self.assertEqual(len(res.data['results']), 17)
+        self.assertIsNone(res.data['next'])
+
+    def test_every_sort(self):
+        tasks = self.new_tasks()
+        for sort in [None, 'title', '-title', 'deadline', '-deadline', 'priority', '-priority']:
+            with self.subTest(sort=sort):
+                self.assertEqual(self.fetch_all(sort), self.expected(tasks, sort))
+
+    def test_priority_rank(self):
+        self.new_tasks()
+        res = self.client.get(self.url['tasks'], {'sort': 'priority'})
+        priorities = [task['priority'] for task in res.data['results']]
+        self.assertEqual(priorities, sorted(priorities, key=['LOW', 'MEDIUM', 'HIGH'].index))
+        res = self.client.get(self.url['tasks'], {'sort': '-priority', 'limit': 1})
+        self.assertEqual(res.data['results'][0]['priority'], Task.Priority.HIGH)
+
+    def test_filters(self):
+        tasks = self.new_tasks()
+        high = [task for task in tasks if task.priority == Task.Priority.HIGH]
+        res = self.client.get(self.url['tasks'], {'priority': 'HIGH', 'sort': 'deadline', 'limit': 2})
+        self.assertTrue(all(task['priority'] == 'HIGH' for task in res.data['results']))
+        self.assertEqual([task['id'] for task in res.data['results']], self.expected(high, 'deadline')[:2])
+
+    @override_settings(TASKS_MAX_PAGE_SIZE=4)
+    def test_limit_cap(self):
+        self.new_tasks()
+        res = self.client.get(self.url['tasks'], {'limit': 100})
+        self.assertEqual(len(res.data['results']), 4)
+
+    def test_no_offset(self):
+        self.new_tasks()
+        first = self.client.get(self.url['tasks'], {'sort': '-deadline', 'limit': 2})
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(self.url['tasks'], {'sort': '-deadline', 'limit': 2, 'cursor': first.data['next']})
+        self.assertFalse(any('OFFSET' in query['sql'] for query in context.captured_queries))
+
+    # Invalid data
+
+    def test_invalid_limit(self):
+        for limit in ['0', '-1', 'ten', '²', '١٠']:
+            with self.subTest(limit=limit):
+                res = self.client.get(self.url['tasks'], {'limit': limit})
+                self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_invalid_cursor(self):
+        res = self.client.get(self.url['tasks'], {'cursor': 'not-a-cursor'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_tampered_priority_cursor(self):
+        for value in ['x', [1], {'v': 1}]:
+            with self.subTest(value=value):
+                cursor = paginate.encode_cursor('priority', value, 1)
+                res = self.client.get(self.url['tasks'], {'sort': 'priority', 'cursor': cursor})
+                self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertEqual(res.data['error'], 'Invalid cursor value')
+
+    def test_nul_in_title_cursor(self):
+        for sort in ['title', '-title']:
+            with self.subTest(sort=sort):
+                res = self.client.get(self.url['tasks'], {'sort': sort, 'cursor': paginate.encode_cursor(sort, 'task\u0000', 1)})
+                self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertEqual(res.data['error'], 'Invalid cursor value')
+
+    def test_every_error_is_reported(self):
+        res = self.client.get(self.url['tasks'], {'status': 'DONE', 'sort': 'owner', 'limit': '0', 'page': '2'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data['error'], 'Invalid status value; Invalid sort value; Invalid limit value; Unknown page parameter')
+
+    def test_cursor_of_another_sort(self):
+        self.new_tasks()
+        first = self.client.get(self.url['tasks'], {'sort': 'title', 'limit': 2})
+        res = self.client.get(self.url['tasks'], {'sort': 'deadline', 'cursor': first.data['next']})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class BatchTests(TaskTestCase):
+    '''
+    Test the tasks batch endpoint
+    '''
+
+    def setUp(self):
+        super().setUp()
+        self.url['batch'] = '/api/tasks/batch'
+
+    # Valid data
+
+    def test_success(self):
+        pending, completed, removed = Task.objects.bulk_create([
+            Task(title='pending', owner=self.user),
+            Task(title='completed', status=Task.Status.COMPLETED, owner=self.user),
+            Task(title='removed', owner=self.user),
+        ])
+        res = self.client.post(self.url['batch'], [
+            {'op': 'create', 'data': {'title': 'created', 'priority': 'HIGH'}},
+            {'op': 'update', 'id': pending.id, 'data': {'title': 'updated'}},
+            {'op': 'complete', 'id': pending.id},
+            {'op': 'pending', 'id': completed.id},
+            {'op': 'delete', 'id': removed.id},
+        ], format='json')
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([result['op'] for result in res.data['results']], ['create', 'update', 'complete', 'pending', 'delete'])
+
+        created = Task.objects.get(id=res.data['results'][0]['id'])
+        self.assertEqual((created.title, created.priority, created.owner), ('created', Task.Priority.HIGH, self.user))
+        pending.refresh_from_db()
+        self.assertEqual((pending.title, pending.status), ('updated', Task.Status.COMPLETED))
+        self.assertIsNotNone(pending.completion_date)
+        completed.refresh_from_db()
+        self.assertEqual(completed.status, Task.Status.PENDING)
+        self.assertIsNone(completed.completion_date)
+        self.assertFalse(Task.objects.filter(id=removed.id).exists())
+
+    def test_constant_queries(self):
+        self.client.get(self.url['tasks'])
+        counts = []
+        for size in [5, 50]:
+            with CaptureQueriesContext(connection) as context:
+                self.client.post(self.url['batch'], [{'op': 'create', 'data': {'title': 'task'}}] * size, format='json')
+            counts.append(len(context.captured_queries))
+        self.assertEqual(counts[0], counts[1])
+
+    # Invalid data
+
+    def test_invalid_operation_applies_nothing(self):
+        task = Task.objects.create(title='task', owner=self.user)
+        res = self.client.post(self.url['batch'], [
+            {'op': 'delete', 'id': task.id},
+            {'op': 'create', 'data': {'title': ''}},
+            {'op': 'archive', 'id': task.id},
+        ], format='json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(['error' in result for result in res.data['error']], [False, True, True])
+        self.assertTrue(Task.objects.filter(id=task.id).exists())
+
+    def test_invalid_ids(self):
+        task = Task.objects.create(title='task', owner=self.user)
+        res = self.client.post(self.url['batch'], [
+            {'op': 'delete', 'id': [task.id]},
+            {'op': 'delete', 'id': {'id': task.id}},
+            {'op': 'delete', 'id': True},
+            {'op': 'complete', 'id': str(task.id)},
+        ], format='json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([result['error'] for result in res.data['error']], [['Invalid id']] * 4)
+        self.assertTrue(Task.objects.filter(id=task.id).exists())
+
+    def test_invalid_operations(self):
+        task = Task.objects.create(title='task', owner=self.user)
+        res = self.client.post(self.url['batch'], [
+            {'op': ['delete'], 'id': task.id},
+            {'op': {'op': 'delete'}, 'id': task.id},
+            {'op': 'archive', 'id': task.id},
+            {'id': task.id},
+        ], format='json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([result['error'] for result in res.data['error']], [['Invalid operation']] * 4)
+        self.assertTrue(Task.objects.filter(id=task.id).exists())
+
+    def test_other_owner(self):
+        other = User.objects.create_user(username='jane-doe', email='jane-doe@example.com', password='newpass123')
+        task = Task.objects.create(title='task', owner=other)
+        res = self.client.post(self.url['batch'], [{'op': 'delete', 'id': task.id}], format='json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(Task.objects.filter(id=task.id).exists())
+
+    def test_update_completed(self):
+        task = Task.objects.create(title='task', status=Task.Status.COMPLETED, owner=self.user)
+        res = self.client.post(self.url['batch'], [{'op': 'update', 'id': task.id, 'data': {'title': 'new'}}], format='json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(TASKS_BATCH_MAX_OPERATIONS=2)
+    def test_too_many_operations(self):
+        res = self.client.post(self.url['batch'], [{'op': 'create', 'data': {'title': 'task'}}] * 3, format='json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_not_a_list(self):
+        res = self.client.post(self.url['batch'], {'op': 'create'}, format='json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ExportTests(TaskTestCase):
+    '''
+    Test the streamed tasks export endpoint
+    '''
+
+    def setUp(self):
+        super().setUp()
+        self.url['export'] = '/api/tasks/export/{format}'
+
+    def export(self, format, params=None):
+        res = self.client.get(self.url['export'].format(format=format), params or {})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return b''.join(res.streaming_content).decode()
+
+    # Valid data
+
+    def test_ndjson(self):
+        tasks = self.new_tasks()
+        lines = self.export('ndjson').splitlines()
+        self.assertEqual([json.loads(line)['id'] for line in lines], [task.id for task in tasks])
+        self.assertEqual(json.loads(lines[0]), json.loads(json.dumps(self.client.get(self.url['task'].format(id=tasks[0].id)).data)))
+
+    def test_csv(self):
+        self.new_tasks()
+        rows = list(csv.reader(self.export('csv', {'priority': 'HIGH'}).splitlines()))
+        self.assertEqual(rows[0][:3], ['id', 'title', 'description'])
+        self.assertEqual(len(rows), 1 + Task.objects.filter(priority=Task.Priority.HIGH).count())
+        self.assertTrue(all(row[4] == 'HIGH' for row in rows[1:]))
+
+    @override_settings(TASKS_EXPORT_CHUNK_SIZE=100)
+    def test_constant_memory(self):
+        # Exporting nine times more rows must not need nine times more memory,
+        # the first export warms up module level caches
+        Task.objects.bulk_create(
+            [Task(title='work-{}'.format(i), description='x' * 200, category=Task.Category.WORK, owner=self.user) for i in range(400)]
+            + [Task(title='personal-{}'.format(i), description='x' * 200, category=Task.Category.PERSONAL, owner=self.user) for i in range(3600)]
+        )
+        peaks = []
+        for category in ['WORK', 'WORK', 'PERSONAL']:
+            res = self.client.get(self.url['export'].format(format='ndjson'), {'category': category})
+            tracemalloc.start()
+            lines = sum(1 for _ in res.streaming_content)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+            self.assertEqual(lines, 400 if category == 'WORK' else 3600)
+        self.assertLess(peaks[2], peaks[1] * 1.5)
+
+    # Invalid data
+
+    def test_invalid_format(self):
+        res = self.client.get(self.url['export'].format(format='xml'))
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_invalid_filter(self):
+        res = self.client.get(self.url['export'].format(format='csv'), {'status': 'DONE'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_unknown_parameter(self):
+        # Exports are not paginated
+        res = self.client.get(self.url['export'].format(format='csv'), {'limit': '10'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data['error'], 'Unknown limit parameter')
+
+
+class StatusTransitionTests(TaskTestCase):
+    '''
+    Test the complete and pending endpoints
+    '''
+
+    def setUp(self):
+        super().setUp()
+        self.task = Task.objects.create(title='task', owner=self.user)
+        self.url['complete'] = self.url['task'].format(id=self.task.id) + '/complete'
+        self.url['pending'] = self.url['task'].format(id=self.task.id) + '/pending'
+
+    # Valid data
+
+    def test_complete_and_pending(self):
+        res = self.client.put(self.url['complete'])
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.status, Task.Status.COMPLETED)
+        self.assertIsNotNone(self.task.completion_date)
+
+        res = self.client.put(self.url['pending'])
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.status, Task.Status.PENDING)
+        self.assertIsNone(self.task.completion_date)
+
+    def test_single_task_update(self):
+        self.client.get(self.url['tasks'])
+        with CaptureQueriesContext(connection) as context:
+            self.client.put(self.url['complete'])
+        updates = [query['sql'] for query in context.captured_queries if query['sql'].startswith('UPDATE "api_task"')]
+        self.assertEqual(len(updates), 1)
+        self.assertFalse(any(query['sql'].startswith('SELECT') for query in context.captured_queries))
+
+    # Invalid data
+
+    def test_unchanged_status(self):
+        self.client.put(self.url['complete'])
+        res = self.client.put(self.url['complete'])
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_other_owner(self):
+        other = User.objects.create_user(username='jane-doe', email='jane-doe@example.com', password='newpass123')
+        task = Task.objects.create(title='task', owner=other)
+        res = self.client.put(self.url['task'].format(id=task.id) + '/complete')
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        task.refresh_from_db()
+        self.assertEqual(task.status, Task.Status.PENDING)
+
+    def test_missing_task(self):
+        res = self.client.put(self.url['task'].format(id=self.task.id + 1000) + '/pending')
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class DeadlineFilterTests(TaskTestCase):
+    '''
+    Test the deadline range and overdue filters of the tasks list endpoint
+    '''
+
+    def setUp(self):
+        super().setUp()
+        self.now = now()
+        deadlines = [-48, -2, None, 1, 5, 30]
+        self.tasks = Task.objects.bulk_create([
+            Task(title='task-{}'.format(i), deadline=None if hours is None else self.now + timedelta(hours=hours), owner=self.user)
+            for i, hours in enumerate(deadlines)
+        ])
+        Task.objects.filter(id=self.tasks[0].id).update(status=Task.Status.COMPLETED)
+
+    def ids(self, params):
+        res = self.client.get(self.url['tasks'], params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [task['id'] for task in res.data['results']]
+
+    # Valid data
+
+    def test_due_range(self):
+        before = (self.now + timedelta(hours=6)).isoformat()
+        after = self.now.isoformat()
+        self.assertEqual(self.ids({'due_before': before}), [task.id for task in self.tasks[:2] + self.tasks[3:5]])
+        self.assertEqual(self.ids({'due_after': after}), [task.id for task in self.tasks[3:]])
+        self.assertEqual(self.ids({'due_after': after, 'due_before': before, 'sort': '-deadline'}), [self.tasks[4].id, self.tasks[3].id])
+
+    def test_overdue(self):
+        self.assertEqual(self.ids({'overdue': 'true'}), [self.tasks[1].id])
+        self.assertEqual(self.ids({'overdue': 'true', 'status': 'PENDING', 'sort': 'deadline'}), [self.tasks[1].id])
+
+    def test_overdue_is_not_cached(self):
+        Task.objects.filter(id=self.tasks[3].id).update(deadline=self.now + timedelta(seconds=1))
+        self.assertEqual(self.ids({'overdue': 'true'}), [self.tasks[1].id])
+        Task.objects.filter(id=self.tasks[3].id).update(deadline=self.now - timedelta(seconds=1))
+        self.assertEqual(self.ids({'overdue': 'true'}), [self.tasks[1].id, self.tasks[3].id])
+
+    def test_naive_datetime(self):
+        self.assertEqual(len(self.ids({'due_after': '2000-01-01T00:00:00'})), 5)
+
+    # Invalid data
+
+    def test_invalid_values(self):
+        for params in [{'due_before': 'tomorrow'}, {'due_after': '2024-13-01T00:00:00'}, {'overdue': 'yes'}, {'overdue': 'true', 'status': 'COMPLETED'}]:
+            with self.subTest(params=params):
+                res = self.client.get(self.url['tasks'], params)
+                self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class SearchTests(TaskTestCase):
+    '''
+    Test the search parameter of the tasks list endpoint
+    '''
+
+    def setUp(self):
+        super().setUp()
+        self.tasks = Task.objects.bulk_create([
+            Task(title=title, description=description, owner=self.user)
+            for title, description in [
+                ('Write quarterly report', 'Numbers of the third quarter'),
+                ('Fix login bug', 'Users see a report of the error'),
+                ('Debug payments', None),
+                ('Plan holidays', 'Book flights and hotels'),
+                ('Reporting dashboard', 'Charts for the weekly reports'),
+            ]
+        ])
+
+    def ids(self, params):
+        res = self.client.get(self.url['tasks'], params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return [task['id'] for task in res.data['results']]
+
+    # Valid data
+
+    def test_ranked(self):
+        # Title matches outrank description matches
+        ids = self.ids({'q': 'report'})
+        self.assertEqual(set(ids), {self.tasks[0].id, self.tasks[1].id, self.tasks[4].id})
+        self.assertEqual(ids[-1], self.tasks[1].id)
+
+    def test_prefix_and_every_word(self):
+        self.assertEqual(self.ids({'q': 'quart'}), [self.tasks[0].id])
+        self.assertEqual(self.ids({'q': 'book flight'}), [self.tasks[3].id])
+        self.assertEqual(self.ids({'q': 'book payments'}), [])
+
+    def test_short_query_matches_substrings(self):
+        self.assertEqual(self.ids({'q': 'bug'}), [self.tasks[1].id, self.tasks[2].id])
+
+    def test_ranked_pages(self):
+        ids, cursor = [], None
+        while True:
+            params = {'q': 'report', 'limit': 1, **({'cursor': cursor} if cursor else {})}
+            res = self.client.get(self.url['tasks'], params)
+            ids += [task['id'] for task in res.data['results']]
+            cursor = res.data['next']
+            if not cursor:
+                break
+        self.assertEqual(ids, self.ids({'q': 'report'}))
+
+    def test_with_sort_and_filters(self):
+        Task.objects.filter(id=self.tasks[4].id).update(priority=Task.Priority.HIGH)
+        self.assertEqual(self.ids({'q': 'report', 'sort': 'title'}), [self.tasks[1].id, self.tasks[4].id, self.tasks[0].id])
+        self.assertEqual(self.ids({'q': 'report', 'priority': 'HIGH'}), [self.tasks[4].id])
+
+    def test_updated_on_write(self):
+        self.client.put(self.url['task'].format(id=self.tasks[3].id), {'title': 'Plan conference'})
+        self.assertEqual(self.ids({'q': 'conference'}), [self.tasks[3].id])
+
+    def test_query_syntax_is_ignored(self):
+        self.assertEqual(self.ids({'q': "report & !(quart:* | ')"}), [self.tasks[0].id])
+        self.assertEqual(self.ids({'q': '&|!'}), [])
+
+    # Invalid data
+
+    def test_too_long(self):
+        res = self.client.get(self.url['tasks'], {'q': 'x' * 201})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_nul_character(self):
+        for text in ['a\x00', 'report\x00s']:
+            with self.subTest(text=text):
+                res = self.client.get(self.url['tasks'], {'q': text})
+                self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertEqual(res.data['error'], 'Invalid q value')
+
+    def test_cursor_of_another_sort(self):
+        Task.objects.bulk_create([Task(title='report', owner=self.user)] * 2)
+        cursor = self.client.get(self.url['tasks'], {'limit': 1})
+        res = self.client.get(self.url['tasks'], {'q': 'report', 'cursor': cursor.data['next']})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ConcurrentStatusTransitionTests(APITransactionTestCase):
+    '''
+    Test parallel status transitions, updates and deletes of the same task
+    '''
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='john-doe', email='john-doe@example.com', password='newpass123')
+        self.token = Token.objects.create(user=self.user)
+        self.task = Task.objects.create(title='task', owner=self.user)
+        counters.apply(self.user.id, added=[counters.key(self.task)])
+
+    def complete(self, barrier):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token.key)
+        try:
+            barrier.wait()
+            return client.put('/api/task/{}/complete'.format(self.task.id)).status_code
+        finally:
+            connections.close_all()
+
+    def delete(self, barrier):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token.key)
+        try:
+            barrier.wait()
+            return client.delete('/api/task/{}'.format(self.task.id)).status_code
+        finally:
+            connections.close_all()
+
+    def test_one_complete_wins(self):
+        workers = 8
+        barrier = Barrier(workers)
+        with ThreadPoolExecutor(workers) as executor:
+            codes = list(executor.map(lambda _: self.complete(barrier), range(workers)))
+        self.assertEqual(codes.count(status.HTTP_204_NO_CONTENT), 1)
+        self.assertEqual(codes.count(status.HTTP_400_BAD_REQUEST), workers - 1)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.tasks_version, 1)
+
+    def test_one_delete_wins(self):
+        workers = 8
+        barrier = Barrier(workers)
+        with ThreadPoolExecutor(workers) as executor:
+            codes = list(executor.map(lambda _: self.delete(barrier), range(workers)))
+        self.assertEqual(codes.count(status.HTTP_204_NO_CONTENT), 1)
+        self.assertEqual(codes.count(status.HTTP_404_NOT_FOUND), workers - 1)
+        self.assertEqual(TaskTombstone.objects.filter(task_id=self.task.id).count(), 1)
+        self.assertEqual(counters.stats(self.user.id)['all']['total'], 0)
+
+    def test_update_of_a_stale_task(self):
+        stale = Task.objects.get(id=self.task.id)
+        # The task is completed after the update request loaded it
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token.key)
+        self.client.put('/api/task/{}/complete'.format(self.task.id))
+        res = task_service.update_task(stale, {'title': 'renamed'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.task.refresh_from_db()
+        self.assertEqual((self.task.title, self.task.status), ('task', Task.Status.COMPLETED))
+        stats = counters.stats(self.user.id)['all']
+        self.assertEqual((stats['total'], stats['completed']), (1, 1))
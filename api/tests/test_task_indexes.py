@@ -0,0 +1,103 @@
+from datetime import timedelta
+from unittest import skipUnless
+from django.db import connection
+from django.test import tag
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+from rest_framework.test import APITestCase
+from rest_framework.authtoken.models import Token
+from ..models import User
+
+@tag('slow')
+@skipUnless(connection.vendor == 'postgresql', 'Query plans are checked on Postgres only')
+class TaskIndexTests(APITestCase):
+    '''
+    Test that the tasks list queries are served by indexes on a large table
+    '''
+
+    USERS = 1000
+    TASKS_PER_USER = 1000
+
+    @classmethod
+    def setUpTestData(cls):
+        # Seed USERS x TASKS_PER_USER tasks in SQL, spread over every filter value
+        with connection.cursor() as cursor:
+            cursor.execute('''
+                INSERT INTO api_user (password, is_superuser, username, first_name, last_name, email, is_staff, is_active, date_joined, updated_at, tasks_version, tasks_compacted)
+                SELECT '', false, 'user-' || n, '', '', 'user-' || n || '@example.com', false, true, now(), now(), 0, 0
+                FROM generate_series(1, %s) AS n
+            ''', [cls.USERS])
+            cursor.execute('''
+                INSERT INTO api_task (title, description, deadline, completion_date, priority, status, category, owner_id, updated_at, version)
+                SELECT
+                    'task-' || md5(n::text),
+                    NULL,
+                    CASE WHEN n %% 10 = 0 THEN NULL ELSE now() + (n %% 1000 - 100) * interval '1 hour' END,
+                    NULL,
+                    (ARRAY['LOW', 'MEDIUM', 'HIGH'])[n %% 3 + 1],
+                    (ARRAY['PENDING', 'COMPLETED'])[n %% 2 + 1],
+                    (ARRAY['WORK', 'PERSONAL', 'UNCATEGORIZED'])[n / 3 %% 3 + 1],
+                    u.id,
+                    now(),
+                    0
+                FROM api_user AS u, generate_series(1, %s) AS n
+            ''', [cls.TASKS_PER_USER])
+            cursor.execute('ANALYZE api_user')
+            cursor.execute('ANALYZE api_task')
+
+        cls.user = User.objects.order_by('id').first()
+        cls.token = Token.objects.create(user=cls.user)
+
+    def setUp(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token.key)
+
+    def assertIndexed(self, params, index=None):
+        # Walk two pages so the cursor predicates are planned too
+        with CaptureQueriesContext(connection) as context:
+            res = self.client.get('/api/tasks', {**params, 'limit': 20})
+            if res.data['next']:
+                self.client.get('/api/tasks', {**params, 'limit': 20, 'cursor': res.data['next']})
+
+        queries = [query['sql'] for query in context.captured_queries if 'FROM "api_task"' in query['sql']]
+        self.assertTrue(queries)
+        for sql in queries:
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN ' + sql)
+                plan = '\n'.join(row[0] for row in cursor.fetchall())
+            self.assertNotIn('Seq Scan', plan, '{}\n{}'.format(sql, plan))
+            if index:
+                self.assertIn(index, plan, '{}\n{}'.format(sql, plan))
+
+    def test_default_order(self):
+        self.assertIndexed({})
+
+    def test_sorts(self):
+        for sort in ['title', '-title', 'deadline', '-deadline', 'priority', '-priority']:
+            with self.subTest(sort=sort):
+                self.assertIndexed({'sort': sort})
+
+    def test_status_filter(self):
+        for value in ['PENDING', 'COMPLETED']:
+            with self.subTest(status=value):
+                self.assertIndexed({'status': value, 'sort': 'deadline'})
+                self.assertIndexed({'status': value, 'sort': '-deadline'})
+
+    def test_mixed_filters(self):
+        self.assertIndexed({'status': 'PENDING', 'priority': 'HIGH', 'category': 'WORK', 'sort': 'deadline'})
+        self.assertIndexed({'priority': 'LOW', 'sort': 'title'})
+        self.assertIndexed({'category': 'PERSONAL'})
+
+    def test_deadline_filters(self):
+        self.assertIndexed({'overdue': 'true'})
+        self.assertIndexed({'overdue': 'true', 'sort': 'deadline'})
+        window = {'due_after': now().isoformat(), 'due_before': (now() + timedelta(hours=200)).isoformat()}
+        self.assertIndexed({**window, 'status': 'PENDING', 'sort': 'deadline'})
+        self.assertIndexed({**window, 'sort': '-deadline'})
+
+    def test_short_search(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_indexes WHERE indexname = 'task_title_trgm_idx'")
+            if cursor.fetchone() is None:
+                self.skipTest('pg_trgm is not available')
+        # Substring searches use the trigram index of the title, not a scan of the owner's tasks
+        self.assertIndexed({'q': 'abc'}, 'task_title_trgm_idx')
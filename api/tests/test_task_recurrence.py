@@ -0,0 +1,217 @@
+from datetime import datetime, timedelta, timezone
+from django.test import TestCase, override_settings
+from django.utils.timezone import now
+from rest_framework import status
+from ..models import Task
+from ..utils import recurrence
+from .test_task_endpoints import TaskTestCase
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+class RecurrenceRuleTests(TestCase):
+    '''
+    Test the parsing and expansion of recurrence rules
+    '''
+
+    def occurrences(self, rule, start, after, before, reverse=False):
+        return list(recurrence.parse(rule).occurrences(start, after, before, reverse))
+
+    def test_invalid(self):
+        for rule in ['', 'FREQ=YEARLY', 'FREQ=DAILY;INTERVAL=0', 'FREQ=DAILY;COUNT=0', 'FREQ=DAILY;BYDAY=MO',
+                     'FREQ=WEEKLY;BYDAY=XX', 'FREQ=MONTHLY;BYMONTHDAY=32', 'FREQ=DAILY;COUNT=2;UNTIL=20250101',
+                     'FREQ=DAILY;FREQ=WEEKLY', 'FREQ=DAILY;BYHOUR=9', 'FREQ=DAILY;UNTIL=2025',
+                     'FREQ=DAILY;INTERVAL=99999999999999', 'FREQ=MONTHLY;INTERVAL=100000', 'FREQ=DAILY;COUNT=99999999999999', 'FREQ=DAILY;INTERVAL=' + '9' * 5000]:
+            with self.subTest(rule=rule):
+                self.assertIsNone(recurrence.parse(rule))
+
+    def test_daily(self):
+        start = utc(2025, 1, 30, 9)
+        self.assertEqual(
+            self.occurrences('FREQ=DAILY;INTERVAL=2', start, utc(2025, 2, 1), utc(2025, 2, 6)),
+            [utc(2025, 2, 1, 9), utc(2025, 2, 3, 9), utc(2025, 2, 5, 9)],
+        )
+        self.assertEqual(self.occurrences('freq=daily;count=3', start, utc(2025, 1, 1), utc(2026, 1, 1))[-1], utc(2025, 2, 1, 9))
+
+    def test_weekly(self):
+        # Thursday
+        start = utc(2025, 1, 2, 9)
+        self.assertEqual(
+            self.occurrences('FREQ=WEEKLY;BYDAY=MO,TH', start, start, utc(2025, 1, 14)),
+            [utc(2025, 1, 2, 9), utc(2025, 1, 6, 9), utc(2025, 1, 9, 9), utc(2025, 1, 13, 9)],
+        )
+        self.assertEqual(
+            self.occurrences('FREQ=WEEKLY;INTERVAL=2;UNTIL=20250130', start, start, utc(2026, 1, 1)),
+            [utc(2025, 1, 2, 9), utc(2025, 1, 16, 9), utc(2025, 1, 30, 9)],
+        )
+
+    def test_monthly(self):
+        start = utc(2025, 1, 31, 9)
+        # Months without a 31st are skipped, -1 is the last day of every month
+        self.assertEqual(
+            self.occurrences('FREQ=MONTHLY', start, start, utc(2025, 6, 1)),
+            [utc(2025, 1, 31, 9), utc(2025, 3, 31, 9), utc(2025, 5, 31, 9)],
+        )
+        self.assertEqual(
+            self.occurrences('FREQ=MONTHLY;BYMONTHDAY=-1', start, utc(2025, 2, 1), utc(2025, 5, 1)),
+            [utc(2025, 2, 28, 9), utc(2025, 3, 31, 9), utc(2025, 4, 30, 9)],
+        )
+        # A month day that never occurs ends the expansion at the end of the window
+        self.assertEqual(self.occurrences('FREQ=MONTHLY;INTERVAL=12;BYMONTHDAY=30', utc(2025, 2, 1), utc(2025, 2, 1), utc(2035, 1, 1)), [])
+
+    def test_datetime_range(self):
+        start = utc(2025, 1, 1, 9)
+        # UNTIL is clamped, long intervals stop at the end of the datetime range
+        self.assertEqual(self.occurrences('FREQ=DAILY;UNTIL=99991231', start, utc(2025, 1, 1), utc(2025, 1, 3)), [utc(2025, 1, 1, 9), utc(2025, 1, 2, 9)])
+        self.assertEqual(self.occurrences('FREQ=DAILY;UNTIL=99991231T235959Z', start, utc(9999, 12, 30), utc(9999, 12, 31)), [])
+        for rule in ['FREQ=MONTHLY;INTERVAL=1000', 'FREQ=DAILY;INTERVAL=1000', 'FREQ=WEEKLY;INTERVAL=1000;BYDAY=MO,SU']:
+            with self.subTest(rule=rule):
+                occurrences = self.occurrences(rule, start, utc(9000, 1, 1), utc(9999, 12, 31))
+                self.assertLess(occurrences[-1], utc(9999, 12, 31))
+                self.assertEqual(self.occurrences(rule, start, utc(9000, 1, 1), utc(9999, 12, 31), reverse=True), occurrences[::-1])
+
+    def test_skip_ahead(self):
+        # Windows far from the start skip to their first period, COUNT included
+        start = utc(2020, 1, 1, 9)
+        for rule in ['FREQ=DAILY;INTERVAL=3', 'FREQ=WEEKLY;BYDAY=TU,SA;COUNT=300', 'FREQ=MONTHLY;BYMONTHDAY=1,15,31', 'FREQ=MONTHLY;INTERVAL=5;COUNT=20']:
+            with self.subTest(rule=rule):
+                everything = self.occurrences(rule, start, start, utc(2030, 1, 1))
+                after, before = utc(2023, 3, 15), utc(2024, 3, 15)
+                expected = [value for value in everything if after <= value < before]
+                self.assertEqual(self.occurrences(rule, start, after, before), expected)
+                self.assertEqual(self.occurrences(rule, start, after, before, reverse=True), expected[::-1])
+
+class RecurringTaskTests(TaskTestCase):
+    '''
+    Test the creation, lazy listing and stored occurrences of recurring tasks
+    '''
+
+    def setUp(self):
+        super().setUp()
+        self.url['occurrences'] = '/api/task/{id}/occurrences'
+        self.start = (now() - timedelta(days=30)).replace(microsecond=0)
+        res = self.client.post(self.url['tasks'], {'title': 'daily', 'deadline': self.start.isoformat(), 'recurrence': 'FREQ=DAILY', 'priority': 'HIGH'})
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.series = res.data['id']
+        self.window = {'due_after': (self.start + timedelta(days=10)).isoformat(), 'due_before': (self.start + timedelta(days=20)).isoformat()}
+        self.task = Task.objects.create(title='single', deadline=self.start + timedelta(days=14, hours=1), owner=self.user)
+
+    def list(self, **params):
+        res = self.client.get(self.url['tasks'], {**self.window, **params})
+        self.assertEqual(res.status_code, status.HTTP_200_OK, res.data)
+        return res.data
+
+    def pages(self, **params):
+        rows, cursor = [], None
+        while True:
+            data = self.list(limit=3, **params, **({'cursor': cursor} if cursor else {}))
+            rows += data['results']
+            cursor = data['next']
+            if cursor is None:
+                return rows
+
+    def test_create(self):
+        res = self.client.post(self.url['tasks'], {'title': 'task', 'recurrence': 'FREQ=DAILY'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        res = self.client.post(self.url['tasks'], {'title': 'task', 'deadline': self.start.isoformat(), 'recurrence': 'FREQ=HOURLY'})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        res = self.client.get(self.url['task'].format(id=self.series))
+        self.assertEqual(res.data['recurrence'], 'FREQ=DAILY')
+        self.assertIsNone(res.data['series'])
+
+    def test_list(self):
+        results = self.list()['results']
+        self.assertEqual(len(results), 11)
+        occurrence = results[0]
+        self.assertIsNone(occurrence['id'])
+        self.assertEqual(occurrence['series'], self.series)
+        self.assertEqual(occurrence['title'], 'daily')
+        self.assertEqual(occurrence['status'], 'PENDING')
+        self.assertEqual(occurrence['occurrence'], occurrence['deadline'])
+        # Sorted by deadline, the single task is between two occurrences
+        results = self.list(sort='deadline')['results']
+        self.assertEqual([task['id'] for task in results].index(self.task.id), 5)
+        # Lists without a window show the series as one task
+        res = self.client.get(self.url['tasks'])
+        self.assertEqual([task['id'] for task in res.data['results']], [self.series, self.task.id])
+        # Nothing is stored
+        self.assertEqual(Task.objects.count(), 2)
+
+    def test_filters(self):
+        self.assertEqual(len(self.list(priority='LOW')['results']), 1)
+        self.assertEqual(len(self.list(status='COMPLETED')['results']), 0)
+        self.assertEqual(len(self.list(q='daily')['results']), 10)
+
+    def test_pages(self):
+        for sort in ['', 'deadline', '-deadline', 'title', '-title', 'priority', '-priority']:
+            with self.subTest(sort=sort):
+                expected = self.list(sort=sort)['results'] if sort else self.list()['results']
+                self.assertEqual(self.pages(**({'sort': sort} if sort else {})), expected)
+        deadlines = [task['deadline'] for task in self.list(sort='deadline')['results']]
+        self.assertEqual(deadlines, sorted(deadlines))
+
+    def test_mixed_case_titles(self):
+        # Titles are ordered by code point on both sides of the merge, whatever the database collation
+        Task.objects.bulk_create([
+            Task(title=title, deadline=self.start + timedelta(days=12), owner=self.user)
+            for title in ['alpha', 'Zeta', 'beta', 'Delta', 'échéance']
+        ])
+        for sort in ['title', '-title']:
+            with self.subTest(sort=sort):
+                results = self.list(sort=sort)['results']
+                titles = [task['title'] for task in results]
+                self.assertEqual(titles, sorted(titles, reverse=sort.startswith('-')))
+                self.assertEqual(self.pages(sort=sort), results)
+
+    def test_batch_update(self):
+        res = self.client.post('/api/tasks/batch', [{'op': 'update', 'id': self.task.id, 'data': {'recurrence': 'FREQ=WEEKLY'}}], format='json')
+        self.assertEqual(res.status_code, status.HTTP_200_OK, res.data)
+        self.assertEqual(Task.objects.get(id=self.task.id).recurrence, 'FREQ=WEEKLY')
+        task = Task.objects.create(title='no deadline', owner=self.user)
+        res = self.client.post('/api/tasks/batch', [{'op': 'update', 'id': task.id, 'data': {'recurrence': 'FREQ=WEEKLY'}}], format='json')
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_store_occurrence(self):
+        occurrence = self.list(sort='deadline')['results'][2]['occurrence']
+        res = self.client.post(self.url['occurrences'].format(id=self.series), {'occurrence': occurrence, 'title': 'renamed'})
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(res.data['series'], self.series)
+        self.assertEqual(res.data['title'], 'renamed')
+        self.assertEqual(res.data['priority'], 'HIGH')
+        stored = res.data['id']
+
+        # The stored occurrence replaces the generated one
+        results = self.list(sort='deadline')['results']
+        self.assertEqual(len(results), 11)
+        self.assertEqual(results[2]['id'], stored)
+        res = self.client.post(self.url['occurrences'].format(id=self.series), {'occurrence': occurrence})
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+        # Completed occurrences leave the pending list
+        occurrence = results[3]['occurrence']
+        res = self.client.post(self.url['occurrences'].format(id=self.series), {'occurrence': occurrence, 'status': 'COMPLETED'})
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertIsNotNone(res.data['completion_date'])
+        self.assertEqual(len(self.list(status='PENDING')['results']), 10)
+        self.assertEqual(self.client.get('/api/tasks/stats').data['all']['completed'], 1)
+
+    def test_store_invalid_occurrence(self):
+        occurrence = self.list(sort='deadline')['results'][0]['occurrence']
+        shifted = (datetime.fromisoformat(occurrence.replace('Z', '+00:00')) + timedelta(hours=1)).isoformat()
+        for id, data in [(self.series, {}), (self.series, {'occurrence': 'x'}), (self.series, {'occurrence': shifted}), (self.series, {'occurrence': occurrence, 'recurrence': 'FREQ=DAILY'})]:
+            with self.subTest(data=data):
+                res = self.client.post(self.url['occurrences'].format(id=id), data)
+                self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        res = self.client.post(self.url['occurrences'].format(id=self.task.id), {'occurrence': occurrence})
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(TASKS_RECURRENCE_MAX_DAYS=10)
+    def test_window_at_the_end_of_the_datetime_range(self):
+        self.assertEqual(recurrence.window({'deadline__gte': utc(9999, 12, 31), 'deadline__lt': utc(9999, 12, 31, 23)}), (utc(9999, 12, 31), utc(9999, 12, 31, 23)))
+        self.assertEqual(recurrence.window({'deadline__gte': utc(1, 1, 1), 'deadline__lt': utc(9999, 12, 31)})[1], utc(1, 1, 11))
+        data = self.list(due_after='9999-12-31T00:00:00+00:00', due_before='9999-12-31T23:00:00+00:00')
+        self.assertLessEqual(len(data['results']), 1)
+
+    @override_settings(TASKS_RECURRENCE_MAX_DAYS=5)
+    def test_window_limit(self):
+        self.assertEqual(len(self.list(priority='HIGH')['results']), 5)
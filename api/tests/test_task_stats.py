@@ -0,0 +1,107 @@
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+from rest_framework import status
+from ..models import Task, TaskCounter
+from ..utils import counters, jobs
+from .test_task_endpoints import TaskTestCase
+
+class TaskStatsTests(TaskTestCase):
+    '''
+    Test the task counters and the stats endpoint
+    '''
+
+    def setUp(self):
+        super().setUp()
+        self.url['stats'] = '/api/tasks/stats'
+        self.url['batch'] = '/api/tasks/batch'
+
+    def expected(self):
+        # Stats computed from the tasks themselves
+        result = {
+            'all': counters._empty(),
+            'by_category': {category: counters._empty() for category in Task.Category.values},
+            'by_priority': {priority: counters._empty() for priority in Task.Priority.values},
+        }
+        for task in Task.objects.filter(owner=self.user):
+            names = ['total', task.status.lower()]
+            if task.status == Task.Status.PENDING and task.deadline and task.deadline < now():
+                names.append('overdue')
+            for group in [result['all'], result['by_category'][task.category], result['by_priority'][task.priority]]:
+                for name in names:
+                    group[name] += 1
+        return result
+
+    def assertStats(self):
+        res = self.client.get(self.url['stats'])
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, self.expected())
+
+    # Valid data
+
+    def test_writes_update_counters(self):
+        create = lambda data: self.client.post(self.url['tasks'], data).data['id']
+        first = create({'title': 'first', 'category': 'WORK', 'priority': 'HIGH'})
+        second = create({'title': 'second'})
+        self.assertStats()
+
+        self.client.put(self.url['task'].format(id=second), {'category': 'PERSONAL', 'priority': 'MEDIUM'})
+        self.assertStats()
+        self.client.put(self.url['task'].format(id=first) + '/complete')
+        self.assertStats()
+        self.client.put(self.url['task'].format(id=first) + '/complete')
+        self.client.put(self.url['task'].format(id=first) + '/pending')
+        self.assertStats()
+
+        self.client.post(self.url['batch'], [
+            {'op': 'create', 'data': {'title': 'third', 'category': 'WORK'}},
+            {'op': 'update', 'id': second, 'data': {'priority': 'LOW'}},
+            {'op': 'complete', 'id': second},
+            {'op': 'complete', 'id': first},
+            {'op': 'delete', 'id': first},
+        ], format='json')
+        self.assertStats()
+
+        self.client.delete(self.url['task'].format(id=second))
+        self.assertStats()
+
+    def test_overdue(self):
+        id = self.client.post(self.url['tasks'], {'title': 'task'}).data['id']
+        Task.objects.filter(id=id).update(deadline=now() - timedelta(days=1))
+        self.assertStats()
+        self.assertEqual(self.client.get(self.url['stats']).data['all']['overdue'], 1)
+
+    def test_constant_queries(self):
+        counts = []
+        for size in [1, 50]:
+            self.client.post(self.url['batch'], [{'op': 'create', 'data': {'title': 'task'}}] * size, format='json')
+            with CaptureQueriesContext(connection) as context:
+                self.client.get(self.url['stats'])
+            counts.append(len(context.captured_queries))
+        self.assertEqual(counts[0], counts[1])
+
+    # Drift
+
+    def test_reconcile(self):
+        self.new_tasks()
+        TaskCounter.objects.create(owner=self.user, status='COMPLETED', category='WORK', priority='LOW', count=3)
+        out = StringIO()
+        call_command('reconcile_task_counters', stdout=out)
+        self.assertIn('1 had drifted', out.getvalue())
+        self.assertStats()
+
+        out = StringIO()
+        call_command('reconcile_task_counters', '--user', str(self.user.id), stdout=out)
+        self.assertIn('Reconciled 1 users, 0 had drifted', out.getvalue())
+
+    def test_reconcile_in_background(self):
+        self.new_tasks()
+        TaskCounter.objects.create(owner=self.user, status='COMPLETED', category='WORK', priority='LOW', count=3)
+        out = StringIO()
+        call_command('reconcile_task_counters', '--enqueue', stdout=out)
+        self.assertIn('Queued the reconciliation of 1 users', out.getvalue())
+        self.assertEqual(jobs.work(once=True), 1)
+        self.assertStats()
@@ -0,0 +1,125 @@
+from datetime import timedelta
+from io import StringIO
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils.timezone import now
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from ..models import Task, TaskTombstone, User
+from .test_conditional_requests import SHARED_CACHES
+from .test_task_endpoints import TaskTestCase
+
+class TaskSyncTests(TaskTestCase):
+    '''
+    Test the delta sync endpoint and the compaction of tombstones
+    '''
+
+    def setUp(self):
+        super().setUp()
+        self.url['sync'] = '/api/tasks/sync'
+        self.url['batch'] = '/api/tasks/batch'
+
+    def sync(self, since=None):
+        res = self.client.get(self.url['sync'], {} if since is None else {'since': since})
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        return {task['id'] for task in res.data['tasks']}, set(res.data['deleted']), res.data['token']
+
+    def create(self, title):
+        return self.client.post(self.url['tasks'], {'title': title}).data['id']
+
+    # Valid data
+
+    def test_full_sync(self):
+        first, second = self.create('first'), self.create('second')
+        tasks, deleted, token = self.sync()
+        self.assertEqual(tasks, {first, second})
+        self.assertEqual(deleted, set())
+        self.assertEqual(self.sync(token), (set(), set(), token))
+
+    def test_changes_since_token(self):
+        first, second, third = self.create('first'), self.create('second'), self.create('third')
+        _, _, token = self.sync()
+
+        self.client.put(self.url['task'].format(id=first), {'title': 'renamed'})
+        tasks, deleted, token = self.sync(token)
+        self.assertEqual((tasks, deleted), ({first}, set()))
+
+        self.client.put(self.url['task'].format(id=second) + '/complete')
+        self.client.delete(self.url['task'].format(id=third))
+        tasks, deleted, token = self.sync(token)
+        self.assertEqual((tasks, deleted), ({second}, {third}))
+
+        res = self.client.post(self.url['batch'], [
+            {'op': 'create', 'data': {'title': 'fourth'}},
+            {'op': 'pending', 'id': second},
+            {'op': 'delete', 'id': first},
+        ], format='json')
+        fourth = res.data['results'][0]['id']
+        tasks, deleted, token = self.sync(token)
+        self.assertEqual((tasks, deleted), ({second, fourth}, {first}))
+
+    def test_payload_scales_with_changes(self):
+        self.new_tasks()
+        _, _, token = self.sync()
+        task = self.create('new')
+        tasks, _, _ = self.sync(token)
+        self.assertEqual(tasks, {task})
+
+    def test_failed_writes_keep_token(self):
+        task = self.create('task')
+        self.client.put(self.url['task'].format(id=task) + '/complete')
+        _, _, token = self.sync()
+        self.client.put(self.url['task'].format(id=task) + '/complete')
+        self.client.post(self.url['batch'], [{'op': 'complete', 'id': task}], format='json')
+        self.assertEqual(self.sync(token), (set(), set(), token))
+
+    @override_settings(CACHES=SHARED_CACHES)
+    def test_up_to_date_needs_no_query(self):
+        caches[settings.TASKS_CACHE].clear()
+        self.create('task')
+        _, _, token = self.sync()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.sync(token), (set(), set(), token))
+
+    def test_other_users_changes(self):
+        _, _, token = self.sync()
+        other = User.objects.create_user(username='jane-doe', email='jane-doe@example.com', password='newpass123')
+        Task.objects.create(title='other', owner=other)
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + Token.objects.create(user=other).key)
+        other_task = self.create('task')
+        self.client.delete(self.url['task'].format(id=other_task))
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token.key)
+        self.assertEqual(self.sync(token), (set(), set(), token))
+
+    # Compaction
+
+    def test_compacted_token_expires(self):
+        first, second = self.create('first'), self.create('second')
+        _, _, old_token = self.sync()
+        self.client.delete(self.url['task'].format(id=first))
+        _, _, token = self.sync(old_token)
+        self.client.delete(self.url['task'].format(id=second))
+        TaskTombstone.objects.filter(task_id=first).update(deleted_at=now() - timedelta(days=31))
+
+        out = StringIO()
+        call_command('compact_task_tombstones', stdout=out)
+        self.assertIn('Removed 1 tombstones', out.getvalue())
+        self.assertEqual(TaskTombstone.objects.get().task_id, second)
+
+        res = self.client.get(self.url['sync'], {'since': old_token})
+        self.assertEqual(res.status_code, status.HTTP_410_GONE)
+        # Tokens issued after the compacted deletion still see the remaining tombstones
+        self.assertEqual(self.sync(token), (set(), {second}, str(int(token) + 1)))
+        self.assertEqual(self.sync()[:2], (set(), set()))
+
+    # Invalid data
+
+    def test_invalid_since(self):
+        _, _, token = self.sync()
+        for since in ['abc', '-1', '²', str(int(token) + 1)]:
+            with self.subTest(since=since):
+                res = self.client.get(self.url['sync'], {'since': since})
+                self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+                self.assertEqual(res.data['error'], 'Invalid since value')
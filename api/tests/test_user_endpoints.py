@@ -1,7 +1,16 @@
+from io import StringIO
+from threading import Event, Thread
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from rest_framework.test import APIRequestFactory, APITestCase
 from rest_framework import status
 from rest_framework.authtoken.models import Token
-from ..models import Task, User
+from ..models import Job, Task, TaskCounter, TaskTombstone, User
+from ..services import user_service
+from ..utils import hashing, jobs, versions
 
 class UserTestCase(APITestCase):
     def setUp(self):
@@ -87,6 +96,30 @@ class LoginTests(UserTestCase):
         res = self.client.post(self.url['login'], user)
         self.assertEqual(res.status_code, status.HTTP_200_OK)
 
+    def test_token_reused(self):
+        user = self.new_user_data()
+        User.objects.create_user(**user)
+        first = self.client.post(self.url['login'], user)
+        second = self.client.post(self.url['login'], user)
+        self.assertEqual(first.data['token'], second.data['token'])
+        self.assertEqual(first.data['user'], second.data['user'])
+        self.assertEqual(Token.objects.count(), 1)
+
+    def test_query_budget(self):
+        # One query reads the user with the token, one more creates a missing token
+        user = self.new_user_data()
+        User.objects.create_user(**user)
+        with self.assertNumQueries(2):
+            self.client.post(self.url['login'], user)
+        with self.assertNumQueries(1):
+            self.client.post(self.url['login'], user)
+
+    def test_token_upsert_conflict(self):
+        user = User.objects.create_user(**self.new_user_data())
+        key = user_service._create_token(user.id)
+        self.assertEqual(user_service._create_token(user.id), key)
+        self.assertEqual(Token.objects.get(user=user).key, key)
+
     # Invalid data
 
     def test_invalid_username(self):
@@ -114,3 +147,151 @@ class LoginTests(UserTestCase):
         user['password'] = 'incorrect_password'
         res = self.client.post(self.url['login'], user)
         self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class PasswordHashingTests(UserTestCase):
+    '''
+    Test the bounded password hashing of registration and login
+    '''
+
+    def setUp(self):
+        super().setUp()
+        hashing.reset()
+        self.addCleanup(hashing.reset)
+
+    def occupy_pool(self):
+        # Hold the only hashing slot until the returned event is set
+        started, release = Event(), Event()
+        Thread(target=hashing.run, args=(lambda: started.set() or release.wait(),)).start()
+        self.addCleanup(release.set)
+        started.wait()
+        return release
+
+    # Saturated pool
+
+    @override_settings(PASSWORD_HASHING={'WORKERS': 1, 'MAX_PENDING': 1})
+    def test_saturated_login(self):
+        user = self.new_user_data()
+        User.objects.create_user(**user)
+        release = self.occupy_pool()
+        res = self.client.post(self.url['login'], user)
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(res['Retry-After'], '1')
+
+        release.set()
+        hashing.reset()
+        res = self.client.post(self.url['login'], user)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    @override_settings(PASSWORD_HASHING={'WORKERS': 1, 'MAX_PENDING': 0})
+    def test_saturated_registration(self):
+        res = self.client.post(self.url['register'], self.new_user_data())
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertFalse(User.objects.exists())
+
+    # Rehash on login
+
+    @override_settings(PASSWORD_HASHERS=[
+        'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+        'django.contrib.auth.hashers.MD5PasswordHasher',
+    ])
+    def test_rehash_on_login(self):
+        user = self.new_user_data()
+        created = User.objects.create_user(**user)
+        User.objects.filter(id=created.id).update(password=make_password(user['password'], hasher='md5'))
+        res = self.client.post(self.url['login'], user)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        created.refresh_from_db()
+        self.assertTrue(created.password.startswith('pbkdf2_sha256$'))
+        self.assertTrue(check_password(user['password'], created.password))
+
+    def test_no_rehash_when_current(self):
+        user = self.new_user_data()
+        created = User.objects.create_user(**user)
+        self.client.post(self.url['login'], user)
+        self.assertEqual(User.objects.get(id=created.id).password, created.password)
+
+
+class UserUpdateTests(UserTestCase):
+    '''
+    Test that user updates keep the task counters of the user row
+    '''
+
+    def test_concurrent_task_write_is_kept(self):
+        user = User.objects.create_user(**self.new_user_data())
+        # A task write commits after the user of the request was loaded
+        version = versions.bump(user.id)
+        res = user_service.update_user(user, {'username': 'jane-doe'})
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        user.refresh_from_db()
+        self.assertEqual(user.username, 'jane-doe')
+        self.assertEqual(user.tasks_version, version)
+        self.assertIsNotNone(user.tasks_modified)
+
+
+class AccountDeletionTests(UserTestCase):
+    '''
+    Test the batched and deferred deletion of accounts
+    '''
+
+    def setUp(self):
+        super().setUp()
+        self.credentials = self.new_user_data()
+        self.user = User.objects.create_user(**self.credentials)
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token.key)
+        operations = [{'op': 'create', 'data': {'title': 'task-{}'.format(i)}} for i in range(10)]
+        self.client.post('/api/tasks/batch', operations, format='json')
+        task = Task.objects.filter(owner=self.user).first()
+        self.client.delete('/api/task/{}'.format(task.id))
+
+        self.other = User.objects.create_user(**self.new_user_data())
+        Task.objects.create(title='other', owner=self.other)
+
+    def assertPurged(self):
+        self.assertFalse(User.objects.filter(id=self.user.id).exists())
+        for model in [Task, TaskCounter, TaskTombstone, Token]:
+            self.assertFalse(model.objects.filter(**{'user_id' if model is Token else 'owner_id': self.user.id}).exists(), model)
+        self.assertEqual(Task.objects.filter(owner=self.other).count(), 1)
+
+    @override_settings(USER_DELETION={'MODE': 'immediate', 'BATCH_SIZE': 4})
+    def test_immediate(self):
+        with CaptureQueriesContext(connection) as context:
+            res = self.client.delete('/api/user')
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertPurged()
+        # 9 tasks in batches of 4, none of the rows loaded in Python
+        deletes = [query['sql'] for query in context.captured_queries if query['sql'].startswith('WITH batch AS (    DELETE FROM "api_task"')]
+        self.assertEqual(len(deletes), 3)
+        self.assertFalse([query['sql'] for query in context.captured_queries if query['sql'].startswith('SELECT "api_task"')])
+
+    @override_settings(USER_DELETION={'MODE': 'deferred', 'BATCH_SIZE': 4})
+    def test_deferred(self):
+        res = self.client.delete('/api/user')
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        user = User.objects.get(id=self.user.id)
+        self.assertFalse(user.is_active)
+        self.assertIsNotNone(user.deleted_at)
+        self.assertEqual(Task.objects.filter(owner=self.user).count(), 9)
+
+        # The account can no longer be used
+        self.assertEqual(self.client.get('/api/user').status_code, status.HTTP_401_UNAUTHORIZED)
+        self.client.credentials()
+        res = self.client.post(self.url['login'], self.credentials)
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+        # The deletion is left to a background job
+        job = Job.objects.get(name='purge_user')
+        self.assertEqual(job.args, [self.user.id])
+        self.assertEqual(jobs.work(once=True), 1)
+        self.assertPurged()
+
+    @override_settings(USER_DELETION={'MODE': 'deferred', 'BATCH_SIZE': 4})
+    def test_purge_command(self):
+        self.client.delete('/api/user')
+        # Accounts whose job was lost are purged by the command
+        Job.objects.all().delete()
+        out = StringIO()
+        call_command('purge_deleted_users', stdout=out)
+        self.assertIn('Purged 1 users and 9 tasks', out.getvalue())
+        self.assertPurged()
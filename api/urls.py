@@ -3,9 +3,15 @@ from api import views
 
 urlpatterns = [
     path("/", views.endpoints, name="endpoints"),
+    path("/metrics", views.request_metrics, name="request_metrics"),
     path("/user", views.user_details, name="user_details"),
     path("/user/<str:param>", views.authentication, name="authentication"),
     path("/task/<int:id>", views.task_details, name="task_details"),
+    path("/task/<int:id>/occurrences", views.task_occurrences, name="task_occurrences"),
     path("/task/<int:id>/<str:param>", views.task_details, name="task_details"),
     path("/tasks", views.tasks_list, name="tasks_list"),
+    path("/tasks/batch", views.tasks_batch, name="tasks_batch"),
+    path("/tasks/stats", views.tasks_stats, name="tasks_stats"),
+    path("/tasks/sync", views.tasks_sync, name="tasks_sync"),
+    path("/tasks/export/<str:param>", views.tasks_export, name="tasks_export"),
 ]
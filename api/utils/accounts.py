@@ -0,0 +1,65 @@
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils.timezone import now
+from rest_framework.authtoken.models import Token
+from api.models import CachedBearerTokenAuthentication, Task, User
+from api.utils import versions
+
+# Account deletion
+#
+# Deleting a user row cascades to every task in one statement and one transaction, which
+# holds the locks of all the deleted rows until it ends. Accounts are deactivated first,
+# so that they can no longer log in nor be used, then their tasks are deleted in batches
+# of short transactions, and the user row goes last with its counters and tombstones.
+
+def deactivate(user_id):
+    """
+    Mark an account deleted and revoke its token, its data is left to purge().
+
+    Args:
+        user_id (int): ID of the user.
+    """
+    with transaction.atomic():
+        User.objects.filter(id=user_id).update(is_active=False, deleted_at=now())
+        Token.objects.filter(user_id=user_id).delete()
+    # update() sends no post_save, the cached authentications are dropped here
+    CachedBearerTokenAuthentication.invalidate_user(user_id)
+
+def purge(user_id, batch_size=None):
+    """
+    Delete the tasks of a deactivated account in batches, then the account.
+
+    Args:
+        user_id (int): ID of the user.
+        batch_size (int): Tasks deleted per transaction, USER_DELETION["BATCH_SIZE"] by default.
+
+    Returns:
+        int: Number of deleted tasks.
+    """
+    batch_size = batch_size or settings.USER_DELETION["BATCH_SIZE"]
+    table = connection.ops.quote_name(Task._meta.db_table)
+    deleted, last_id = 0, 0
+    while True:
+        # Batches walk the owner index from the last deleted ID, not over the dead entries of earlier batches
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f"WITH batch AS ("
+                f"    DELETE FROM {table} WHERE id IN ("
+                f"        SELECT id FROM {table} WHERE owner_id = %s AND id > %s ORDER BY id LIMIT %s"
+                f"    ) RETURNING id"
+                f") SELECT COUNT(*), MAX(id) FROM batch",
+                [user_id, last_id, batch_size],
+            )
+            count, last_id = cursor.fetchone()
+        deleted += count
+        if count < batch_size:
+            break
+
+    User.objects.filter(id=user_id).delete()
+    # Cached pages of the user's tasks become unreachable
+    versions.forget(user_id)
+    return deleted
+
+def deleted_users():
+    # IDs of the deactivated accounts waiting for purge, oldest first
+    return User.objects.filter(deleted_at__isnull=False).order_by("deleted_at").values_list("id", flat=True)
@@ -0,0 +1,76 @@
+from functools import wraps
+from asgiref.sync import sync_to_async
+from django.http import Http404
+from rest_framework import exceptions
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.views import exception_handler
+
+# Async function views
+#
+# DRF views only run synchronously, under ASGI each of them holds a thread for the
+# whole request. api_view() gives native async views what the API uses of DRF's
+# @api_view: request.data and request.query_params, token authentication, method
+# checks, DRF error responses and JSON rendering of the returned Response.
+
+def api_view(methods, authenticated=True):
+    """
+    Turn an async function into a view of the given HTTP methods.
+
+    Args:
+        methods (list): Allowed HTTP methods.
+        authenticated (bool): Whether the view requires an authenticated user.
+
+    Returns:
+        function: Decorator of async views receiving a DRF Request.
+    """
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            request = Request(request, parsers=[parser() for parser in api_settings.DEFAULT_PARSER_CLASSES])
+            try:
+                if authenticated:
+                    request.user, request.auth = await _authenticate(request)
+                if request.method not in methods:
+                    raise exceptions.MethodNotAllowed(request.method)
+                response = await view(request, *args, **kwargs)
+            except (exceptions.APIException, Http404) as exc:
+                response = _exception_response(request, exc)
+            return _rendered(response)
+
+        # Tokens are not sent by browsers on their own, as for DRF views
+        wrapper.csrf_exempt = True
+        return wrapper
+    return decorator
+
+# Private helpers
+
+async def _authenticate(request):
+    for authentication_class in api_settings.DEFAULT_AUTHENTICATION_CLASSES:
+        authenticator = authentication_class()
+        if hasattr(authenticator, "aauthenticate"):
+            result = await authenticator.aauthenticate(request)
+        else:
+            result = await sync_to_async(authenticator.authenticate)(request)
+        if result is not None:
+            return result
+    raise exceptions.NotAuthenticated()
+
+def _exception_response(request, exc):
+    if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+        authenticator = api_settings.DEFAULT_AUTHENTICATION_CLASSES[0]()
+        exc.auth_header = authenticator.authenticate_header(request)
+    response = exception_handler(exc, {"request": request})
+    if getattr(exc, "auth_header", None):
+        response["WWW-Authenticate"] = exc.auth_header
+    return response
+
+def _rendered(response):
+    if isinstance(response, Response):
+        # The JSON renderer of the settings, first of the renderer classes
+        response.accepted_renderer = api_settings.DEFAULT_RENDERER_CLASSES[0]()
+        response.accepted_media_type = response.accepted_renderer.media_type
+        response.renderer_context = {}
+        response.render()
+    return response
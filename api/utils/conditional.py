@@ -0,0 +1,37 @@
+import json
+from hashlib import sha1
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+# Conditional GET (ETag / Last-Modified)
+
+def etag(*parts):
+    return quote_etag("-".join(str(part) for part in parts))
+
+def digest(value):
+    # Short stable digest of JSON-serializable query values
+    return sha1(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+def not_modified(request, etag, last_modified=None):
+    """
+    Answer If-None-Match / If-Modified-Since without building the payload.
+
+    Args:
+        request (Request): Incoming HTTP request.
+        etag (str): Quoted strong ETag of the current representation.
+        last_modified (datetime): Date of the last change, or None if unknown.
+
+    Returns:
+        HttpResponse: 304 (or 412) response if the client's copy is current, otherwise None.
+    """
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if response is not None:
+        validated(response, etag, last_modified)
+    return response
+
+def validated(response, etag, last_modified=None):
+    response["ETag"] = etag
+    if last_modified:
+        response["Last-Modified"] = http_date(last_modified.timestamp())
+    return response
@@ -0,0 +1,110 @@
+from collections import Counter
+from django.db import connection, transaction
+from django.db.models import Count
+from django.utils.timezone import now
+from api.models import Task, TaskCounter, User
+
+# Denormalized task counters
+#
+# Task writes add and remove the (status, category, priority) keys of the tasks they
+# change, the deltas are applied with one upsert. Writers call apply() after the
+# collection version bump, which locks the owner's row, so concurrent writers of one
+# user update the counters one at a time.
+
+_FIELDS = ("status", "category", "priority")
+
+def key(task):
+    if isinstance(task, dict):
+        return tuple(task[field] for field in _FIELDS)
+    return tuple(getattr(task, field) for field in _FIELDS)
+
+def apply(owner_id, added=(), removed=()):
+    """
+    Add and remove tasks from a user's counters.
+
+    Args:
+        owner_id (int): ID of the owner of the tasks.
+        added (iterable): Keys of the created tasks and of the new state of updated tasks.
+        removed (iterable): Keys of the deleted tasks and of the previous state of updated tasks.
+    """
+    deltas = Counter(added)
+    deltas.subtract(removed)
+    rows = sorted((key, delta) for key, delta in deltas.items() if delta)
+    if not rows:
+        return
+
+    table = TaskCounter._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} (owner_id, status, category, priority, count) "
+            f"VALUES {', '.join(['(%s, %s, %s, %s, %s)'] * len(rows))} "
+            f"ON CONFLICT (owner_id, status, category, priority) DO UPDATE SET count = {table}.count + EXCLUDED.count",
+            [value for key, delta in rows for value in (owner_id, *key, delta)],
+        )
+
+def reconcile(owner_id):
+    """
+    Recount the tasks of a user and fix the stored counters if they drifted.
+
+    Args:
+        owner_id (int): ID of the owner of the tasks.
+
+    Returns:
+        bool: Whether the stored counters were wrong.
+    """
+    with transaction.atomic():
+        # Lock the owner's row, as writers do, so no write is counted twice or missed
+        list(User.objects.select_for_update().filter(id=owner_id).values_list("id"))
+        actual = {
+            key(row): row["count"]
+            for row in Task.objects.filter(owner_id=owner_id).values(*_FIELDS).annotate(count=Count("id")).order_by()
+        }
+        stored = {key(row): row["count"] for row in TaskCounter.objects.filter(owner_id=owner_id).values(*_FIELDS, "count") if row["count"]}
+        if actual == stored:
+            return False
+
+        TaskCounter.objects.filter(owner_id=owner_id).delete()
+        TaskCounter.objects.bulk_create([
+            TaskCounter(owner_id=owner_id, **dict(zip(_FIELDS, key)), count=count) for key, count in actual.items()
+        ])
+        return True
+
+def stats(owner_id):
+    """
+    Count the tasks of a user, in two queries whatever the number of tasks.
+
+    Args:
+        owner_id (int): ID of the owner of the tasks.
+
+    Returns:
+        dict: Total, pending, completed and overdue counts, overall, by category and by priority.
+    """
+    result = {
+        "all": _empty(),
+        "by_category": {category: _empty() for category in Task.Category.values},
+        "by_priority": {priority: _empty() for priority in Task.Priority.values},
+    }
+
+    def add(category, priority, name, count):
+        for group in [result["all"], result["by_category"][category], result["by_priority"][priority]]:
+            group[name] += count
+
+    for row in TaskCounter.objects.filter(owner_id=owner_id).values(*_FIELDS, "count"):
+        add(row["category"], row["priority"], "total", row["count"])
+        add(row["category"], row["priority"], row["status"].lower(), row["count"])
+
+    # Overdue depends on the time, it is counted from the partial index of pending deadlines
+    overdue = (
+        Task.objects.filter(owner_id=owner_id, status=Task.Status.PENDING, deadline__lt=now())
+        .values("category", "priority")
+        .annotate(count=Count("id"))
+        .order_by()
+    )
+    for row in overdue:
+        add(row["category"], row["priority"], "overdue", row["count"])
+    return result
+
+# Private helpers
+
+def _empty():
+    return {"total": 0, "pending": 0, "completed": 0, "overdue": 0}
@@ -0,0 +1,86 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import BoundedSemaphore, Lock
+from django.conf import settings
+from django.contrib.auth import hashers
+
+# Bounded password hashing
+#
+# PBKDF2 takes hundreds of milliseconds of CPU per hash. Hashes run in a small thread
+# pool (hashlib releases the GIL while hashing) and at most MAX_PENDING of them can be
+# queued or running, further requests are rejected at once instead of piling up.
+
+class Saturated(Exception):
+    pass
+
+_pool = None
+_slots = None
+_lock = Lock()
+
+def run(function, *args):
+    """
+    Run a function in the hashing pool and wait for its result.
+
+    Args:
+        function (callable): Hashing work to run.
+        *args: Arguments of the function.
+
+    Returns:
+        Result of the function.
+
+    Raises:
+        Saturated: MAX_PENDING hashes are already queued or running.
+    """
+    pool, slots = _executor()
+    if not slots.acquire(blocking=False):
+        raise Saturated()
+    try:
+        future = pool.submit(function, *args)
+    except BaseException:
+        slots.release()
+        raise
+    future.add_done_callback(lambda _: slots.release())
+    return future.result()
+
+def make_password(password):
+    return run(hashers.make_password, password)
+
+def check_password(password, encoded):
+    """
+    Check a password, rehashing it when the preferred hasher or its parameters changed.
+
+    Args:
+        password (str): Raw password.
+        encoded (str): Stored password hash, or None to spend the time of a hash anyway.
+
+    Returns:
+        tuple: Whether the password is valid, and its new hash when it has to be stored.
+    """
+    return run(_check_password, password, encoded)
+
+def reset():
+    global _pool, _slots
+    with _lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True)
+        _pool, _slots = None, None
+
+# Private helpers
+
+def _executor():
+    global _pool, _slots
+    if _pool is None:
+        with _lock:
+            if _pool is None:
+                _slots = BoundedSemaphore(settings.PASSWORD_HASHING["MAX_PENDING"])
+                _pool = ThreadPoolExecutor(settings.PASSWORD_HASHING["WORKERS"], thread_name_prefix="hashing")
+    return _pool, _slots
+
+def _check_password(password, encoded):
+    if encoded is None:
+        # Same cost as an existing user, so missing usernames cannot be told apart by timing
+        hashers.make_password(password)
+        return False, None
+
+    rehashed = []
+    valid = hashers.check_password(password, encoded, setter=lambda raw: rehashed.append(hashers.make_password(raw)))
+    return valid, rehashed[0] if rehashed else None
@@ -0,0 +1,192 @@
+import logging
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from threading import Lock
+from time import sleep
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils.timezone import now
+from api.models import Job
+
+# Background jobs
+#
+# Work that does not need to finish within a request is enqueued as a job, a registered
+# function and its JSON arguments. With the "database" backend jobs are rows of the job
+# table, inserted in the transaction of the request, and run_jobs workers claim them with
+# SELECT ... FOR UPDATE SKIP LOCKED, so that concurrent workers never claim the same job.
+# With the "local" backend jobs run after commit in a thread pool of the web process,
+# without persistence: a job queued when the process stops is lost. Jobs run at least
+# once, so job functions must be idempotent.
+
+logger = logging.getLogger("api.jobs")
+
+_registry = {}
+_pool = None
+_lock = Lock()
+
+def register(name):
+    """
+    Register a job function under a name, as a decorator.
+
+    Args:
+        name (str): Name of the job, stored with each queued job.
+
+    Returns:
+        callable: Decorator returning the function unchanged.
+    """
+    def decorator(function):
+        _registry[name] = function
+        return function
+    return decorator
+
+def enqueue(name, *args):
+    """
+    Queue a call of a registered job, run once the current transaction commits.
+
+    Args:
+        name (str): Name of the job.
+        *args: JSON serializable arguments of the job function.
+
+    Returns:
+        Job: Queued job, or None with the local backend.
+    """
+    if name not in _registry:
+        raise LookupError(f"Unknown job {name}")
+    if settings.JOBS["BACKEND"] == "local":
+        transaction.on_commit(lambda: _executor().submit(_run_local, name, args))
+        return None
+    return Job.objects.create(name=name, args=list(args))
+
+def claim(limit):
+    """
+    Lock the oldest due jobs for this worker.
+
+    Args:
+        limit (int): Maximum number of jobs.
+
+    Returns:
+        list: Claimed jobs, RUNNING with their attempt counted.
+    """
+    with transaction.atomic():
+        jobs = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status=Job.Status.QUEUED, run_at__lte=now())
+            .order_by("run_at", "id")[:limit]
+        )
+        if jobs:
+            Job.objects.filter(id__in=[job.id for job in jobs]).update(
+                status=Job.Status.RUNNING, attempts=F("attempts") + 1, locked_at=now(),
+            )
+    for job in jobs:
+        job.attempts += 1
+    return jobs
+
+def run(job):
+    """
+    Run a claimed job, and schedule its retry when it fails.
+
+    Args:
+        job (Job): Claimed job, to be deleted by the caller when it succeeds.
+
+    Returns:
+        bool: Whether the job succeeded.
+    """
+    try:
+        _call(job.name, job.args)
+    except Exception:
+        error = traceback.format_exc()
+        if job.attempts >= settings.JOBS["MAX_ATTEMPTS"]:
+            logger.error("Job %s %s failed after %s attempts:\n%s", job.id, job.name, job.attempts, error)
+            Job.objects.filter(id=job.id).update(status=Job.Status.FAILED, locked_at=None, error=error)
+        else:
+            Job.objects.filter(id=job.id).update(
+                status=Job.Status.QUEUED, locked_at=None, error=error, run_at=now() + _retry_delay(job.attempts),
+            )
+        return False
+    return True
+
+def recover():
+    """
+    Requeue the jobs of workers that stopped while running them.
+
+    Returns:
+        int: Number of requeued or failed jobs.
+    """
+    lost = Job.objects.filter(status=Job.Status.RUNNING, locked_at__lt=now() - timedelta(seconds=settings.JOBS["TIMEOUT"]))
+    # The lost attempt was counted when the job was claimed
+    failed = lost.filter(attempts__gte=settings.JOBS["MAX_ATTEMPTS"]).update(
+        status=Job.Status.FAILED, locked_at=None, error="Worker lost",
+    )
+    return failed + lost.update(status=Job.Status.QUEUED, locked_at=None)
+
+def work(batch_size=10, once=False, stop=None):
+    """
+    Claim and run jobs until stopped.
+
+    Args:
+        batch_size (int): Jobs claimed at a time.
+        once (bool): Return when no job is due instead of polling for new ones.
+        stop (threading.Event): Set to stop after the current batch.
+
+    Returns:
+        int: Number of jobs run.
+    """
+    processed = 0
+    while stop is None or not stop.is_set():
+        jobs = claim(batch_size)
+        # Succeeded jobs are deleted once per batch, a worker stopping before then runs them again
+        Job.objects.filter(id__in=[job.id for job in jobs if run(job)]).delete()
+        processed += len(jobs)
+        if not jobs:
+            if recover():
+                continue
+            if once:
+                break
+            if stop is None:
+                sleep(settings.JOBS["POLL_INTERVAL"])
+            else:
+                stop.wait(settings.JOBS["POLL_INTERVAL"])
+    return processed
+
+def reset():
+    global _pool
+    with _lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True)
+        _pool = None
+
+# Private helpers
+
+def _call(name, args):
+    function = _registry.get(name)
+    if function is None:
+        raise LookupError(f"Unknown job {name}")
+    function(*args)
+
+def _retry_delay(attempts):
+    return timedelta(seconds=settings.JOBS["RETRY_DELAY"] * 2 ** (attempts - 1))
+
+def _executor():
+    global _pool
+    if _pool is None:
+        with _lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(settings.JOBS["WORKERS"], thread_name_prefix="jobs")
+    return _pool
+
+def _run_local(name, args):
+    try:
+        for attempt in range(1, settings.JOBS["MAX_ATTEMPTS"] + 1):
+            try:
+                _call(name, args)
+                return
+            except Exception:
+                if attempt == settings.JOBS["MAX_ATTEMPTS"]:
+                    logger.exception("Job %s failed after %s attempts", name, attempt)
+                else:
+                    sleep(_retry_delay(attempt).total_seconds())
+    finally:
+        # Pool threads hold their own connections
+        connection.close()
@@ -0,0 +1,202 @@
+import logging
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from time import perf_counter
+
+# Request instrumentation
+#
+# InstrumentationMiddleware opens the stats of each request in a context variable, which
+# sync_to_async copies to the threads running the ORM calls of async views. The queries
+# of every connection and the serialization phases add to the stats of the current
+# request, finished requests are recorded per route in an in-process registry.
+
+logger = logging.getLogger("api.slow_requests")
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+MAX_CAPTURED_QUERIES = 200
+
+_current = ContextVar("request_stats", default=None)
+
+class RequestStats:
+    '''
+    Queries, database time and serialization time of one request
+    '''
+    def __init__(self, capture_sql=False):
+        self.start = perf_counter()
+        self.queries = 0
+        self.db = 0.0
+        self.serialize = 0.0
+        # SQL and duration of each query, kept for the slow request log
+        self.sql = [] if capture_sql else None
+
+    def query(self, sql, seconds):
+        self.queries += 1
+        self.db += seconds
+        if self.sql is not None and len(self.sql) < MAX_CAPTURED_QUERIES:
+            self.sql.append((sql, seconds))
+
+    def elapsed(self):
+        return perf_counter() - self.start
+
+    def server_timing(self, total):
+        # Server-Timing durations are in milliseconds
+        return (
+            f'db;dur={self.db * 1000:.2f};desc="{self.queries} queries", '
+            f"serialize;dur={self.serialize * 1000:.2f}, "
+            f"total;dur={total * 1000:.2f}"
+        )
+
+
+class Registry:
+    '''
+    Thread-safe per route and method histograms of finished requests
+    '''
+    def __init__(self):
+        self._routes = {}
+        self._lock = Lock()
+
+    def record(self, route, method, stats, total):
+        with self._lock:
+            entry = self._routes.get((route, method))
+            if entry is None:
+                entry = self._routes[(route, method)] = {
+                    "count": 0,
+                    "duration": [0] * (len(DURATION_BUCKETS) + 1),
+                    "duration_sum": 0.0,
+                    "queries": [0] * (len(QUERY_BUCKETS) + 1),
+                    "queries_sum": 0,
+                    "db_sum": 0.0,
+                    "serialize_sum": 0.0,
+                }
+            entry["count"] += 1
+            entry["duration"][bisect_left(DURATION_BUCKETS, total)] += 1
+            entry["duration_sum"] += total
+            entry["queries"][bisect_left(QUERY_BUCKETS, stats.queries)] += 1
+            entry["queries_sum"] += stats.queries
+            entry["db_sum"] += stats.db
+            entry["serialize_sum"] += stats.serialize
+
+    def snapshot(self):
+        with self._lock:
+            return {key: {**entry, "duration": list(entry["duration"]), "queries": list(entry["queries"])} for key, entry in self._routes.items()}
+
+    def clear(self):
+        with self._lock:
+            self._routes.clear()
+
+    def export(self):
+        """
+        Render the recorded requests in the Prometheus text exposition format.
+
+        Returns:
+            str: Request duration and query count histograms, database and serialization time counters.
+        """
+        routes = sorted(self.snapshot().items())
+        lines = []
+
+        def histogram(name, help, buckets, counts, total):
+            lines.extend([f"# HELP {name} {help}", f"# TYPE {name} histogram"])
+            for (route, method), entry in routes:
+                labels = _labels(route, method)
+                cumulative = 0
+                for bound, count in zip([*buckets, "+Inf"], entry[counts]):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f"{name}_sum{{{labels}}} {entry[total]}")
+                lines.append(f"{name}_count{{{labels}}} {entry['count']}")
+
+        def counter(name, help, total):
+            lines.extend([f"# HELP {name} {help}", f"# TYPE {name} counter"])
+            for (route, method), entry in routes:
+                lines.append(f"{name}{{{_labels(route, method)}}} {entry[total]}")
+
+        histogram("api_request_duration_seconds", "Time to answer API requests.", DURATION_BUCKETS, "duration", "duration_sum")
+        histogram("api_request_queries", "SQL queries run by API requests.", QUERY_BUCKETS, "queries", "queries_sum")
+        counter("api_request_db_seconds_total", "Time spent in SQL queries by API requests.", "db_sum")
+        counter("api_request_serialize_seconds_total", "Time spent serializing API responses.", "serialize_sum")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+def export_caches(stats):
+    """
+    Render the hit and miss counters of caches in the Prometheus text exposition format.
+
+    Args:
+        stats (dict): Hits and misses of each cache, by cache name.
+
+    Returns:
+        str: Hit and miss counters and the hit ratio of each cache.
+    """
+    lines = []
+    for name, help, value in [
+        ("api_cache_hits_total", "Lookups answered by the cache.", lambda entry: entry["hits"]),
+        ("api_cache_misses_total", "Lookups missing from the cache.", lambda entry: entry["misses"]),
+        ("api_cache_hit_ratio", "Share of the lookups answered by the cache.", _hit_ratio),
+    ]:
+        lines.extend([f"# HELP {name} {help}", f"# TYPE {name} {'gauge' if name.endswith('ratio') else 'counter'}"])
+        for cache, entry in sorted(stats.items()):
+            lines.append(f'{name}{{cache="{cache}"}} {value(entry)}')
+    return "\n".join(lines) + "\n"
+
+def begin(capture_sql=False):
+    # Stats of a new request and the token to end it with
+    stats = RequestStats(capture_sql)
+    return stats, _current.set(stats)
+
+def end(token):
+    _current.reset(token)
+
+def current():
+    return _current.get()
+
+@contextmanager
+def serializing():
+    # Add the time of the block to the serialization time of the current request
+    stats = _current.get()
+    if stats is None:
+        yield
+        return
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        stats.serialize += perf_counter() - start
+
+def instrument(connection):
+    # First in the wrappers, so connection.execute_wrapper() blocks still pop their own wrapper
+    if _execute not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _execute)
+
+def log_slow_request(request, route, stats, total):
+    queries = "\n".join(f"  {seconds * 1000:8.2f} ms  {sql}" for sql, seconds in stats.sql or [])
+    logger.warning(
+        "Slow request %s %s (%s) %.2f ms, %d queries %.2f ms, serialize %.2f ms\n%s",
+        request.method, request.get_full_path(), route, total * 1000,
+        stats.queries, stats.db * 1000, stats.serialize * 1000, queries,
+    )
+
+# Private helpers
+
+def _execute(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.query(sql, perf_counter() - start)
+
+def _hit_ratio(entry):
+    total = entry["hits"] + entry["misses"]
+    return entry["hits"] / total if total else 0.0
+
+def _labels(route, method):
+    route = route.replace("\\", "\\\\").replace('"', '\\"')
+    return f'route="{route}",method="{method}"'
@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.core.cache import caches
+from api.utils.cache import HitCounter
+
+# Cached pages of the tasks list
+#
+# Keys hold the owner's task collection version, so bumping the version on a write
+# makes every cached page of that user unreachable in O(1). Unreachable pages expire
+# after TASKS_CACHE_TIMEOUT seconds. The version in the key is the committed one, read
+# from the database unless TASKS_CACHE is shared, so a per-process cache never serves
+# the pages of a version that another process has bumped.
+
+counter = HitCounter()
+
+def get(user_id, version, query):
+    page = _cache().get(_key(user_id, version, query))
+    if page is None:
+        counter.miss()
+    else:
+        counter.hit()
+    return page
+
+def set(user_id, version, query, page):
+    _cache().set(_key(user_id, version, query), page, settings.TASKS_CACHE_TIMEOUT)
+
+async def aget(user_id, version, query):
+    page = await _cache().aget(_key(user_id, version, query))
+    if page is None:
+        counter.miss()
+    else:
+        counter.hit()
+    return page
+
+async def aset(user_id, version, query, page):
+    await _cache().aset(_key(user_id, version, query), page, settings.TASKS_CACHE_TIMEOUT)
+
+def stats():
+    return counter.stats()
+
+# Private helpers
+
+def _cache():
+    return caches[settings.TASKS_CACHE]
+
+def _key(user_id, version, query):
+    return f"tasks:page:{user_id}:{version}:{query}"
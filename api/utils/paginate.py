@@ -0,0 +1,147 @@
+import base64
+import binascii
+import json
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import GeneratedField, Q
+
+# Keyset (cursor) pagination
+#
+# Pages are fetched with "WHERE (sort_key, id) > last_seen ORDER BY sort_key, id LIMIT n",
+# never with OFFSET, so every page costs the same whatever its depth.
+# NULL values sort after every other value, in both directions (Postgres default),
+# and are read as their own segment so each query stays an index range scan.
+
+def encode_cursor(sort, value, id, occurrence=None):
+    # Occurrences of recurring tasks have no ID, their cursor holds their series ID and occurrence
+    if hasattr(value, "isoformat"):
+        value = value.isoformat()
+    payload = {"s": sort or "", "v": value, "i": id}
+    if occurrence is not None:
+        payload["o"] = occurrence.isoformat()
+    payload = json.dumps(payload, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(model, cursor, sort, field=None):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if payload["s"] != (sort or ""):
+            return None
+        field = _model_field(model, field or sort_key(sort)[0])
+        value = payload["v"]
+        if field is None:
+            # Numeric annotation, such as a search rank
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                return None
+        elif value is not None:
+            # Generated fields, such as the priority rank, leave the conversion to their output field
+            value = (field.output_field if isinstance(field, GeneratedField) else field).to_python(value)
+            # Postgres text cannot hold NUL characters
+            if isinstance(value, str) and "\x00" in value:
+                return None
+        elif not field.null:
+            return None
+        if "o" in payload:
+            return value, int(payload["i"]), model._meta.get_field("occurrence").to_python(payload["o"])
+        return value, int(payload["i"])
+    except (binascii.Error, ValueError, ValidationError, TypeError, KeyError):
+        return None
+
+def sort_key(sort):
+    if not sort:
+        return "id", False
+    if sort.startswith("-"):
+        return sort[1:], True
+    return sort, False
+
+def keyset(queryset, sort, position, limit, field=None):
+    """
+    Fetch one page of a queryset in keyset order.
+
+    Args:
+        queryset (QuerySet): Filtered queryset to paginate.
+        sort (str): Validated sort value, e.g. "deadline" or "-title", or None to sort by id.
+        position (tuple): Decoded cursor (value, id[, occurrence]) of the last row of the previous page, or None.
+        limit (int): Maximum number of rows in the page.
+        field (str): Column to order on when it differs from the sort name.
+
+    Returns:
+        tuple: List of rows and the cursor of the next page, or None on the last page.
+    """
+    rows = []
+    for page in _pages(queryset, sort, position, field):
+        rows += list(page[: limit + 1 - len(rows)])
+        if len(rows) > limit:
+            break
+    return _page(rows, sort, limit, field)
+
+async def akeyset(queryset, sort, position, limit, field=None):
+    # Async variant of keyset()
+    rows = []
+    for page in _pages(queryset, sort, position, field):
+        rows += [row async for row in page[: limit + 1 - len(rows)]]
+        if len(rows) > limit:
+            break
+    return _page(rows, sort, limit, field)
+
+# Private helpers
+
+def _pages(queryset, sort, position, field):
+    # Querysets of the remaining segments, in order, starting after the position
+    name, descending = sort_key(sort)
+    field = field or name
+    segments = _segments(queryset.model, field, descending)
+    start = _segment_index(segments, position)
+
+    for index, (segment, ordering, is_null_segment) in enumerate(segments[start:]):
+        page = queryset.filter(segment).order_by(*ordering)
+        if position is not None and index == 0:
+            page = page.filter(_after(field, descending, position, is_null_segment))
+        yield page
+
+def _page(rows, sort, limit, field):
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    field = field or sort_key(sort)[0]
+    return rows, encode_cursor(sort, _value(last, field), _value(last, "id"))
+
+def _value(row, field):
+    return row[field] if isinstance(row, dict) else getattr(row, field)
+
+def _model_field(model, field):
+    try:
+        return model._meta.get_field(field)
+    except FieldDoesNotExist:
+        return None
+
+def _segments(model, field, descending):
+    prefix = "-" if descending else ""
+
+    if field == "id":
+        return [(Q(), (prefix + "id",), False)]
+    if not getattr(_model_field(model, field), "null", False):
+        return [(Q(), (prefix + field, prefix + "id"), False)]
+
+    values = (Q(**{f"{field}__isnull": False}), (prefix + field, prefix + "id"), False)
+    nulls = (Q(**{f"{field}__isnull": True}), (prefix + "id",), True)
+    return [nulls, values] if descending else [values, nulls]
+
+def _segment_index(segments, position):
+    if position is None:
+        return 0
+    for index, (_, _, is_null_segment) in enumerate(segments):
+        if len(segments) == 1 or is_null_segment == (position[0] is None):
+            return index
+    return 0
+
+def _after(field, descending, position, is_null_segment):
+    value, id = position[:2]
+    id_after = Q(id__lt=id) if descending else Q(id__gt=id)
+
+    if field == "id" or is_null_segment:
+        return id_after
+    if descending:
+        return Q(**{f"{field}__lte": value}) & (Q(**{f"{field}__lt": value}) | id_after)
+    return Q(**{f"{field}__gte": value}) & (Q(**{f"{field}__gt": value}) | id_after)
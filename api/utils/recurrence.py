@@ -0,0 +1,240 @@
+import calendar
+from datetime import datetime, time, timedelta, timezone
+from django.conf import settings
+from django.utils.timezone import get_current_timezone, make_aware
+
+# Recurring tasks
+#
+# A task with a recurrence rule is a series: one row whose occurrences repeat from its
+# deadline on and are never stored. Lists with a deadline window expand the series in
+# the window as they are read, an occurrence is stored as its own task, pointing at its
+# series, only when it is completed or edited. Rules are a subset of RFC 5545 RRULE:
+#     FREQ=DAILY|WEEKLY|MONTHLY, INTERVAL=n, BYDAY=MO,..,SU (weekly), BYMONTHDAY=1..31
+#     or -31..-1 (monthly), and COUNT=n or UNTIL=YYYYMMDD[THHMMSSZ]
+# Occurrences keep the wall clock time of the deadline in the current time zone.
+
+_FREQUENCIES = ("DAILY", "WEEKLY", "MONTHLY")
+_WEEKDAYS = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+_MAX_INTERVAL = 1000
+_MAX_COUNT = 100000
+# Later UNTIL dates are clamped, occurrences stay far from the end of the datetime range
+_MAX_UNTIL = datetime(9000, 1, 1, tzinfo=timezone.utc)
+
+class Rule:
+    '''
+    Parsed recurrence rule
+    '''
+    __slots__ = ("frequency", "interval", "weekdays", "monthdays", "count", "until")
+
+    def __init__(self, frequency, interval=1, weekdays=(), monthdays=(), count=None, until=None):
+        self.frequency = frequency
+        self.interval = interval
+        self.weekdays = weekdays
+        self.monthdays = monthdays
+        self.count = count
+        self.until = until
+
+    def occurrences(self, start, after, before, reverse=False):
+        """
+        Generate the occurrences of the rule within a window, in order.
+
+        Args:
+            start (datetime): First deadline of the series.
+            after (datetime): Inclusive start of the window.
+            before (datetime): Exclusive end of the window.
+            reverse (bool): Generate them from the last one.
+
+        Yields:
+            datetime: Aware occurrence deadlines.
+        """
+        try:
+            yield from self._occurrences(start, after, before, reverse)
+        except (OverflowError, ValueError):
+            # Periods past the datetime range, e.g. of a long interval, have no occurrence
+            return
+
+    def includes(self, start, value):
+        return next(self.occurrences(start, value, value + timedelta(microseconds=1)), None) == value
+
+    def _occurrences(self, start, after, before, reverse):
+        # The current time zone is a context-local lookup, resolved once
+        zone = get_current_timezone()
+        local_start = start.astimezone(zone).replace(tzinfo=None)
+        until = before if self.until is None or self.until >= before else self.until + timedelta(microseconds=1)
+        if until <= after:
+            return
+        if reverse and self.count:
+            # The COUNT-th occurrence is only known counting from the start, COUNT bounds the list
+            yield from reversed(list(self.occurrences(start, after, before)))
+            return
+
+        if reverse:
+            # Periods of the window from the last one, until one starts before the window
+            period = self._period_index(local_start, until.astimezone(zone).replace(tzinfo=None))
+            while period >= 0:
+                for occurrence in reversed(self._period(local_start, period)):
+                    occurrence = occurrence.replace(tzinfo=zone)
+                    if after <= occurrence < until:
+                        yield occurrence
+                if self._period_start(local_start, period).replace(tzinfo=zone) <= after:
+                    return
+                period -= 1
+            return
+
+        # Periods before the one of the window are skipped, their occurrences only counted
+        period = self._period_index(local_start, max(start, after).astimezone(zone).replace(tzinfo=None))
+        emitted = self._occurrences_before(local_start, period) if self.count else 0
+        # Periods may have no occurrence, e.g. the 31st of a month, the loop ends past the window
+        while self._period_start(local_start, period).replace(tzinfo=zone) < until:
+            for occurrence in self._period(local_start, period):
+                if self.count and emitted >= self.count:
+                    return
+                emitted += 1
+                occurrence = occurrence.replace(tzinfo=zone)
+                if occurrence >= until:
+                    return
+                if occurrence >= after:
+                    yield occurrence
+            period += 1
+
+    # Periods are days, weeks or months, every interval-th one from the start's
+
+    def _period(self, local_start, index):
+        if self.frequency == "DAILY":
+            return [local_start + timedelta(days=index * self.interval)]
+        if self.frequency == "WEEKLY":
+            week = local_start.date() - timedelta(days=local_start.weekday()) + timedelta(weeks=index * self.interval)
+            candidates = [datetime.combine(week + timedelta(days=weekday), local_start.time()) for weekday in self.weekdays or (local_start.weekday(),)]
+        else:
+            year, month = divmod(local_start.year * 12 + local_start.month - 1 + index * self.interval, 12)
+            days = calendar.monthrange(year, month + 1)[1]
+            monthdays = sorted({day if day > 0 else days + 1 + day for day in self.monthdays or (local_start.day,)})
+            candidates = [datetime.combine(datetime(year, month + 1, day), local_start.time()) for day in monthdays if 1 <= day <= days]
+        return [candidate for candidate in candidates if candidate >= local_start] if index == 0 else candidates
+
+    def _period_start(self, local_start, index):
+        if self.frequency == "DAILY":
+            return local_start + timedelta(days=index * self.interval)
+        if self.frequency == "WEEKLY":
+            week = local_start.date() - timedelta(days=local_start.weekday()) + timedelta(weeks=index * self.interval)
+            return datetime.combine(week, time.min)
+        year, month = divmod(local_start.year * 12 + local_start.month - 1 + index * self.interval, 12)
+        return datetime(year, month + 1, 1)
+
+    def _period_index(self, local_start, local_after):
+        if self.frequency == "DAILY":
+            elapsed = (local_after - local_start).days
+        elif self.frequency == "WEEKLY":
+            elapsed = (local_after.date() - local_start.date() + timedelta(days=local_start.weekday())).days // 7
+        else:
+            elapsed = (local_after.year - local_start.year) * 12 + local_after.month - local_start.month
+        return max(0, elapsed // self.interval)
+
+    def _occurrences_before(self, local_start, index):
+        if index == 0:
+            return 0
+        if self.frequency == "DAILY":
+            return index
+        if self.frequency == "WEEKLY":
+            return len(self._period(local_start, 0)) + (index - 1) * len(self.weekdays or (local_start.weekday(),))
+        return sum(len(self._period(local_start, period)) for period in range(index))
+
+def parse(text):
+    """
+    Parse a recurrence rule.
+
+    Args:
+        text (str): Rule, e.g. "FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,TH;COUNT=10".
+
+    Returns:
+        Rule: Parsed rule, or None if the rule is invalid or not supported.
+    """
+    parts = {}
+    for part in text.upper().split(";"):
+        name, separator, value = part.partition("=")
+        if not separator or name in parts:
+            return None
+        parts[name] = value
+
+    frequency = parts.pop("FREQ", None)
+    if frequency not in _FREQUENCIES:
+        return None
+    try:
+        rule = Rule(
+            frequency,
+            interval=int(parts.pop("INTERVAL", "1")),
+            weekdays=tuple(sorted({_WEEKDAYS.index(day) for day in parts.pop("BYDAY").split(",")})) if "BYDAY" in parts else (),
+            monthdays=tuple(sorted({int(day) for day in parts.pop("BYMONTHDAY").split(",")})) if "BYMONTHDAY" in parts else (),
+            count=int(parts.pop("COUNT")) if "COUNT" in parts else None,
+            until=_until(parts.pop("UNTIL")) if "UNTIL" in parts else None,
+        )
+    except ValueError:
+        return None
+
+    if parts or not 1 <= rule.interval <= _MAX_INTERVAL or (rule.count is not None and not 1 <= rule.count <= _MAX_COUNT) or (rule.count and rule.until):
+        return None
+    if rule.weekdays and frequency != "WEEKLY":
+        return None
+    if rule.monthdays and (frequency != "MONTHLY" or not all(1 <= abs(day) <= 31 for day in rule.monthdays)):
+        return None
+    return rule
+
+def window(filters):
+    """
+    Deadline window of list filters in which series are expanded.
+
+    Args:
+        filters (dict): Validated list filters.
+
+    Returns:
+        tuple: Inclusive start and exclusive end of the window, or None without both bounds.
+    """
+    after, before = filters.get("deadline__gte"), filters.get("deadline__lt")
+    if after is None or before is None or after >= before:
+        return None
+    # Longer windows only list the first TASKS_RECURRENCE_MAX_DAYS of occurrences, the span is
+    # compared first as adding it to a start near datetime.max overflows
+    span = timedelta(days=settings.TASKS_RECURRENCE_MAX_DAYS)
+    return after, before if before - after <= span else after + span
+
+def expand(series, after, before, stored=frozenset(), reverse=False):
+    """
+    Generate the unstored occurrences of a series within a window, in order.
+
+    Args:
+        series (dict): Series row, with the columns of TaskReadSerializer.
+        after (datetime): Inclusive start of the window.
+        before (datetime): Exclusive end of the window.
+        stored (set): (series ID, occurrence) pairs of the stored occurrences.
+        reverse (bool): Generate them from the last one.
+
+    Yields:
+        dict: Rows of the occurrences, with no ID and their series and occurrence set.
+    """
+    rule = parse(series["recurrence"])
+    if rule is None:
+        return
+    for occurrence in rule.occurrences(series["deadline"], after, before, reverse):
+        if (series["id"], occurrence) in stored:
+            continue
+        yield {
+            **series,
+            "id": None,
+            "deadline": occurrence,
+            "recurrence": None,
+            "series_id": series["id"],
+            "occurrence": occurrence,
+        }
+
+# Private helpers
+
+def _until(value):
+    if "T" in value:
+        until = datetime.strptime(value, "%Y%m%dT%H%M%SZ").replace(tzinfo=timezone.utc)
+    else:
+        # A date includes every occurrence of that day
+        until = datetime.combine(datetime.strptime(value, "%Y%m%d"), time.max)
+        if until.year >= _MAX_UNTIL.year:
+            return _MAX_UNTIL
+        until = make_aware(until)
+    return min(until, _MAX_UNTIL)
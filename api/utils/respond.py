@@ -1,5 +1,6 @@
+from django.http import StreamingHttpResponse
 from rest_framework.response import Response
-from rest_framework.status import HTTP_200_OK, HTTP_201_CREATED, HTTP_204_NO_CONTENT, HTTP_400_BAD_REQUEST, HTTP_404_NOT_FOUND
+from rest_framework.status import HTTP_200_OK, HTTP_201_CREATED, HTTP_204_NO_CONTENT, HTTP_400_BAD_REQUEST, HTTP_404_NOT_FOUND, HTTP_410_GONE, HTTP_503_SERVICE_UNAVAILABLE
 
 # Successful responses
 
@@ -15,6 +16,11 @@ def updated_data():
 def deleted_data():
     return Response(status=HTTP_204_NO_CONTENT)
 
+def streamed_data(chunks, content_type, filename):
+    response = StreamingHttpResponse(chunks, content_type=content_type, status=HTTP_200_OK)
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
 # Error responses
 
 def bad_request(error = "Bad request"):
@@ -24,4 +30,12 @@ def validation_error(error = "Invalid data"):
     return Response({"error": error}, status=HTTP_400_BAD_REQUEST)
 
 def not_found(error = "Not found"):
-    return Response({"error": error}, status=HTTP_404_NOT_FOUND)
\ No newline at end of file
+    return Response({"error": error}, status=HTTP_404_NOT_FOUND)
+
+def gone(error = "Gone"):
+    return Response({"error": error}, status=HTTP_410_GONE)
+
+def service_unavailable(error = "Service unavailable", retry_after = 1):
+    response = Response({"error": error}, status=HTTP_503_SERVICE_UNAVAILABLE)
+    response["Retry-After"] = str(retry_after)
+    return response
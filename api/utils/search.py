@@ -0,0 +1,51 @@
+import re
+from django.conf import settings
+from django.db import connection
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import F, FloatField, Func, Lookup, Value
+
+# Task search
+#
+# Queries of TASKS_SEARCH_MIN_LENGTH characters or more are full-text searches on the
+# stored search_vector (GIN index), every word matching as a prefix, ranked by relevance.
+# Shorter queries, too short to stem, match as substrings of the title or description,
+# served by the trigram indexes when pg_trgm is installed.
+
+_WORDS = re.compile(r"\w+")
+
+def ranked(text):
+    return len(text) >= settings.TASKS_SEARCH_MIN_LENGTH and bool(_WORDS.search(text))
+
+def apply(queryset, text):
+    """
+    Filter a task queryset on a search text.
+
+    Args:
+        queryset (QuerySet): Tasks to search.
+        text (str): Validated search text.
+
+    Returns:
+        QuerySet: Matching tasks, annotated with their "rank" when the search is ranked.
+    """
+    if not ranked(text):
+        pattern = Value(f"%{connection.ops.prep_for_like_query(text)}%")
+        return queryset.filter(_ILike(F("title"), pattern) | _ILike(F("description"), pattern))
+
+    # Only word characters reach to_tsquery, so its syntax cannot be injected
+    query = SearchQuery(" & ".join(word + ":*" for word in _WORDS.findall(text)), search_type="raw", config="english")
+    # ts_rank is a real, whose text form does not round-trip through the cursors
+    rank = Func(SearchRank(F("search_vector"), query), template="(%(expressions)s)::double precision", output_field=FloatField())
+    return queryset.filter(search_vector=query).annotate(rank=rank)
+
+# Private helpers
+
+class _ILike(Lookup):
+    '''
+    Case-insensitive LIKE on the bare column, which its trigram index serves unlike the UPPER() of icontains
+    '''
+    lookup_name = "ilike"
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} ILIKE {rhs}", (*lhs_params, *rhs_params)
@@ -0,0 +1,56 @@
+from django.db import connection, transaction
+from api.models import TaskTombstone, User
+
+# Task tombstones
+#
+# Deleting a task leaves a tombstone at the collection version of the delete, so delta
+# syncs return deleted IDs along with changed tasks. Compaction removes old tombstones
+# and raises the owner's tasks_compacted version: sync tokens below it would miss
+# deletions and have to start over with a full sync.
+
+def record(owner_id, task_ids, version):
+    """
+    Leave a tombstone for each deleted task.
+
+    Args:
+        owner_id (int): ID of the owner of the tasks.
+        task_ids (iterable): IDs of the deleted tasks.
+        version (int): Collection version of the delete.
+    """
+    TaskTombstone.objects.bulk_create(
+        [TaskTombstone(owner_id=owner_id, task_id=task_id, version=version) for task_id in task_ids],
+        batch_size=1000,
+    )
+
+def compact(before, batch_size=10000):
+    """
+    Remove tombstones older than a date, one short transaction per batch.
+
+    Args:
+        before (datetime): Tombstones deleted before this date are removed.
+        batch_size (int): Number of tombstones removed per transaction.
+
+    Returns:
+        int: Number of removed tombstones.
+    """
+    tombstones = connection.ops.quote_name(TaskTombstone._meta.db_table)
+    users = connection.ops.quote_name(User._meta.db_table)
+    removed = 0
+    while True:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f"WITH removed AS ("
+                f"    DELETE FROM {tombstones} WHERE id IN ("
+                f"        SELECT id FROM {tombstones} WHERE deleted_at < %s ORDER BY deleted_at LIMIT %s"
+                f"    ) RETURNING owner_id, version"
+                f"), compacted AS ("
+                f"    UPDATE {users} SET tasks_compacted = GREATEST(tasks_compacted, r.version) "
+                f"    FROM (SELECT owner_id, MAX(version) AS version FROM removed GROUP BY owner_id) AS r "
+                f"    WHERE {users}.id = r.owner_id"
+                f") SELECT COUNT(*) FROM removed",
+                [before, batch_size],
+            )
+            batch = cursor.fetchone()[0]
+        removed += batch
+        if batch < batch_size:
+            return removed
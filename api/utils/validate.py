@@ -1,5 +1,9 @@
 from api.models import Task
-from django.utils.timezone import now
+from api.utils import paginate, recurrence, search
+from django.conf import settings
+from django.utils.dateparse import parse_datetime
+from django.utils.timezone import is_naive, make_aware, now
+from rest_framework.settings import api_settings
 
 # User validators
 
@@ -16,56 +20,189 @@ def user_credentials(userCredentials):
 
 # Task validators
 
-def task_priority(value):
-    return value in [Task.Priority.LOW, Task.Priority.MEDIUM, Task.Priority.HIGH]
-
-def task_status(value):
-    return value in [Task.Status.PENDING, Task.Status.COMPLETED]
-
-def task_category(value):
-    return value in [
-        Task.Category.WORK,
-        Task.Category.PERSONAL,
-        Task.Category.UNCATEGORIZED,
-    ]
+def task_recurrence(value):
+    return recurrence.parse(value) is not None
 
 def task_deadline(value):
     return value > now()
-    
-def task_sort(value):
-        attrs = ["title", "deadline", "priority"]
-        if value.startswith("-"):
-            return value[1:] in attrs
-        else:
-            return value in attrs
+
+def task_sort_field(value):
+    # Column ordered by a sort key, None without a sort
+    return _SORT_FIELDS[value] if value else None
 
 # Query validators
+#
+# The allowed values and sort keys are compiled once at import from the model choices.
+# A query is validated in one pass over its parameters, which reports every invalid or
+# unknown parameter at once instead of the first one.
+
+TASK_STATUSES = frozenset(Task.Status.values)
+TASK_PRIORITIES = frozenset(Task.Priority.values)
+TASK_CATEGORIES = frozenset(Task.Category.values)
+TASK_SORTS = frozenset(f"{prefix}{name}" for name in ("title", "deadline", "priority") for prefix in ("", "-"))
+
+# Priority is ordered by its semantic rank, not alphabetically, rank is the relevance of a search
+_SORT_FIELDS = {
+    f"{prefix}{name}": field
+    for name, field in {"title": "title", "deadline": "deadline", "priority": "priority_rank", "rank": "rank"}.items()
+    for prefix in ("", "-")
+}
+
+def parse_query(query_params, parsers):
+    """
+    Parse query parameters in one pass.
+
+    Args:
+        query_params (QueryDict): Query parameters of the request.
+        parsers (dict): Parser of each allowed parameter, returning its value, None or _INVALID.
+
+    Returns:
+        tuple: Values of the given parameters, and the errors of every invalid or unknown one.
+    """
+    values, errors = {}, []
+    for name in query_params:
+        parse = parsers.get(name)
+        if parse is None:
+            errors.append(f"Unknown {name} parameter")
+            continue
+        value = parse(query_params[name])
+        if value is _INVALID:
+            errors.append(f"Invalid {name} value")
+        elif value is not None:
+            values[name] = value
+    return values, errors
+
+def query_datetime(value):
+    # ISO 8601 date and time, in the current time zone when it has no offset
+    try:
+        value = parse_datetime(value)
+    except ValueError:
+        return None
+    if value is not None and is_naive(value):
+        value = make_aware(value)
+    return value
 
 def tasks_query_filters(query_params):
-    filters = {}
-
-    status = query_params.get("status")
-    priority = query_params.get("priority")
-    category = query_params.get("category")
-
-    if status and not task_status(status):
-        return None, "Invalid status value"
-    if priority and not task_priority(priority):
-        return None, "Invalid priority value"
-    if category and not task_category(category):
-        return None, "Invalid category value"
-
-    if status:
-        filters["status"] = status
-    if priority:
-        filters["priority"] = priority
-    if category:
-        filters["category"] = category
-
+    # Filters of a tasks export, or the errors of its parameters
+    values, errors = parse_query(query_params, _FILTER_PARSERS)
+    filters = _filters(values, errors)
+    if errors:
+        return None, "; ".join(errors)
     return filters, None
 
-def tasks_query_sort(query_params):
-    sort = query_params.get("sort")
-    if sort and not task_sort(sort):
-        return None, "Invalid sort value"
-    return sort, None
\ No newline at end of file
+def tasks_query(query_params):
+    # Filters, search, sort, limit and cursor position of a tasks list request
+    values, errors = parse_query(query_params, _QUERY_PARSERS)
+    filters = _filters(values, errors)
+    if errors:
+        return None, "; ".join(errors)
+
+    text, sort = values.get("q"), values.get("sort")
+    # Ranked searches are sorted by relevance unless another sort is asked for
+    if text and not sort and search.ranked(text):
+        sort = "-rank"
+
+    position = None
+    if "cursor" in values:
+        position = paginate.decode_cursor(Task, values["cursor"], sort, task_sort_field(sort))
+        if position is None:
+            return None, "Invalid cursor value"
+    return (filters, text, sort, values.get("limit", settings.TASKS_PAGE_SIZE), position), None
+
+# Sync validators
+
+def sync_token(query_params):
+    since = query_params.get("since")
+    if since is None:
+        return None, None
+    # isdigit() alone accepts digits such as "²", which int() rejects
+    if not (since.isascii() and since.isdigit()):
+        return None, "Invalid since value"
+    return int(since), None
+
+# Batch validators
+
+def tasks_batch(operations):
+    if not isinstance(operations, list) or not operations:
+        return None, "Operations must be a non-empty list"
+    if len(operations) > settings.TASKS_BATCH_MAX_OPERATIONS:
+        return None, f"At most {settings.TASKS_BATCH_MAX_OPERATIONS} operations are allowed"
+    return operations, None
+
+# Private helpers
+
+def _filters(values, errors):
+    filters = {lookup: values[name] for name, lookup in _FILTER_LOOKUPS if name in values}
+    # Pending tasks whose deadline has passed, served by the partial index of pending deadlines
+    if values.get("overdue"):
+        if values.get("status") == Task.Status.COMPLETED:
+            errors.append("Overdue tasks are pending")
+        filters["status"] = Task.Status.PENDING
+        filters["deadline__lt"] = min(filters.get("deadline__lt", now()), now())
+    return filters
+
+# Marks an invalid value, None is an absent one
+_INVALID = object()
+
+def _choice(allowed):
+    def parse(value):
+        if not value:
+            return None
+        return value if value in allowed else _INVALID
+    return parse
+
+def _deadline(value):
+    if not value:
+        return None
+    deadline = query_datetime(value)
+    return _INVALID if deadline is None else deadline
+
+def _overdue(value):
+    if not value:
+        return None
+    return True if value == "true" else _INVALID
+
+def _search(value):
+    text = value.strip()
+    # Postgres text cannot hold NUL characters
+    if len(text) > 200 or "\x00" in text:
+        return _INVALID
+    return text or None
+
+def _limit(value):
+    # Unlike the other parameters an empty limit is invalid, isdigit() alone accepts digits such as "²"
+    if not (value.isascii() and value.isdigit()) or int(value) < 1:
+        return _INVALID
+    return min(int(value), settings.TASKS_MAX_PAGE_SIZE)
+
+def _cursor(value):
+    # Decoded once the sort is known
+    return value or None
+
+_FILTER_PARSERS = {
+    "status": _choice(TASK_STATUSES),
+    "priority": _choice(TASK_PRIORITIES),
+    "category": _choice(TASK_CATEGORIES),
+    "due_after": _deadline,
+    "due_before": _deadline,
+    "overdue": _overdue,
+    # Content negotiation parameter of the browsable API
+    api_settings.URL_FORMAT_OVERRIDE: lambda value: None,
+}
+
+_QUERY_PARSERS = {
+    **_FILTER_PARSERS,
+    "q": _search,
+    "sort": _choice(TASK_SORTS),
+    "limit": _limit,
+    "cursor": _cursor,
+}
+
+# Lookup of each filter, the deadline bounds are inclusive after and exclusive before
+_FILTER_LOOKUPS = (
+    ("status", "status"),
+    ("priority", "priority"),
+    ("category", "category"),
+    ("due_after", "deadline__gte"),
+    ("due_before", "deadline__lt"),
+)
@@ -0,0 +1,88 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.utils.timezone import now
+from api.models import User
+from api.utils.cache import shared
+
+# Task collection versions
+#
+# Every task write bumps the owner's tasks_version in the same transaction. When
+# TASKS_CACHE is shared by every process the version is then cached, so conditional
+# requests are answered without a query. A per-process cache would keep the version
+# of the other processes' writes stale, the version is then read from the database.
+# Writers bump before writing: the lock on the owner's row orders the writes of a
+# user, so the versions stamped on tasks and tombstones commit in increasing order.
+
+def bump(user_id):
+    """
+    Increment the version of a user's task collection.
+
+    Args:
+        user_id (int): ID of the owner of the written tasks.
+
+    Returns:
+        int: New version, the user row stays locked until the transaction ends.
+    """
+    modified = now()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {User._meta.db_table} SET tasks_version = tasks_version + 1, tasks_modified = %s "
+            "WHERE id = %s RETURNING tasks_version",
+            [modified, user_id],
+        )
+        version = cursor.fetchone()[0]
+
+    # Readers fall back to the database until the new version is committed and cached
+    if _shared():
+        cache = _cache()
+        cache.delete(_key(user_id))
+        transaction.on_commit(lambda: cache.set(_key(user_id), (version, modified)))
+    return version
+
+def current(user_id):
+    """
+    Read the version of a user's task collection, from the cache when possible.
+
+    Args:
+        user_id (int): ID of the owner of the tasks.
+
+    Returns:
+        tuple: Version and date of the last task write, which is None before the first write.
+    """
+    if not _shared():
+        return _read(user_id).first() or (0, None)
+    cache = _cache()
+    value = cache.get(_key(user_id))
+    if value is None:
+        value = _read(user_id).first() or (0, None)
+        cache.add(_key(user_id), value)
+    return value
+
+async def acurrent(user_id):
+    # Async variant of current()
+    if not _shared():
+        return await _read(user_id).afirst() or (0, None)
+    cache = _cache()
+    value = await cache.aget(_key(user_id))
+    if value is None:
+        value = await _read(user_id).afirst() or (0, None)
+        await cache.aadd(_key(user_id), value)
+    return value
+
+def forget(user_id):
+    _cache().delete(_key(user_id))
+
+# Private helpers
+
+def _cache():
+    return caches[settings.TASKS_CACHE]
+
+def _shared():
+    return shared(settings.TASKS_CACHE)
+
+def _read(user_id):
+    return User.objects.filter(id=user_id).values_list("tasks_version", "tasks_modified")
+
+def _key(user_id):
+    return f"tasks:version:{user_id}"
@@ -1,10 +1,11 @@
 from enum import Enum
+from django.http import HttpResponse
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.generics import get_object_or_404
-from .models import User, Task
+from .models import CachedBearerTokenAuthentication, User, Task
 from .services import user_service, task_service
-from .utils import respond
+from .utils import metrics, pages, respond
 
 @api_view(["GET"])
 def endpoints(request):
@@ -22,14 +23,34 @@ def endpoints(request):
         "Task Endpoints": {
             "Creation of tasks": "POST /tasks",
             "Listing of tasks": "GET /tasks",
+            "Batch of task operations": "POST /tasks/batch",
+            "Task counts": "GET /tasks/stats",
+            "Changes since the last sync": "GET /tasks/sync",
+            "Export of tasks as NDJSON": "GET /tasks/export/ndjson",
+            "Export of tasks as CSV": "GET /tasks/export/csv",
             "Retrieval of a task": "GET /task/{id}",
             "Update of a task": "PUT /task/{id}",
             "Deletion of a task": "PUT /task/{id}",
             "Mark task as completed": "PUT /task/{id}/complete",
             "Mark task as pending": "PUT /task/{id}/pending",
+            "Storage of an occurrence of a recurring task": "POST /task/{id}/occurrences",
         }
     })
 
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def request_metrics(request):
+    """
+    Export the per-route request metrics and cache hit counters in the Prometheus text format.
+    """
+    auth = CachedBearerTokenAuthentication.stats()
+    caches = {
+        # Tokens found in the in-process or the shared cache, misses are database lookups
+        "token_auth": {"hits": auth["hits"] + auth["shared_hits"], "misses": auth["misses"]},
+        "tasks_pages": pages.stats(),
+    }
+    return HttpResponse(metrics.registry.export() + metrics.export_caches(caches), content_type=metrics.CONTENT_TYPE)
+
 @api_view(["POST"])
 def authentication(request, param=None):
     """
@@ -66,7 +87,7 @@ def user_details(request):
     match request.method:
         case "GET":
             # Return the user details
-            return user_service.get_user(user)
+            return user_service.get_user(request, user)
         case "PUT":
             # Update the user details
             return user_service.update_user(user, request.data)
@@ -87,37 +108,92 @@ def tasks_list(request):
         # List all tasks
         return task_service.get_tasks(request)
 
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def tasks_batch(request):
+    """
+    Handle a batch of task creations, updates, status changes and deletions.
+    """
+    return task_service.apply_tasks_batch(request)
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def tasks_stats(request):
+    """
+    Handle task counts retrieval.
+    """
+    return task_service.get_task_stats(request)
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def tasks_sync(request):
+    """
+    Handle delta syncs of tasks.
+    """
+    return task_service.sync_tasks(request)
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def tasks_export(request, param=None):
+    """
+    Handle streamed exports of tasks.
+    """
+
+    class Param(Enum):
+        NDJSON = "ndjson"
+        CSV = "csv"
+
+    _param = Param(param) if param in Param._value2member_map_ else None
+
+    match _param:
+        case Param.NDJSON | Param.CSV:
+            # Stream the tasks in the requested format
+            return task_service.export_tasks(request, _param.value)
+        case _:
+            # Invalid param
+            return respond.bad_request("Invalid param")
+
 @api_view(["GET", "PUT", "DELETE"])
 @permission_classes([IsAuthenticated])
 def task_details(request, id, param=None):
     """
     Handle task retrieval, update, and deletion.
     """
+    if request.method == "GET":
+        # Return the task details, only the serialized columns are read
+        return task_service.get_task(request, id)
+
+    if request.method == "PUT":
+
+        class Param(Enum):
+            COMPLETE = "complete"
+            PENDING = "pending"
+
+        _param = Param(param) if param in Param._value2member_map_ else None
+
+        match _param:
+            case Param.COMPLETE:
+                # Update the task status to completed
+                return task_service.update_task_status(request, id, Task.Status.COMPLETED)
+            case Param.PENDING:
+                # Update the task status to pending
+                return task_service.update_task_status(request, id, Task.Status.PENDING)
+
     # Ensure task belongs to the authenticated user
     task = get_object_or_404(Task, id=id, owner=request.user)
 
     match request.method:
-        case "GET":
-            # Return the task details
-            return task_service.get_task(task)
         case "DELETE":
             # Delete the task
             return task_service.delete_task(task)
         case "PUT":
-            
-            class Param(Enum):
-                COMPLETE = "complete"
-                PENDING = "pending"
-
-            _param = Param(param) if param in Param._value2member_map_ else None
-
-            match _param:
-                case Param.COMPLETE:
-                    # Update the task status to completed
-                    return task_service.update_task_status(task, Task.Status.COMPLETED)
-                case Param.PENDING:
-                    # Update the task status to pending
-                    return task_service.update_task_status(task, Task.Status.PENDING)
-                case _:
-                    # Update the task
-                    return task_service.update_task(task, request.data)
+            # Update the task
+            return task_service.update_task(task, request.data)
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def task_occurrences(request, id):
+    """
+    Handle the storage of an occurrence of a recurring task, to complete or edit it.
+    """
+    return task_service.create_occurrence(request, id)
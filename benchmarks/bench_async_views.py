@@ -0,0 +1,56 @@
+import asyncio
+from time import perf_counter
+from django.test import AsyncClient, TransactionTestCase
+from rest_framework.authtoken.models import Token
+from api.models import CachedBearerTokenAuthentication, Task, User
+from benchmarks.utils import report_latency
+
+class AsyncViewsBenchmark(TransactionTestCase):
+    '''
+    Compare the sync and async task endpoints under concurrent load, through the ASGI handler
+    '''
+
+    USERS = 20
+    TASKS = 200
+    CONCURRENCY = 50
+    REQUESTS = 2000
+
+    def setUp(self):
+        CachedBearerTokenAuthentication.clear()
+        self.tokens, self.tasks = [], []
+        for i in range(self.USERS):
+            user = User.objects.create_user(username='user-{}'.format(i), email='user-{}@example.com'.format(i), password='newpass123')
+            self.tokens.append(Token.objects.create(user=user).key)
+            self.tasks.append(Task.objects.bulk_create([Task(title='task-{}'.format(n), owner=user) for n in range(self.TASKS)]))
+
+    async def load(self, path):
+        # Each worker sends REQUESTS / CONCURRENCY requests, one at a time, as one of the users
+        client = AsyncClient()
+        latencies = []
+
+        async def worker(number):
+            index = number % self.USERS
+            headers = {'Authorization': 'Bearer ' + self.tokens[index]}
+            for request in range(self.REQUESTS // self.CONCURRENCY):
+                url = path(index, request)
+                start = perf_counter()
+                res = await client.get(url, headers=headers)
+                latencies.append(perf_counter() - start)
+                assert res.status_code == 200, res.status_code
+
+        start = perf_counter()
+        await asyncio.gather(*[worker(number) for number in range(self.CONCURRENCY)])
+        return latencies, perf_counter() - start
+
+    async def compare(self, name, path):
+        for prefix in ['/api', '/api/async']:
+            # Warm up caches and connections
+            await self.load(lambda index, request: prefix + path(index, request))
+            latencies, seconds = await self.load(lambda index, request: prefix + path(index, request))
+            report_latency('{} {}'.format(name, 'async' if prefix.endswith('async') else 'sync'), latencies, seconds)
+
+    async def test_task_details(self):
+        await self.compare('GET /task/<id>', lambda index, request: '/task/{}'.format(self.tasks[index][request % self.TASKS].id))
+
+    async def test_tasks_list(self):
+        await self.compare('GET /tasks', lambda index, request: '/tasks?limit={}'.format(1 + request % 50))
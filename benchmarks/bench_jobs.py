@@ -0,0 +1,41 @@
+from io import StringIO
+from time import sleep
+from django.core.management import call_command
+from django.test import TransactionTestCase
+from api.models import Job
+from api.utils import jobs
+from benchmarks.utils import report, timed
+
+@jobs.register('bench.noop')
+def noop(number):
+    pass
+
+@jobs.register('bench.io')
+def io(number):
+    # Waits like a job calling another service or running a long query
+    sleep(0.005)
+
+class JobQueueBenchmark(TransactionTestCase):
+    '''
+    Measure the job queue throughput with several run_jobs workers claiming jobs at the same time
+    '''
+
+    JOBS = 2000
+    WORKERS = [1, 2, 4, 8]
+
+    def drain(self, name):
+        for workers in self.WORKERS:
+            Job.objects.bulk_create([Job(name=name, args=[n]) for n in range(self.JOBS)])
+            _, seconds = timed(call_command, 'run_jobs', workers=workers, once=True, stdout=StringIO())
+            self.assertFalse(Job.objects.exists())
+            report('{} jobs, {} workers'.format(name, workers), self.JOBS, seconds)
+
+    def test_enqueue(self):
+        _, seconds = timed(lambda: [jobs.enqueue('bench.noop', n) for n in range(self.JOBS)])
+        report('enqueue', self.JOBS, seconds)
+
+    def test_noop(self):
+        self.drain('bench.noop')
+
+    def test_io(self):
+        self.drain('bench.io')
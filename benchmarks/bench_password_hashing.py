@@ -0,0 +1,68 @@
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter, sleep
+from django.db import connections
+from django.test import TransactionTestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from api.models import Task, User
+from api.utils import hashing
+from benchmarks.utils import report, report_latency
+
+class PasswordHashingBenchmark(TransactionTestCase):
+    '''
+    Login throughput and task latency during a burst of logins, with and without a bound on hashing
+    '''
+
+    LOGIN_THREADS = 16
+    TASK_THREADS = 4
+    SECONDS = 5
+    BACKOFF = 0.1
+
+    def setUp(self):
+        hashing.reset()
+        self.addCleanup(hashing.reset)
+        self.credentials = {'username': 'john-doe', 'password': 'newpass123'}
+        user = User.objects.create_user(email='john-doe@example.com', **self.credentials)
+        self.token = Token.objects.create(user=user).key
+        self.task = Task.objects.create(title='task', owner=user)
+
+    def login(self, deadline):
+        client, codes = APIClient(), []
+        while perf_counter() < deadline:
+            res = client.post('/api/user/login', self.credentials)
+            codes.append(res.status_code)
+            if res.status_code == 503:
+                # Rejected clients back off before retrying
+                sleep(self.BACKOFF)
+        connections.close_all()
+        return codes
+
+    def read_task(self, deadline):
+        client, latencies = APIClient(), []
+        client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token)
+        while perf_counter() < deadline:
+            start = perf_counter()
+            client.get('/api/task/{}'.format(self.task.id))
+            latencies.append(perf_counter() - start)
+        connections.close_all()
+        return latencies
+
+    def burst(self, name):
+        deadline = perf_counter() + self.SECONDS
+        with ThreadPoolExecutor(self.LOGIN_THREADS + self.TASK_THREADS) as executor:
+            logins = [executor.submit(self.login, deadline) for _ in range(self.LOGIN_THREADS)]
+            reads = [executor.submit(self.read_task, deadline) for _ in range(self.TASK_THREADS)]
+            codes = sum((future.result() for future in logins), [])
+            latencies = sum((future.result() for future in reads), [])
+
+        report('{}, successful logins'.format(name), codes.count(200), self.SECONDS)
+        report('{}, rejected logins'.format(name), codes.count(503), self.SECONDS)
+        report_latency('{}, GET /task/<id>'.format(name), latencies, self.SECONDS)
+
+    @override_settings(PASSWORD_HASHING={'WORKERS': 64, 'MAX_PENDING': 10000})
+    def test_unbounded(self):
+        self.burst('unbounded hashing')
+
+    @override_settings(PASSWORD_HASHING={'WORKERS': 2, 'MAX_PENDING': 4})
+    def test_bounded(self):
+        self.burst('bounded hashing')
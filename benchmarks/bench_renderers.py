@@ -0,0 +1,40 @@
+from datetime import timedelta
+from django.test import TestCase
+from django.utils.timezone import now
+from api.models import Task, User
+from api.renderers import FastJSONRenderer, JSONRenderer, orjson
+from api.serializers import TaskReadSerializer
+from benchmarks.utils import report, timed
+
+class RendererBenchmark(TestCase):
+    '''
+    Compare the stdlib JSON renderer with the orjson one on lists of 10k tasks
+    '''
+
+    ROWS = 10000
+    RENDERS = 20
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='john-doe', email='john-doe@example.com', password='newpass123')
+        deadline = now() + timedelta(days=1)
+        Task.objects.bulk_create([
+            Task(title='task-{} ünïcode'.format(i), description='description of the task', deadline=deadline, owner=cls.user)
+            for i in range(cls.ROWS)
+        ])
+
+    def test_render(self):
+        payload = {'results': TaskReadSerializer.many(TaskReadSerializer.values(Task.objects.filter(owner=self.user))), 'next': None}
+        seconds = {}
+        for renderer in [JSONRenderer(), FastJSONRenderer()]:
+            name = type(renderer).__name__
+            content = renderer.render(payload)
+
+            def run():
+                for _ in range(self.RENDERS):
+                    renderer.render(payload)
+
+            _, seconds[name] = timed(run)
+            report('{}, {} tasks{}'.format(name, self.ROWS, '' if orjson or name == 'JSONRenderer' else ' (no orjson)'), self.RENDERS * self.ROWS, seconds[name])
+            print(f" {len(content) / 2 ** 20:.1f} MB", end="")
+        print(f"\nspeedup x{seconds['JSONRenderer'] / seconds['FastJSONRenderer']:.1f}", end="")
@@ -0,0 +1,54 @@
+from datetime import timedelta
+from django.test import TestCase
+from django.utils.timezone import now
+from api.models import Task, User
+from api.serializers import TaskReadSerializer, TaskSerializer
+from benchmarks.utils import report, timed
+
+class TaskSerializerBenchmark(TestCase):
+    '''
+    Compare TaskSerializer with the TaskReadSerializer fast path on 10k rows
+    '''
+
+    ROWS = 10000
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='john-doe', email='john-doe@example.com', password='newpass123')
+        deadline = now() + timedelta(days=1)
+        Task.objects.bulk_create([
+            Task(title='task-{}'.format(i), description='description', deadline=deadline, owner=cls.user)
+            for i in range(cls.ROWS)
+        ])
+
+    def test_serialization(self):
+        tasks = list(Task.objects.filter(owner=self.user))
+        rows = list(TaskReadSerializer.values(Task.objects.filter(owner=self.user)))
+
+        _, seconds = timed(lambda: TaskSerializer(tasks, many=True).data)
+        report('TaskSerializer, serialization only', self.ROWS, seconds)
+        _, fast = timed(TaskReadSerializer.many, rows)
+        report('TaskReadSerializer, serialization only', self.ROWS, fast)
+        print(f"\nspeedup x{seconds / fast:.1f}", end="")
+
+    def test_query_and_serialization(self):
+        queryset = Task.objects.filter(owner=self.user)
+
+        _, seconds = timed(lambda: TaskSerializer(queryset.all(), many=True).data)
+        report('TaskSerializer, with query', self.ROWS, seconds)
+        _, fast = timed(lambda: TaskReadSerializer.many(TaskReadSerializer.values(queryset.all())))
+        report('TaskReadSerializer, with values() query', self.ROWS, fast)
+        print(f"\nspeedup x{seconds / fast:.1f}", end="")
+
+    def test_validation(self):
+        payloads = [
+            {'title': 'task-{}'.format(i), 'description': 'description', 'priority': 'HIGH', 'category': 'WORK', 'deadline': '2020-01-01T00:00:00Z'}
+            for i in range(self.ROWS)
+        ]
+
+        def validate():
+            for payload in payloads:
+                assert TaskSerializer(data=payload).is_valid()
+
+        _, seconds = timed(validate)
+        report('TaskSerializer, validation', self.ROWS, seconds)
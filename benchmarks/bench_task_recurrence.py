@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta, timezone
+from django.conf import settings
+from django.core.cache import caches
+from django.test import TestCase
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from api.models import Task, User
+from api.services import task_service
+from api.utils import recurrence
+from benchmarks.utils import report, timed
+
+class TaskRecurrenceBenchmark(TestCase):
+    '''
+    Expansion of recurrence rules, and lists of recurring tasks expanded lazily or stored as one row per occurrence
+    '''
+
+    RULES = ['FREQ=DAILY', 'FREQ=WEEKLY;BYDAY=MO,WE,FR', 'FREQ=MONTHLY;BYMONTHDAY=1,15,-1']
+    SERIES = 100
+    TASKS = 1000
+    EXPANSIONS = 100
+    PAGES = 100
+    START = datetime(2024, 1, 1, 9, tzinfo=timezone.utc)
+    YEARS = [1, 5, 10]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.lazy = User.objects.create_user(username='lazy', email='lazy@example.com', password='newpass123')
+        cls.stored = User.objects.create_user(username='stored', email='stored@example.com', password='newpass123')
+        for user in [cls.lazy, cls.stored]:
+            Task.objects.bulk_create([
+                Task(title='task {}'.format(n), deadline=cls.START + timedelta(hours=7 * n), owner=user) for n in range(cls.TASKS)
+            ])
+
+        # The same occurrences over a year, expanded at list time or stored as rows
+        end = cls.START + timedelta(days=365)
+        series = Task.objects.bulk_create([
+            Task(title='series {}'.format(n), deadline=cls.START + timedelta(minutes=n), recurrence=cls.RULES[n % len(cls.RULES)], owner=cls.lazy)
+            for n in range(cls.SERIES)
+        ])
+        Task.objects.bulk_create([
+            Task(title=task.title, deadline=occurrence, owner=cls.stored)
+            for task in series
+            for occurrence in recurrence.parse(task.recurrence).occurrences(task.deadline, cls.START, end)
+        ], batch_size=5000)
+
+    def test_expand(self):
+        for rule in self.RULES:
+            parsed = recurrence.parse(rule)
+            for years in self.YEARS:
+                # Windows start 2 years after the series, skipped without generating them
+                after = self.START + timedelta(days=730)
+                before = after + timedelta(days=365 * years)
+                occurrences, seconds = timed(lambda: [len(list(parsed.occurrences(self.START, after, before))) for _ in range(self.EXPANSIONS)])
+                report('expand {}, {} years'.format(rule, years), sum(occurrences), seconds)
+
+    def test_get_tasks(self):
+        print('\nrows: lazy {}, stored {}'.format(Task.objects.filter(owner=self.lazy).count(), Task.objects.filter(owner=self.stored).count()), end='')
+        factory = APIRequestFactory()
+        for years in [1, 5]:
+            window = {'due_after': self.START.isoformat(), 'due_before': (self.START + timedelta(days=365 * years)).isoformat()}
+            for sort in ['deadline', '-deadline', 'title']:
+                for user in [self.lazy, self.stored]:
+                    request = Request(factory.get('/api/tasks', {**window, 'sort': sort}))
+                    request.user = user
+
+                    def run():
+                        for _ in range(self.PAGES):
+                            # Every page is computed, not read from the page cache
+                            caches[settings.TASKS_CACHE].clear()
+                            assert task_service.get_tasks(request).status_code == 200
+
+                    _, seconds = timed(run)
+                    report('get_tasks, {} years, sort {}, {}'.format(years, sort, user.username), self.PAGES, seconds)
@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.test import APITestCase
+from rest_framework.authtoken.models import Token
+from api.models import User
+from benchmarks.data import generate
+from benchmarks.utils import report_percentiles, timed
+
+class TaskSearchBenchmark(APITestCase):
+    '''
+    Measure GET /tasks?q= latency on a million tasks
+    '''
+
+    USERS = 1000
+    TASKS_PER_USER = 1000
+    REQUESTS = 200
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.get(id=generate(cls.USERS, cls.TASKS_PER_USER)[0])
+        cls.token = Token.objects.create(user=cls.user)
+
+    def setUp(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token.key)
+
+    def search(self, params):
+        # The page cache is emptied so every request runs its query
+        caches[settings.TASKS_CACHE].clear()
+        res = self.client.get('/api/tasks', {**params, 'limit': 20})
+        self.assertEqual(res.status_code, 200)
+
+    def measure(self, name, params):
+        report_percentiles(name, [timed(self.search, params)[1] for _ in range(self.REQUESTS)])
+
+    def test_search(self):
+        self.search({'q': 'warm up'})
+        self.measure('ranked, one word', {'q': 'quarterly'})
+        self.measure('ranked, prefix', {'q': 'dash'})
+        self.measure('ranked, two words', {'q': 'budget invoice'})
+        self.measure('ranked, sorted by title', {'q': 'release roadmap', 'sort': 'title'})
+        self.measure('short, substring', {'q': 'bug'})
@@ -0,0 +1,44 @@
+from rest_framework.test import APITestCase
+from rest_framework.authtoken.models import Token
+from api.models import Task, User
+from benchmarks.utils import report, timed
+
+class TasksBatchBenchmark(APITestCase):
+    '''
+    Compare POST /tasks/batch with one request per operation
+    '''
+
+    OPERATIONS = 10000
+    SINGLE_REQUESTS = 1000
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='john-doe', email='john-doe@example.com', password='newpass123')
+        self.token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + self.token.key)
+
+    def post_each(self, count):
+        for i in range(count):
+            self.client.post('/api/tasks', {'title': 'task-{}'.format(i), 'priority': 'HIGH'}, format='json')
+
+    def post_batch(self, operations):
+        res = self.client.post('/api/tasks/batch', operations, format='json')
+        self.assertEqual(res.status_code, 200)
+
+    def test_create(self):
+        _, seconds = timed(self.post_each, self.SINGLE_REQUESTS)
+        report('create, one request per task', self.SINGLE_REQUESTS, seconds)
+
+        operations = [{'op': 'create', 'data': {'title': 'task-{}'.format(i), 'priority': 'HIGH'}} for i in range(self.OPERATIONS)]
+        _, seconds = timed(self.post_batch, operations)
+        report('create, batch', self.OPERATIONS, seconds)
+
+    def test_mixed(self):
+        tasks = Task.objects.bulk_create([Task(title='task-{}'.format(i), owner=self.user) for i in range(self.OPERATIONS)])
+        kinds = [
+            lambda task: {'op': 'update', 'id': task.id, 'data': {'title': 'updated', 'category': 'WORK'}},
+            lambda task: {'op': 'complete', 'id': task.id},
+            lambda task: {'op': 'delete', 'id': task.id},
+        ]
+        operations = [kinds[i % 3](task) for i, task in enumerate(tasks)]
+        _, seconds = timed(self.post_batch, operations)
+        report('update/complete/delete, batch', self.OPERATIONS, seconds)
@@ -0,0 +1,95 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.http import QueryDict
+from django.test import TestCase
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from api.models import User
+from api.services import task_service
+from api.utils import validate
+from benchmarks.data import generate
+from benchmarks.utils import report, timed
+
+class TasksQueryBenchmark(TestCase):
+    '''
+    Microbenchmarks of the tasks list: query validation and get_tasks, on 100 users x 1000 tasks
+    '''
+
+    USERS = 100
+    TASKS_PER_USER = 1000
+    VALIDATIONS = 100000
+    PAGES = 500
+
+    QUERIES = {
+        'default': {},
+        'filters': {'status': 'PENDING', 'priority': 'HIGH', 'category': 'WORK'},
+        'deadline range': {'due_after': '2026-01-01T00:00:00Z', 'due_before': '2027-01-01T00:00:00Z', 'sort': '-deadline'},
+        'overdue': {'overdue': 'true', 'sort': 'priority', 'limit': '20'},
+        'search': {'q': 'quarterly report'},
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.get(id=generate(cls.USERS, cls.TASKS_PER_USER)[0])
+
+    # Every parameter of each query is invalid or unknown
+    INVALID_QUERIES = {
+        'invalid filters': {'status': 'DONE', 'priority': 'URGENT', 'category': 'HOME'},
+        'invalid page': {'sort': 'owner', 'limit': '0', 'page': '2'},
+    }
+
+    def query_dicts(self, queries=None):
+        dicts = []
+        for params in (queries or self.QUERIES).values():
+            query = QueryDict(mutable=True)
+            query.update(params)
+            dicts.append(query)
+        return dicts
+
+    def test_validate_filters(self):
+        queries = self.query_dicts()
+
+        def run():
+            for i in range(self.VALIDATIONS):
+                validate.tasks_query_filters(queries[i % len(queries)])
+
+        _, seconds = timed(run)
+        report('validate.tasks_query_filters', self.VALIDATIONS, seconds)
+
+    def test_validate_query(self):
+        queries = self.query_dicts()
+
+        def run():
+            for i in range(self.VALIDATIONS):
+                validate.tasks_query(queries[i % len(queries)])
+
+        _, seconds = timed(run)
+        report('validate.tasks_query', self.VALIDATIONS, seconds)
+
+    def test_validate_query_errors(self):
+        queries = self.query_dicts(self.INVALID_QUERIES)
+
+        def run():
+            for i in range(self.VALIDATIONS):
+                assert validate.tasks_query(queries[i % len(queries)])[1]
+
+        _, seconds = timed(run)
+        report('validate.tasks_query, every error', self.VALIDATIONS, seconds)
+
+    def test_get_tasks(self):
+        factory = APIRequestFactory()
+        for name, params in self.QUERIES.items():
+            requests = []
+            for _ in range(self.PAGES):
+                request = Request(factory.get('/api/tasks', params))
+                request.user = self.user
+                requests.append(request)
+
+            def run():
+                for request in requests:
+                    # Every page is computed, not read from the page cache
+                    caches[settings.TASKS_CACHE].clear()
+                    assert task_service.get_tasks(request).status_code == 200
+
+            _, seconds = timed(run)
+            report('get_tasks, {}'.format(name), self.PAGES, seconds)
@@ -0,0 +1,40 @@
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework.authtoken.models import Token
+from api.models import Task, User
+from api.utils import accounts
+from benchmarks.data import generate
+from benchmarks.utils import report_memory, traced
+
+class UserDeletionBenchmark(TestCase):
+    '''
+    Compare the wall time and peak Python memory of account deletions of 100k tasks
+    '''
+
+    TASKS = 100000
+
+    def setUp(self):
+        self.user = User.objects.get(id=generate(1, self.TASKS)[0])
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + Token.objects.create(user=self.user).key)
+
+    def test_cascade(self):
+        # Previous path, a single cascading delete
+        _, seconds, peak = traced(self.user.delete)
+        report_memory('User.delete() cascade', self.TASKS, seconds, peak)
+        self.assertFalse(Task.objects.exists())
+
+    def test_batched(self):
+        res, seconds, peak = traced(self.client.delete, '/api/user')
+        self.assertEqual(res.status_code, 204)
+        report_memory('DELETE /user, batched', self.TASKS, seconds, peak)
+        self.assertFalse(Task.objects.exists())
+
+    @override_settings(USER_DELETION={'MODE': 'deferred', 'BATCH_SIZE': 5000})
+    def test_deferred(self):
+        res, seconds, peak = traced(self.client.delete, '/api/user')
+        self.assertEqual(res.status_code, 204)
+        report_memory('DELETE /user, deferred', self.TASKS, seconds, peak)
+        _, seconds, peak = traced(accounts.purge, self.user.id)
+        report_memory('purge of the deferred deletion', self.TASKS, seconds, peak)
+        self.assertFalse(Task.objects.exists())
@@ -0,0 +1,59 @@
+import argparse
+import json
+
+# Comparison of two benchmark runs
+#
+#     python -m benchmarks.compare before.json after.json
+# prints the throughput and latency of every result of both runs, with the change.
+
+MEASURES = [("ops_per_second", "ops/s", True), ("p50_ms", "p50 ms", False), ("p99_ms", "p99 ms", False), ("queries_per_request", "queries", False)]
+
+def compare(before, after):
+    """
+    Pair the results of two runs by name.
+
+    Args:
+        before (dict): Saved results of the reference run.
+        after (dict): Saved results of the new run.
+
+    Returns:
+        list: (name, measure, before, after, change) rows, change is the ratio after / before
+        of throughputs and before / after of latencies and query counts, so above 1 is better.
+    """
+    previous = {result["name"]: result for result in before["results"]}
+    rows = []
+    for result in after["results"]:
+        reference = previous.get(result["name"])
+        if reference is None:
+            continue
+        for measure, label, higher_is_better in MEASURES:
+            old, new = reference.get(measure), result.get(measure)
+            if old is None or new is None:
+                continue
+            if old == new:
+                change = 1.0
+            elif not old or not new:
+                change = None
+            else:
+                change = new / old if higher_is_better else old / new
+            rows.append((result["name"], label, old, new, change))
+    return rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two saved benchmark runs.")
+    parser.add_argument("before", help="Results of the reference run.")
+    parser.add_argument("after", help="Results of the new run.")
+    options = parser.parse_args(argv)
+
+    with open(options.before) as file:
+        before = json.load(file)
+    with open(options.after) as file:
+        after = json.load(file)
+
+    print(f"{before.get('commit')} -> {after.get('commit')}")
+    for name, label, old, new, change in compare(before, after):
+        ratio = "-" if change is None else f"x{change:.2f}"
+        print(f"{name:<48} {label:<8} {old:12.2f} {new:12.2f} {ratio:>8}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from api.models import Task, TaskCounter, User
+
+# Benchmark data
+#
+# Users and tasks are generated in SQL, a million tasks take seconds instead of the
+# minutes of bulk_create. Task n of a user cycles through every priority, status and
+# category combination, one in ten has no deadline and the others are spread from
+# 100 hours in the past to 900 hours ahead. Titles and descriptions are drawn from a
+# small vocabulary so that every search matches.
+
+TITLE_VERBS = ["Write", "Review", "Fix", "Plan", "Call"]
+TITLE_SUBJECTS = ["quarterly", "weekly", "team", "customer", "budget", "release"]
+TITLE_NOUNS = ["report", "meeting", "dashboard", "invoice", "roadmap", "bug", "notes"]
+PLACES = ["office", "garden", "server", "website"]
+
+def generate(users, tasks_per_user, prefix="user", password=None):
+    """
+    Insert users with their tasks and task counters.
+
+    Args:
+        users (int): Number of users.
+        tasks_per_user (int): Number of tasks of each user.
+        prefix (str): Prefix of the usernames, "<prefix>-<n>".
+        password (str): Password of every user, or None for unusable passwords.
+
+    Returns:
+        list: IDs of the created users.
+    """
+    user_table = connection.ops.quote_name(User._meta.db_table)
+    task_table = connection.ops.quote_name(Task._meta.db_table)
+    counter_table = connection.ops.quote_name(TaskCounter._meta.db_table)
+    # Hashed once, every user shares the hash
+    password = make_password(password)
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'''
+            INSERT INTO {user_table} (password, is_superuser, username, first_name, last_name, email, is_staff, is_active, date_joined, updated_at, tasks_version, tasks_compacted)
+            SELECT %s, false, %s || '-' || n, '', '', %s || '-' || n || '@example.com', false, true, now(), now(), 1, 0
+            FROM generate_series(1, %s) AS n
+            RETURNING id
+        ''', [password, prefix, prefix, users])
+        user_ids = sorted(row[0] for row in cursor.fetchall())
+
+        cursor.execute(f'''
+            INSERT INTO {task_table} (title, description, deadline, completion_date, priority, status, category, owner_id, updated_at, version)
+            SELECT
+                (%s::text[])[n %% 5 + 1] || ' ' || (%s::text[])[n %% 6 + 1] || ' ' || (%s::text[])[n %% 7 + 1],
+                CASE WHEN n %% 4 = 0 THEN NULL ELSE 'notes about ' || md5(n::text) || ' and the ' || (%s::text[])[n %% 4 + 1] END,
+                CASE WHEN n %% 10 = 0 THEN NULL ELSE now() + (n %% 1000 - 100) * interval '1 hour' END,
+                CASE WHEN n / 3 %% 2 = 1 THEN now() END,
+                (ARRAY['LOW', 'MEDIUM', 'HIGH'])[n %% 3 + 1],
+                (ARRAY['PENDING', 'COMPLETED'])[n / 3 %% 2 + 1],
+                (ARRAY['WORK', 'PERSONAL', 'UNCATEGORIZED'])[n / 6 %% 3 + 1],
+                u.id,
+                now(),
+                1
+            FROM unnest(%s::bigint[]) AS u(id), generate_series(1, %s) AS n
+        ''', [TITLE_VERBS, TITLE_SUBJECTS, TITLE_NOUNS, PLACES, user_ids, tasks_per_user])
+
+        cursor.execute(f'''
+            INSERT INTO {counter_table} (owner_id, status, category, priority, count)
+            SELECT owner_id, status, category, priority, COUNT(*)
+            FROM {task_table} WHERE owner_id = ANY(%s)
+            GROUP BY owner_id, status, category, priority
+        ''', [user_ids])
+        cursor.execute(f"ANALYZE {user_table}")
+        cursor.execute(f"ANALYZE {task_table}")
+
+    return user_ids
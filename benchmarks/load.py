@@ -0,0 +1,284 @@
+import argparse
+import http.client
+import json
+import re
+import sys
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from time import perf_counter
+from urllib.parse import urlencode, urlsplit
+from benchmarks.utils import report_latency, results, save_results
+
+# HTTP load driver
+#
+# Sends concurrent requests to every route of api/urls.py on a running server, e.g.
+#     INSTRUMENTATION=true INSTRUMENTATION_SERVER_TIMING=true \
+#         python manage.py runserver --noreload
+#     python -m benchmarks.load --url http://127.0.0.1:8000/api --output load.json
+# and reports the throughput, p50 and p99 latency and SQL queries per request of each
+# route. Query counts are read from the Server-Timing header of the instrumentation
+# middleware, which is only sent to the load users with the settings above. The driver
+# registers its own users and tasks through the API, so it runs against any database
+# the server is configured with.
+
+PASSWORD = "load-test-password"
+_QUERIES = re.compile(r'desc="(\d+) queries"')
+
+class Client:
+    '''
+    Minimal JSON HTTP client, one connection per request
+    '''
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self.netloc = parts.netloc
+        self.prefix = parts.path.rstrip("/")
+
+    def request(self, method, path, token=None, body=None, params=None):
+        """
+        Send a request.
+
+        Args:
+            method (str): HTTP method.
+            path (str): Path under the API URL.
+            token (str): Bearer token, or None.
+            body (object): JSON body, or None.
+            params (dict): Query parameters, or None.
+
+        Returns:
+            tuple: Status code, decoded JSON body (None when not JSON) and SQL queries run by the server (None when unknown).
+        """
+        headers = {"Accept": "application/json"}
+        if token:
+            headers["Authorization"] = "Bearer " + token
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+        url = self.prefix + path + ("?" + urlencode(params) if params else "")
+
+        connection = self.connection_class(self.netloc, timeout=60)
+        try:
+            connection.request(method, url, body=payload, headers=headers)
+            response = connection.getresponse()
+            content = response.read()
+            queries = _QUERIES.search(response.getheader("Server-Timing") or "")
+        finally:
+            connection.close()
+
+        data = None
+        if content and (response.getheader("Content-Type") or "").startswith("application/json"):
+            data = json.loads(content)
+        return response.status, data, int(queries.group(1)) if queries else None
+
+
+class Scenario:
+    '''
+    Requests of one route, built from the number of the request
+    '''
+    def __init__(self, name, build, expected=(200,), requests=None, prepare=None):
+        self.name = name
+        self.build = build
+        self.expected = expected
+        # Routes consuming setup data (e.g. deletions) send at most that many requests
+        self.requests = requests
+        # Called with the client before the requests are sent, returns their maximum number
+        self.prepare = prepare
+
+
+def setup(client, users, tasks, run):
+    """
+    Register users, log them in and create their tasks through the API.
+
+    Args:
+        client (Client): Client of the API.
+        users (int): Number of users.
+        tasks (int): Number of tasks per user.
+        run (str): Unique name of the run, part of the usernames.
+
+    Returns:
+        list: One dict per user with its username, token, task IDs and sync token.
+    """
+    accounts = []
+    for number in range(users):
+        username = f"load-{run}-{number}"
+        status, _, _ = client.request("POST", "/user/register", body={"username": username, "email": f"{username}@example.com", "password": PASSWORD})
+        _expect(status, 201, "register")
+        status, data, _ = client.request("POST", "/user/login", body={"username": username, "password": PASSWORD})
+        _expect(status, 200, "login")
+        token = data["token"]
+
+        for start in range(0, tasks, 1000):
+            operations = [
+                {"op": "create", "data": {
+                    "title": f"task {n}",
+                    "priority": ["LOW", "MEDIUM", "HIGH"][n % 3],
+                    "category": ["WORK", "PERSONAL", "UNCATEGORIZED"][n // 3 % 3],
+                }}
+                for n in range(start, min(tasks, start + 1000))
+            ]
+            status, _, _ = client.request("POST", "/tasks/batch", token, operations)
+            _expect(status, 200, "batch")
+
+        status, data, _ = client.request("GET", "/tasks/sync", token)
+        _expect(status, 200, "sync")
+        accounts.append({
+            "username": username,
+            "token": token,
+            "tasks": sorted(task["id"] for task in data["tasks"]),
+            "since": data["token"],
+        })
+    return accounts
+
+def scenarios(accounts, run, admin_token=None):
+    """
+    Build the requests of every route.
+
+    Args:
+        accounts (list): Users created by setup().
+        run (str): Unique name of the run, part of the usernames of registered users.
+        admin_token (str): Token of an admin user for GET /metrics, which is skipped without it.
+
+    Returns:
+        list: Scenarios in the order they run.
+    """
+    def account(n):
+        return accounts[n % len(accounts)]
+
+    def share(n, part):
+        # Each third of a user's tasks serves one kind of write, so writes do not conflict
+        tasks = account(n)["tasks"]
+        third = tasks[part * len(tasks) // 3:(part + 1) * len(tasks) // 3] or tasks
+        return third[n // len(accounts) % len(third)]
+
+    registered, deletable = [], []
+
+    def register(n):
+        username = f"load-{run}-new-{n}"
+        registered.append(username)
+        return "POST", "/user/register", None, {"username": username, "email": f"{username}@example.com", "password": PASSWORD}, None
+
+    def delete_user(n):
+        return "DELETE", "/user", deletable[n], None, None
+
+    def status(n):
+        # Every task is completed once, then reopened once, and so on
+        tasks = len(accounts[0]["tasks"]) // 3 or 1
+        param = "complete" if n // (tasks * len(accounts)) % 2 == 0 else "pending"
+        return "PUT", f"/task/{share(n, 1)}/{param}", account(n)["token"], None, None
+
+    def delete_task(n):
+        user = account(n)
+        tasks = user["tasks"][2 * len(user["tasks"]) // 3:]
+        return "DELETE", f"/task/{tasks[n // len(accounts)]}", user["token"], None, None
+
+    deletions = len(accounts) * (len(accounts[0]["tasks"]) - 2 * len(accounts[0]["tasks"]) // 3)
+    result = [
+        Scenario("GET /", lambda n: ("GET", "/", None, None, None)),
+        Scenario("POST /user/register", register, (201,)),
+        Scenario("POST /user/login", lambda n: ("POST", "/user/login", None, {"username": account(n)["username"], "password": PASSWORD}, None)),
+        Scenario("GET /user", lambda n: ("GET", "/user", account(n)["token"], None, None)),
+        Scenario("PUT /user", lambda n: ("PUT", "/user", account(n)["token"], {"username": account(n)["username"]}, None), (204,)),
+        Scenario("GET /tasks", lambda n: ("GET", "/tasks", account(n)["token"], None, {"limit": 1 + n % 50})),
+        Scenario("GET /tasks filtered", lambda n: ("GET", "/tasks", account(n)["token"], None, {"status": "PENDING", "priority": "HIGH", "sort": "-priority", "limit": 1 + n % 50})),
+        Scenario("GET /tasks search", lambda n: ("GET", "/tasks", account(n)["token"], None, {"q": f"task {n % 100}", "limit": 1 + n % 50})),
+        Scenario("POST /tasks", lambda n: ("POST", "/tasks", account(n)["token"], {"title": f"new task {n}", "priority": "HIGH"}, None), (201,)),
+        Scenario("POST /tasks/batch", lambda n: ("POST", "/tasks/batch", account(n)["token"], [{"op": "create", "data": {"title": f"batch {n} {i}"}} for i in range(50)], None)),
+        Scenario("GET /tasks/stats", lambda n: ("GET", "/tasks/stats", account(n)["token"], None, None)),
+        Scenario("GET /tasks/sync", lambda n: ("GET", "/tasks/sync", account(n)["token"], None, {"since": account(n)["since"]})),
+        Scenario("GET /tasks/export/ndjson", lambda n: ("GET", "/tasks/export/ndjson", account(n)["token"], None, None)),
+        Scenario("GET /tasks/export/csv", lambda n: ("GET", "/tasks/export/csv", account(n)["token"], None, None)),
+        Scenario("GET /task/<id>", lambda n: ("GET", f"/task/{share(n, 0)}", account(n)["token"], None, None)),
+        Scenario("PUT /task/<id>", lambda n: ("PUT", f"/task/{share(n, 0)}", account(n)["token"], {"title": f"renamed {n}"}, None), (204,)),
+        Scenario("PUT /task/<id>/complete|pending", status, (204,)),
+        Scenario("DELETE /task/<id>", delete_task, (204,), requests=deletions),
+        # Users registered by the register scenario are logged in, then deleted
+        Scenario("DELETE /user", delete_user, (204,), prepare=lambda client: _login_registered(client, registered, deletable)),
+    ]
+    if admin_token:
+        result.append(Scenario("GET /metrics", lambda n: ("GET", "/metrics", admin_token, None, None)))
+    return result
+
+def run_scenario(client, scenario, requests, concurrency):
+    """
+    Send the requests of a scenario from concurrent threads.
+
+    Args:
+        client (Client): Client of the API.
+        scenario (Scenario): Requests to send.
+        requests (int): Number of requests, unless the scenario has fewer.
+        concurrency (int): Number of threads.
+
+    Returns:
+        dict: Reported result of the scenario.
+    """
+    if scenario.prepare:
+        scenario.requests = scenario.prepare(client)
+    total = requests if scenario.requests is None else min(requests, scenario.requests)
+    latencies, queries, errors = [], [], []
+
+    def send(n):
+        method, path, token, body, params = scenario.build(n)
+        start = perf_counter()
+        status, _, query_count = client.request(method, path, token, body, params)
+        latencies.append(perf_counter() - start)
+        if query_count is not None:
+            queries.append(query_count)
+        if status not in scenario.expected:
+            errors.append(status)
+
+    start = perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        list(executor.map(send, range(total)))
+    seconds = perf_counter() - start
+
+    if not latencies:
+        return None
+    report_latency(scenario.name, latencies, seconds)
+    result = results[-1]
+    result.update(errors=len(errors), queries_per_request=sum(queries) / len(queries) if queries else None)
+    print(f" {result['queries_per_request'] or 0:6.1f} queries", end="")
+    if errors:
+        print(f" {len(errors)} errors (e.g. {errors[0]})", end="")
+    return result
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test every route of the API on a running server.")
+    parser.add_argument("--url", default="http://127.0.0.1:8000/api", help="Base URL of the API.")
+    parser.add_argument("--users", type=int, default=10, help="Users created for the run.")
+    parser.add_argument("--tasks", type=int, default=300, help="Tasks created per user.")
+    parser.add_argument("--requests", type=int, default=500, help="Requests per route.")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent requests.")
+    parser.add_argument("--route", action="append", dest="routes", help="Only run the routes whose name contains this text, can be repeated.")
+    parser.add_argument("--admin-token", help="Token of an admin user, to load GET /metrics as well.")
+    parser.add_argument("--output", help="File to save the results to as JSON.")
+    options = parser.parse_args(argv)
+
+    client = Client(options.url)
+    run = uuid.uuid4().hex[:8]
+    accounts = setup(client, options.users, options.tasks, run)
+
+    for scenario in scenarios(accounts, run, options.admin_token):
+        if options.routes and not any(route in scenario.name for route in options.routes):
+            continue
+        run_scenario(client, scenario, options.requests, options.concurrency)
+    print()
+
+    if options.output:
+        save_results(options.output, results, url=options.url, users=options.users, tasks=options.tasks, concurrency=options.concurrency)
+
+# Private helpers
+
+def _expect(status, expected, step):
+    if status != expected:
+        sys.exit(f"Setup failed: {step} returned {status}, expected {expected}")
+
+def _login_registered(client, registered, deletable):
+    for username in registered:
+        status, data, _ = client.request("POST", "/user/login", body={"username": username, "password": PASSWORD})
+        if status == 200:
+            deletable.append(data["token"])
+    return len(deletable)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import atexit
+import json
+import os
+import subprocess
+import tracemalloc
+from datetime import datetime, timezone
+from time import perf_counter
+
+# Benchmark helpers
+#
+# Benchmarks are Django test cases run against the test database, outside of the test suite:
+#     python manage.py test benchmarks --pattern "bench_*.py"
+# Set BENCHMARK_RESULTS to a file path to also save the reported results as JSON, to be
+# compared with the results of another commit by python -m benchmarks.compare.
+
+results = []
+
+def timed(function, *args, **kwargs):
+    start = perf_counter()
+    result = function(*args, **kwargs)
+    return result, perf_counter() - start
+
+def traced(function, *args, **kwargs):
+    # Like timed(), with the peak of Python memory allocated meanwhile in bytes
+    tracemalloc.start()
+    try:
+        result, seconds = timed(function, *args, **kwargs)
+        return result, seconds, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def report_memory(name, operations, seconds, peak):
+    report(name, operations, seconds)
+    results[-1].update(peak_mb=peak / 2 ** 20)
+    print(f" peak {peak / 2 ** 20:8.1f} MB", end="")
+
+def report(name, operations, seconds):
+    results.append({"name": name, "operations": operations, "seconds": seconds, "ops_per_second": operations / seconds})
+    print(f"\n{name:<48} {operations:>8} ops {seconds:9.3f} s {operations / seconds:12.0f} ops/s", end="")
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def report_latency(name, latencies, seconds):
+    # Throughput of concurrent requests with their median and p99 latency in milliseconds
+    report(name, len(latencies), seconds)
+    results[-1].update(p50_ms=percentile(latencies, 0.5) * 1000, p99_ms=percentile(latencies, 0.99) * 1000)
+    print(f" p50 {percentile(latencies, 0.5) * 1000:8.2f} ms p99 {percentile(latencies, 0.99) * 1000:8.2f} ms", end="")
+
+def report_percentiles(name, latencies):
+    # Median and p99 latency in milliseconds of sequential operations
+    results.append({"name": name, "operations": len(latencies), "p50_ms": percentile(latencies, 0.5) * 1000, "p99_ms": percentile(latencies, 0.99) * 1000})
+    print(f"\n{name:<48} p50 {percentile(latencies, 0.5) * 1000:8.2f} ms p99 {percentile(latencies, 0.99) * 1000:8.2f} ms", end="")
+
+def save_results(path, entries, **metadata):
+    """
+    Save benchmark results as JSON, along with the commit they were measured on.
+
+    Args:
+        path (str): File to write.
+        entries (list): Reported results.
+        **metadata: Other values describing the run, e.g. the benchmarked URL.
+    """
+    with open(path, "w") as file:
+        json.dump({
+            "commit": _commit(),
+            "date": datetime.now(timezone.utc).isoformat(),
+            **metadata,
+            "results": entries,
+        }, file, indent=2)
+
+# Private helpers
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+if os.getenv("BENCHMARK_RESULTS"):
+    atexit.register(lambda: save_results(os.environ["BENCHMARK_RESULTS"], results))
@@ -29,7 +29,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
-    'whitenoise.middleware.WhiteNoiseMiddleware',  # Whitenoise middleware
+    'api.middleware.AsyncWhiteNoiseMiddleware',  # Whitenoise middleware, async capable
+    'api.middleware.InstrumentationMiddleware',  # Query counts and timings, see INSTRUMENTATION
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -119,6 +120,85 @@ APPEND_SLASH = False
 AUTH_USER_MODEL = "api.User"
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'api.models.BearerTokenAuthentication',
+        'api.models.CachedBearerTokenAuthentication',
     ],
+    # FastJSONRenderer encodes with orjson when it is installed, api.renderers.JSONRenderer with the stdlib
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+}
+
+# Account deletion, "immediate" deletes the tasks of the account in batches of BATCH_SIZE
+# during the request, "deferred" deactivates the account and queues the deletion as a
+# background job, purge_deleted_users deletes the deactivated accounts left over
+USER_DELETION = {
+    "MODE": "immediate",
+    "BATCH_SIZE": 5000,
+}
+
+# Background jobs: "database" queues them in the job table, run by python manage.py run_jobs,
+# "local" runs them after commit in a thread pool of the web process and loses queued jobs
+# when it stops. Failed jobs are retried after RETRY_DELAY seconds, doubled at each attempt,
+# running jobs are given back to the queue after TIMEOUT seconds
+JOBS = {
+    "BACKEND": os.getenv("JOBS_BACKEND", "database"),
+    "WORKERS": 4,
+    "MAX_ATTEMPTS": 5,
+    "RETRY_DELAY": 10,
+    "POLL_INTERVAL": 1,
+    "TIMEOUT": 600,
+}
+
+# Thread pool hashing passwords on register and login, requests are answered 503 when
+# MAX_PENDING hashes are already queued or running
+PASSWORD_HASHING = {
+    "WORKERS": 4,
+    "MAX_PENDING": 32,
+}
+
+# CACHES alias holding the per-user task collection versions and cached pages of GET /tasks,
+# e.g. django.core.cache.backends.redis.RedisCache to share them between processes. Versions
+# are only cached by a shared backend, with a per-process one they are read from the database
+TASKS_CACHE = "default"
+TASKS_CACHE_TIMEOUT = 300
+
+# Searches of GET /tasks shorter than this match substrings instead of ranked words
+TASKS_SEARCH_MIN_LENGTH = 4
+
+# Keyset pagination of GET /tasks, "limit" is capped to TASKS_MAX_PAGE_SIZE
+TASKS_PAGE_SIZE = 50
+TASKS_MAX_PAGE_SIZE = 500
+
+# Recurring tasks are expanded in the deadline window of GET /tasks, up to this many days
+# from its start
+TASKS_RECURRENCE_MAX_DAYS = 3660
+
+# Maximum number of operations in one POST /tasks/batch request
+TASKS_BATCH_MAX_OPERATIONS = 10000
+
+# Rows fetched per round trip by the server-side cursor of task exports
+TASKS_EXPORT_CHUNK_SIZE = 2000
+
+# Days tombstones of deleted tasks are kept by compact_task_tombstones, clients that did
+# not sync for longer get 410 from GET /tasks/sync and sync again from scratch
+TASKS_TOMBSTONE_RETENTION_DAYS = 30
+
+# Per-route SQL query counts and timings of requests, off unless enabled, exported to admin
+# users at GET /api/metrics in the Prometheus text format. Timings are sent as Server-Timing
+# headers to staff users, and to every client when SERVER_TIMING is set. Requests slower than
+# SLOW_REQUEST_MS are logged to "api.slow_requests" with their SQL, None disables the log.
+INSTRUMENTATION = {
+    "ENABLED": os.getenv("INSTRUMENTATION", "false").lower() == "true",
+    "SERVER_TIMING": os.getenv("INSTRUMENTATION_SERVER_TIMING", "false").lower() == "true",
+    "SLOW_REQUEST_MS": None,
+}
+
+# Token authentication cache, SHARED_CACHE is an optional CACHES alias shared by every process.
+# With one, tokens are only cached there and a deleted token or user is rejected by every
+# process at once, without one each process keeps its own entries for up to TTL seconds
+TOKEN_AUTH_CACHE = {
+    "MAX_SIZE": 10000,
+    "TTL": 60,
+    "SHARED_CACHE": None,
 }